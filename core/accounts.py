@@ -0,0 +1,88 @@
+"""
+Player account provisioning for Red Ball Cricket Academy
+
+Accounts for players added to a booking are created in bulk with unusable
+passwords, so onboarding a squad costs a few INSERTs instead of one PBKDF2
+hash per player. Each new player receives a one-time activation link; the
+password is only hashed when they choose it.
+"""
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from .models import CustomUser, Player, UserProfile
+from .outbox import enqueue_many
+
+
+class ActivationTokenGenerator(PasswordResetTokenGenerator):
+    """One-time token for setting the first password.
+
+    The token hashes the (unusable) password, so it stops working as soon
+    as a password is set.
+    """
+    key_salt = 'core.accounts.ActivationTokenGenerator'
+
+
+activation_token_generator = ActivationTokenGenerator()
+
+
+def activation_link(user, base_url):
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = activation_token_generator.make_token(user)
+    return f"{base_url}/api/activate/?uid={uid}&token={token}"
+
+
+def get_or_create_player_users(people):
+    """Return {email: user} for {email: name}, creating missing accounts in bulk.
+
+    Emails must already be normalized (see models.normalize_email). New accounts get an unusable
+    password and a 'player' profile; their QR codes are rendered by the
+    outbox after commit.
+    """
+    users = {
+        user.email.lower(): user
+        for user in CustomUser.objects.filter(email__lower__in=list(people))
+    }
+    new_users = [
+        CustomUser(email=email, first_name=name, password=make_password(None))
+        for email, name in people.items() if email not in users
+    ]
+    if new_users:
+        new_users = CustomUser.objects.bulk_create(new_users)
+        users.update((user.email, user) for user in new_users)
+        enqueue_many('user_qr', [{'user_id': user.id} for user in new_users])
+
+    # bulk_create skips post_save, so profiles are created here as well
+    with_profile = set(
+        UserProfile.objects.filter(user__in=users.values()).values_list('user_id', flat=True)
+    )
+    UserProfile.objects.bulk_create([
+        UserProfile(user=user, user_type='player')
+        for user in users.values() if user.id not in with_profile
+    ])
+    return users
+
+
+def add_players(booking, entries, base_url=None):
+    """Create players for a booking with their accounts, in bulk.
+
+    `entries` are dicts with name, email (lower-cased) and optional phone.
+    QR codes and activation emails are queued in the outbox.
+    """
+    users = get_or_create_player_users({entry['email']: entry['name'] for entry in entries})
+    players = Player.objects.bulk_create([
+        Player(
+            booking=booking,
+            name=entry['name'],
+            email=entry['email'],
+            phone=entry.get('phone'),
+            user=users[entry['email']],
+        )
+        for entry in entries
+    ])
+    enqueue_many('player_qr', [{'player_id': player.id} for player in players])
+    enqueue_many('player_credentials_email', [
+        {'player_id': player.id, 'base_url': base_url} for player in players
+    ])
+    return players
@@ -0,0 +1,148 @@
+"""
+Unified check-in activity stream for Red Ball Cricket Academy
+
+Merges CheckInLog (players), UserCheckInLog (users) and OrganizerCheckInLog
+(organizers) into one time-ordered stream with a single UNION ALL query and
+keyset pagination on (timestamp, kind, id).
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.db.models import BigIntegerField, CharField, F, Q, Value
+from django.contrib.auth import get_user_model
+
+from .models import CheckInLog, OrganizerCheckInLog, Player, Sport, UserCheckInLog
+
+User = get_user_model()
+
+KIND_PLAYER = 'player'
+KIND_USER = 'user'
+KIND_ORGANIZER = 'organizer'
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+NULL_ID = Value(None, output_field=BigIntegerField())
+
+
+def encode_cursor(row):
+    raw = json.dumps([row['timestamp'].isoformat(), row['kind'], row['id']])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode an opaque cursor into (timestamp, kind, id); raises ValueError if malformed"""
+    try:
+        timestamp, kind, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), str(kind), int(pk)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _after_cursor(kind, cursor):
+    """Rows of `kind` that sort after the cursor in (-timestamp, -kind, -id) order"""
+    timestamp, cursor_kind, cursor_id = cursor
+    condition = Q(timestamp__lt=timestamp)
+    if kind < cursor_kind:
+        condition |= Q(timestamp=timestamp)
+    elif kind == cursor_kind:
+        condition |= Q(timestamp=timestamp, id__lt=cursor_id)
+    return condition
+
+
+def _branch(kind, queryset, subject, booking, sport, cursor=None):
+    if cursor is not None:
+        queryset = queryset.filter(_after_cursor(kind, cursor))
+    return (
+        queryset.order_by()
+        .annotate(
+            kind=Value(kind, output_field=CharField()),
+            subject_id=F(subject),
+            booking_ref=F(booking) if booking else NULL_ID,
+            sport_ref=F(sport) if sport else NULL_ID,
+        )
+        .values('timestamp', 'id', 'action', 'kind', 'subject_id', 'booking_ref', 'sport_ref')
+    )
+
+
+def activity_queryset(sport_id=None, date=None, booking_id=None, cursor=None):
+    """UNION ALL of the three log tables, newest first"""
+    player_logs = CheckInLog.objects.all()
+    organizer_logs = OrganizerCheckInLog.objects.all()
+    user_logs = UserCheckInLog.objects.all()
+
+    if date:
+        player_logs = player_logs.filter(timestamp__date=date)
+        organizer_logs = organizer_logs.filter(timestamp__date=date)
+        user_logs = user_logs.filter(timestamp__date=date)
+    if sport_id:
+        player_logs = player_logs.filter(player__booking__slot__sport_id=sport_id)
+        organizer_logs = organizer_logs.filter(booking__slot__sport_id=sport_id)
+    if booking_id:
+        player_logs = player_logs.filter(player__booking_id=booking_id)
+        organizer_logs = organizer_logs.filter(booking_id=booking_id)
+
+    branches = [
+        _branch(KIND_PLAYER, player_logs, 'player_id', 'player__booking_id',
+                'player__booking__slot__sport_id', cursor),
+        _branch(KIND_ORGANIZER, organizer_logs, 'user_id', 'booking_id',
+                'booking__slot__sport_id', cursor),
+    ]
+    # User check-ins are not tied to a booking or sport
+    if not sport_id and not booking_id:
+        branches.append(_branch(KIND_USER, user_logs, 'user_id', None, None, cursor))
+
+    first, *rest = branches
+    return first.union(*rest, all=True).order_by('-timestamp', '-kind', '-id')
+
+
+def _load_names(rows):
+    """Resolve player/user/sport names for a page of rows with one query per table"""
+    player_ids = {r['subject_id'] for r in rows if r['kind'] == KIND_PLAYER}
+    user_ids = {r['subject_id'] for r in rows if r['kind'] != KIND_PLAYER}
+    sport_ids = {r['sport_ref'] for r in rows if r['sport_ref']}
+
+    players = {
+        p['id']: {'id': p['id'], 'name': p['name'], 'email': p['email']}
+        for p in Player.objects.filter(id__in=player_ids).values('id', 'name', 'email')
+    } if player_ids else {}
+    users = {
+        u['id']: {
+            'id': u['id'],
+            'name': f"{u['first_name']} {u['last_name']}".strip() or u['email'],
+            'email': u['email'],
+        }
+        for u in User.objects.filter(id__in=user_ids).values('id', 'email', 'first_name', 'last_name')
+    } if user_ids else {}
+    sports = dict(Sport.objects.filter(id__in=sport_ids).values_list('id', 'name')) if sport_ids else {}
+    return players, users, sports
+
+
+def activity_stream(sport_id=None, date=None, booking_id=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of the merged activity stream plus the cursor for the next page"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    decoded = decode_cursor(cursor) if cursor else None
+    rows = list(activity_queryset(sport_id, date, booking_id, decoded)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    players, users, sports = _load_names(rows)
+    results = []
+    for row in rows:
+        names = players if row['kind'] == KIND_PLAYER else users
+        results.append({
+            'kind': row['kind'],
+            'id': row['id'],
+            'action': row['action'],
+            'timestamp': row['timestamp'],
+            'booking_id': row['booking_ref'],
+            'sport_id': row['sport_ref'],
+            'sport_name': sports.get(row['sport_ref']),
+            'subject': names.get(row['subject_id']),
+        })
+
+    return {
+        'results': results,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+    }
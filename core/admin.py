@@ -4,7 +4,7 @@ Admin configuration for Red Ball Cricket Academy
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
-from .models import Sport, TimeSlot, Booking, Player, CheckInLog, UserProfile, BookingConfiguration, BreakTime
+from .models import Sport, TimeSlot, Booking, Player, CheckInLog, UserProfile, BookingConfiguration, BreakTime, OutboxMessage, PaymentWebhookEvent, IdempotencyRecord, SyncTombstone
 
 User = get_user_model()
 
@@ -110,3 +110,32 @@ class BreakTimeAdmin(admin.ModelAdmin):
     search_fields = ['sport__name', 'reason']
     readonly_fields = ['created_at', 'updated_at']
     raw_id_fields = ['sport']
+
+
+@admin.register(PaymentWebhookEvent)
+class PaymentWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'event', 'booking', 'applied', 'received_at']
+    list_filter = ['event', 'applied']
+    search_fields = ['event_id']
+    readonly_fields = ['received_at']
+
+
+@admin.register(IdempotencyRecord)
+class IdempotencyRecordAdmin(admin.ModelAdmin):
+    list_display = ['key', 'endpoint', 'user', 'status_code', 'created_at']
+    search_fields = ['key', 'user__email']
+    readonly_fields = ['created_at']
+
+
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'object_id', 'owner_id', 'player_user_id', 'deleted_at']
+    list_filter = ['kind']
+    readonly_fields = ['deleted_at']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'attempts', 'available_at', 'created_at', 'processed_at']
+    list_filter = ['kind', 'status']
+    readonly_fields = ['created_at', 'processed_at']
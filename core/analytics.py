@@ -0,0 +1,280 @@
+"""
+Analytics for Red Ball Cricket Academy
+
+Revenue and slot utilization are pre-aggregated per sport per day into
+DailySportRollup so finance reports never scan Booking/TimeSlot directly.
+The weekday x hour heatmap is computed with SQL grouping and cached per window.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractWeekDay, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Booking, DailySportRollup, RollupCheckpoint, Sport, SyncTombstone, TimeSlot
+
+ROLLUP_CHECKPOINT = 'daily_sport_rollup'
+ROLLUP_CHUNK_DAYS = 31
+
+GRANULARITIES = ('day', 'week')
+
+# A slot is "peak" when its sport has peak pricing and it starts inside the window
+PEAK_SLOT = Q(
+    sport__booking_config__peak_hour_pricing=True,
+    start_time__gte=F('sport__booking_config__peak_start_time'),
+    start_time__lt=F('sport__booking_config__peak_end_time'),
+)
+OFFERED_SLOT = Q(admin_disabled=False)
+BOOKED_SLOT = Q(admin_disabled=False, booking__isnull=False, booking__is_cancelled=False)
+PAID_BOOKING = Q(booking__payment_verified=True, booking__is_cancelled=False)
+
+
+def touched_dates(since=None):
+    """Return the slot dates whose slots or bookings changed or were deleted after `since`"""
+    slots = TimeSlot.objects.all()
+    bookings = Booking.objects.all()
+    deleted = SyncTombstone.objects.filter(slot_date__isnull=False)
+    if since is not None:
+        slots = slots.filter(updated_at__gt=since)
+        bookings = bookings.filter(updated_at__gt=since)
+        deleted = deleted.filter(deleted_at__gt=since)
+    dates = set(slots.values_list('date', flat=True).distinct())
+    dates.update(bookings.values_list('slot__date', flat=True).distinct())
+    dates.update(deleted.values_list('slot_date', flat=True).distinct())
+    if since is None:
+        # Days whose slots are all gone, even once their tombstones are purged
+        dates.update(DailySportRollup.objects.values_list('date', flat=True).distinct())
+    return sorted(dates)
+
+
+def compute_rollups(dates):
+    """Aggregate TimeSlot/Booking rows for the given dates into unsaved rollups"""
+    rows = (
+        TimeSlot.objects.filter(date__in=dates)
+        .values('sport_id', 'date')
+        .annotate(
+            bookings_count=Count('booking', filter=PAID_BOOKING),
+            revenue=Sum('booking__amount_paid', filter=PAID_BOOKING),
+            slots_offered=Count('id', filter=OFFERED_SLOT),
+            slots_booked=Count('id', filter=BOOKED_SLOT),
+            peak_slots_offered=Count('id', filter=OFFERED_SLOT & PEAK_SLOT),
+            peak_slots_booked=Count('id', filter=BOOKED_SLOT & PEAK_SLOT),
+        )
+        .order_by()
+    )
+    return [
+        DailySportRollup(
+            sport_id=row['sport_id'],
+            date=row['date'],
+            bookings_count=row['bookings_count'],
+            revenue=row['revenue'] or Decimal('0'),
+            slots_offered=row['slots_offered'],
+            slots_booked=row['slots_booked'],
+            peak_slots_offered=row['peak_slots_offered'],
+            peak_slots_booked=row['peak_slots_booked'],
+            updated_at=timezone.now(),
+        )
+        for row in rows
+    ]
+
+
+def store_rollups(dates, rollups):
+    """Upsert rollups and drop stale rows for sports that no longer have slots on those dates"""
+    with transaction.atomic():
+        DailySportRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['sport', 'date'],
+            update_fields=[
+                'bookings_count', 'revenue', 'slots_offered', 'slots_booked',
+                'peak_slots_offered', 'peak_slots_booked', 'updated_at',
+            ],
+        )
+        keep = {(r.sport_id, r.date) for r in rollups}
+        stale = [
+            pk for pk, sport_id, date in DailySportRollup.objects.filter(date__in=dates)
+            .values_list('id', 'sport_id', 'date')
+            if (sport_id, date) not in keep
+        ]
+        if stale:
+            DailySportRollup.objects.filter(id__in=stale).delete()
+
+
+def refresh_rollups(full=False):
+    """Recompute rollups for every date touched since the last run.
+
+    Returns the number of dates that were recomputed.
+    """
+    checkpoint, _ = RollupCheckpoint.objects.get_or_create(name=ROLLUP_CHECKPOINT)
+    # Take the watermark before reading so rows changed mid-run are picked up next time
+    started_at = timezone.now()
+    since = None if full else checkpoint.last_run_at
+    dates = touched_dates(since)
+
+    for i in range(0, len(dates), ROLLUP_CHUNK_DAYS):
+        chunk = dates[i:i + ROLLUP_CHUNK_DAYS]
+        store_rollups(chunk, compute_rollups(chunk))
+
+    checkpoint.last_run_at = started_at
+    checkpoint.save(update_fields=['last_run_at'])
+    return len(dates)
+
+
+def rollup_queryset(start, end, granularity='day', sport_id=None):
+    """Rollup rows in [start, end] grouped by period and sport"""
+    queryset = DailySportRollup.objects.filter(date__range=[start, end])
+    if sport_id:
+        queryset = queryset.filter(sport_id=sport_id)
+    period = TruncWeek('date') if granularity == 'week' else F('date')
+    return (
+        queryset.annotate(period=period)
+        .values('period', 'sport_id', 'sport__name')
+        .annotate(
+            bookings_count=Sum('bookings_count'),
+            revenue=Sum('revenue'),
+            slots_offered=Sum('slots_offered'),
+            slots_booked=Sum('slots_booked'),
+            peak_slots_offered=Sum('peak_slots_offered'),
+            peak_slots_booked=Sum('peak_slots_booked'),
+        )
+        .order_by('period', 'sport__name')
+    )
+
+
+def _rate(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+def revenue_report(start, end, granularity='day', sport_id=None):
+    return [
+        {
+            'period': row['period'],
+            'sport': row['sport_id'],
+            'sport_name': row['sport__name'],
+            'bookings': row['bookings_count'],
+            'revenue': row['revenue'],
+        }
+        for row in rollup_queryset(start, end, granularity, sport_id)
+    ]
+
+
+def utilization_report(start, end, granularity='day', sport_id=None):
+    results = []
+    for row in rollup_queryset(start, end, granularity, sport_id):
+        offpeak_offered = row['slots_offered'] - row['peak_slots_offered']
+        offpeak_booked = row['slots_booked'] - row['peak_slots_booked']
+        results.append({
+            'period': row['period'],
+            'sport': row['sport_id'],
+            'sport_name': row['sport__name'],
+            'slots_offered': row['slots_offered'],
+            'slots_booked': row['slots_booked'],
+            'utilization': _rate(row['slots_booked'], row['slots_offered']),
+            'peak_slots_offered': row['peak_slots_offered'],
+            'peak_slots_booked': row['peak_slots_booked'],
+            'peak_utilization': _rate(row['peak_slots_booked'], row['peak_slots_offered']),
+            'offpeak_slots_offered': offpeak_offered,
+            'offpeak_slots_booked': offpeak_booked,
+            'offpeak_utilization': _rate(offpeak_booked, offpeak_offered),
+        })
+    return results
+
+
+def parse_report_window(params, default_days=30):
+    """Read start/end/granularity/sport query params; raises ValueError on bad input"""
+    invalid = ValueError('start and end must be valid dates (YYYY-MM-DD)')
+    try:
+        end = parse_date(params['end']) if params.get('end') else timezone.now().date()
+        if end is None:
+            raise invalid
+        start = parse_date(params['start']) if params.get('start') else end - timedelta(days=default_days - 1)
+    except ValueError:
+        raise invalid
+    if start is None:
+        raise invalid
+    if start > end:
+        raise ValueError('start must be on or before end')
+    granularity = params.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    try:
+        sport_id = int(params['sport']) if params.get('sport') else None
+    except ValueError:
+        raise ValueError('sport must be a sport id')
+    return start, end, granularity, sport_id
+
+
+HEATMAP_CACHE_SECONDS = 10 * 60
+WEEKDAY_LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+HOURS = list(range(24))
+
+
+def _weekday_index(extract_weekday):
+    """ExtractWeekDay is 1=Sunday..7=Saturday; the matrix is Monday-first"""
+    return (extract_weekday + 5) % 7
+
+
+def compute_heatmap(start, end, sport_id=None):
+    """Sport x weekday x hour matrix of booking rate and no-show rate over [start, end]"""
+    today = timezone.now().date()
+    active_booking = Q(booking__isnull=False, booking__is_cancelled=False)
+    # No-shows only make sense for slots that have already happened
+    played = active_booking & Q(date__lt=today)
+
+    slots = TimeSlot.objects.filter(date__range=[start, end], admin_disabled=False)
+    if sport_id:
+        slots = slots.filter(sport_id=sport_id)
+    rows = (
+        slots.annotate(weekday=ExtractWeekDay('date'), hour=ExtractHour('start_time'))
+        .values('sport_id', 'weekday', 'hour')
+        .annotate(
+            offered=Count('id', distinct=True),
+            booked=Count('id', distinct=True, filter=active_booking),
+            players=Count('booking__players', filter=played),
+            no_shows=Count('booking__players', filter=played & Q(booking__players__check_in_count=0)),
+        )
+        .order_by()
+    )
+
+    sports = list(
+        Sport.objects.filter(id__in=slots.values('sport_id')).order_by('name').values('id', 'name')
+    )
+    index = {sport['id']: i for i, sport in enumerate(sports)}
+
+    def empty():
+        return [[None] * len(HOURS) for _ in WEEKDAY_LABELS]
+
+    offered = [empty() for _ in sports]
+    booking_rate = [empty() for _ in sports]
+    no_show_rate = [empty() for _ in sports]
+    for row in rows:
+        s, d, h = index[row['sport_id']], _weekday_index(row['weekday']), row['hour']
+        offered[s][d][h] = row['offered']
+        booking_rate[s][d][h] = _rate(row['booked'], row['offered'])
+        if row['players']:
+            no_show_rate[s][d][h] = _rate(row['no_shows'], row['players'])
+
+    return {
+        'start': start,
+        'end': end,
+        'sports': sports,
+        'weekdays': WEEKDAY_LABELS,
+        'hours': HOURS,
+        'offered': offered,
+        'booking_rate': booking_rate,
+        'no_show_rate': no_show_rate,
+    }
+
+
+def utilization_heatmap(start, end, sport_id=None):
+    """Cached compute_heatmap; one cache entry per window and sport filter"""
+    key = f"analytics:heatmap:{start}:{end}:{sport_id or 'all'}"
+    data = cache.get(key)
+    if data is None:
+        data = compute_heatmap(start, end, sport_id)
+        cache.set(key, data, HEATMAP_CACHE_SECONDS)
+    return data
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from .taskqueue import start_on_first_request
+        request_started.connect(start_on_first_request, dispatch_uid='core.taskqueue.start')
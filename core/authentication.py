@@ -0,0 +1,82 @@
+"""
+Request authentication for Red Ball Cricket Academy
+
+JWT requests resolve their user (with profile, for user_type checks) from a
+short-lived cache entry instead of the database. Entries are keyed by a
+per-user version that is replaced whenever the user or their profile is
+saved or deleted, and again once that transaction commits. A request that
+read the old row just before the change caches it under the old version,
+where nobody looks any more, instead of bringing back the old password
+hash or is_active flag for AUTH_USER_CACHE_SECONDS.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+AUTH_USER_CACHE_SECONDS = 60
+# Versions are random, so an expired one is simply replaced, never reused
+AUTH_USER_VERSION_SECONDS = 24 * 60 * 60
+
+
+def _version_key(user_id):
+    return f'auth:user:{user_id}:version'
+
+
+def _new_version(user_id):
+    cache.set(_version_key(user_id), uuid.uuid4().hex, AUTH_USER_VERSION_SECONDS)
+
+
+def user_cache_key(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, AUTH_USER_VERSION_SECONDS)
+        version = cache.get(key)
+    return f'auth:user:{user_id}:{version}'
+
+
+def forget_user(user_id):
+    _new_version(user_id)
+    # Readers inside the window before commit still see the old row
+    transaction.on_commit(lambda: _new_version(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that caches the user row and profile per user id"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = (
+                self.user_model.objects.select_related('profile')
+                .filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            )
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, user, AUTH_USER_CACHE_SECONDS)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+# Hot mobile endpoints only ever see bearer tokens; skipping Session and
+# Basic avoids a session lookup, CSRF checks and per-request password hashing.
+JWT_ONLY = [CachedJWTAuthentication]
@@ -0,0 +1,105 @@
+"""
+Request batching for Red Ball Cricket Academy
+
+Admin screens fire bursts of small requests (per-booking players/, per-player
+qr_code/). POST /api/batch/ takes
+
+    {"requests": [{"method": "GET", "path": "/api/bookings/12/players/"},
+                  {"method": "POST", "path": "/api/players/scan_qr/", "body": {...}}]}
+
+and runs each sub-request in-process through the URL resolver, in order,
+as the caller: the already-authenticated user is handed to the sub-request
+instead of checking the token again. Each result carries the status,
+headers and body the endpoint would have returned on its own; one failing
+sub-request does not stop the others.
+"""
+import io
+import json
+import logging
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import StreamingHttpResponse
+from django.urls import Resolver404, resolve, reverse
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 20
+ALLOWED_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Only API endpoints are batched; admin and other HTML views are not
+API_PREFIX = '/api/'
+
+# Headers of the batch request that must not leak into every sub-request
+_DROPPED_META = (
+    'wsgi.input', 'CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING', 'HTTP_IDEMPOTENCY_KEY',
+    'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_ACCEPT_ENCODING',
+)
+
+
+def _error(status_code, message):
+    return {'status': status_code, 'headers': {}, 'body': {'error': message}}
+
+
+def _sub_request(request, method, path, body):
+    path, _, query = path.partition('?')
+    payload = b'' if body is None else json.dumps(body).encode()
+    environ = {key: value for key, value in request.META.items() if key not in _DROPPED_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+    })
+    sub = WSGIRequest(environ)
+    # DRF's Request uses these instead of running the authenticators again
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _result(response):
+    headers = {key: value for key, value in response.items() if key.lower() != 'content-type'}
+    if isinstance(response, Response):
+        return {'status': response.status_code, 'headers': headers, 'body': response.data}
+    if isinstance(response, StreamingHttpResponse):
+        return _error(400, 'Streaming responses cannot be batched')
+    content = response.content.decode(response.charset or 'utf-8')
+    try:
+        body = json.loads(content) if content else None
+    except ValueError:
+        body = content
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def run_one(request, item):
+    if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+        return _error(400, 'Each request needs a path')
+    method = str(item.get('method', 'GET')).upper()
+    if method not in ALLOWED_METHODS:
+        return _error(405, f"method must be one of: {', '.join(ALLOWED_METHODS)}")
+    path = item['path']
+    route = path.partition('?')[0]
+    if not route.startswith(API_PREFIX):
+        return _error(400, f'path must start with {API_PREFIX}')
+    if route.rstrip('/') == reverse('batch_requests').rstrip('/'):
+        return _error(400, 'Batches cannot be nested')
+    try:
+        match = resolve(route)
+    except Resolver404:
+        return _error(404, 'Not found')
+    try:
+        return _result(match.func(_sub_request(request, method, path, item.get('body')), *match.args, **match.kwargs))
+    except Exception:
+        logger.exception('[BATCH] %s %s failed', method, path)
+        return _error(500, 'Internal server error')
+
+
+def run_batch(request, items):
+    """Results of `items` in order; raises ValueError for a malformed or oversized batch"""
+    if not isinstance(items, list) or not items:
+        raise ValueError('requests must be a non-empty list')
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f'At most {MAX_BATCH_SIZE} requests per batch')
+    return [run_one(request, item) for item in items]
@@ -0,0 +1,73 @@
+"""
+App launch payload for Red Ball Cricket Academy
+
+On launch the app needs users/me, my_bookings, players/me, sports and
+booking configurations. GET /api/bootstrap/ returns all five in one
+response. Everything but the user block (request.user, no query) is cached
+per user under a key built from:
+
+- the core.caching versions of the sports and booking configuration
+  namespaces (bumped whenever a sport, slot or configuration changes), and
+- one aggregate validator each over the user's bookings and players
+  (row count + newest updated_at, as for conditional GETs), which also
+  moves on queryset.update() calls that bypass signals.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from . import fastserializers
+from .caching import REFERENCE_CACHE_SECONDS, get_version
+from .conditional import queryset_validator
+from .fieldsets import apply_eager_plan
+from .models import BookingConfiguration, Player, Sport
+from .serializers import BookingConfigurationSerializer, SportSerializer, UserSerializer
+from .sync import BOOKING_FIELDS, PLAYER_FIELDS, visible_bookings
+
+BOOTSTRAP_CACHE_SECONDS = REFERENCE_CACHE_SECONDS
+NAMESPACES = ('sports', 'booking_configurations')
+
+
+def _cache_key(request, bookings):
+    user = request.user
+    # Players on the user's bookings (player_count) and the user's own player records
+    players = Player.objects.filter(Q(booking__user=user) | Q(user=user))
+    parts = [
+        str(user.pk),
+        request.build_absolute_uri('/'),  # QR URLs are absolute
+        *(f'{ns}:{get_version(ns)}' for ns in NAMESPACES),
+        *(f'{counts}:{newest.isoformat() if newest else ""}' for counts, newest in (
+            queryset_validator(bookings, BOOKING_FIELDS),
+            queryset_validator(players, PLAYER_FIELDS),
+        )),
+    ]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return f'bootstrap:{user.pk}:{digest}'
+
+
+def _assemble(request, bookings):
+    # One context, so the per-response lookups (free slot counts) run once
+    context = {'request': request}
+    sports = Sport.objects.order_by('id')
+    configurations = BookingConfiguration.objects.order_by('id')
+    configurations = apply_eager_plan(configurations, BookingConfigurationSerializer(context=context))
+    return {
+        'my_bookings': fastserializers.booking_list_rows(
+            bookings.annotate(player_count=Count('players')).order_by('-created_at'), request
+        ),
+        'players': fastserializers.player_rows(Player.objects.filter(user=request.user), request),
+        'sports': SportSerializer(sports, many=True, context=context).data,
+        'booking_configurations': BookingConfigurationSerializer(configurations, many=True, context=context).data,
+    }
+
+
+def bootstrap_payload(request):
+    """users/me, my_bookings, players/me, sports and booking configurations in one dict"""
+    bookings = visible_bookings(request.user)
+    key = _cache_key(request, bookings)
+    data = cache.get(key)
+    if data is None:
+        data = _assemble(request, bookings)
+        cache.set(key, data, BOOTSTRAP_CACHE_SECONDS)
+    return {'user': UserSerializer(request.user, context={'request': request}).data, **data}
@@ -0,0 +1,49 @@
+"""
+Cache backends for Red Ball Cricket Academy
+
+The cache only ever holds copies (reference responses, JWT users, bootstrap
+payloads) and throttle counters, so an unreachable Redis must not take the
+API down with it. FailOpenRedisCache logs the error and behaves like an
+empty cache that accepts nothing: reads miss, writes and adds are dropped and
+counters are not counted, so every caller falls back to the database and
+throttles let requests through until Redis is back.
+"""
+import logging
+from functools import wraps
+
+from django.core.cache.backends.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+
+def _fail_open(default):
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except ValueError:
+                raise  # incr/decr of a missing key, not a connection problem
+            except Exception as e:
+                logger.warning('[CACHE] %s failed, serving without cache: %s', method.__name__, e)
+                return default(*args, **kwargs) if callable(default) else default
+        return wrapper
+    return decorate
+
+
+def _get_default(key, default=None, version=None):
+    return default
+
+
+class FailOpenRedisCache(RedisCache):
+    get = _fail_open(_get_default)(RedisCache.get)
+    get_many = _fail_open({})(RedisCache.get_many)
+    has_key = _fail_open(False)(RedisCache.has_key)
+    add = _fail_open(False)(RedisCache.add)
+    set = _fail_open(None)(RedisCache.set)
+    set_many = _fail_open([])(RedisCache.set_many)
+    touch = _fail_open(False)(RedisCache.touch)
+    incr = _fail_open(None)(RedisCache.incr)
+    delete = _fail_open(False)(RedisCache.delete)
+    delete_many = _fail_open(None)(RedisCache.delete_many)
+    clear = _fail_open(None)(RedisCache.clear)
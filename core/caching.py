@@ -0,0 +1,123 @@
+"""
+Read-through caching of public reference endpoints for Red Ball Cricket Academy
+
+Sports, booking configurations, break times, blackout dates and slots are
+read on every app launch and change rarely. Their list/retrieve responses
+are cached under a key built from the path, the sorted query params and a
+per-namespace version counter. Saving or deleting a model bumps the
+versions of every namespace whose responses embed it, so stale entries are
+never read again and simply expire. Hits and misses are counted per
+namespace for the cache metrics endpoint.
+
+A version counter the cache evicts (LocMem culls when full, Redis under
+maxmemory) restarts at the current time in microseconds rather than at 0,
+so a lost counter never points back at responses cached before it.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.response import Response
+
+REFERENCE_CACHE_SECONDS = 300
+NAMESPACES = ('sports', 'booking_configurations', 'break_times', 'blackout_dates', 'slots')
+
+# Model -> namespaces whose responses include it. Sports are embedded in every
+# other serializer; sports count free slots; slots check blackout dates.
+INVALIDATES = {
+    'Sport': NAMESPACES,
+    'BookingConfiguration': ('booking_configurations',),
+    'BreakTime': ('break_times',),
+    'BlackoutDate': ('blackout_dates', 'slots'),
+    'TimeSlot': ('slots', 'sports'),
+}
+
+
+def _version_key(namespace):
+    return f'refcache:version:{namespace}'
+
+
+def _stat_key(namespace, outcome):
+    return f'refcache:stats:{namespace}:{outcome}'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing key: add() so concurrent first writers do not reset each other
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_version(namespace):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version or 0
+
+
+def bump_versions(*namespaces):
+    for namespace in namespaces:
+        get_version(namespace)  # seed an evicted counter before counting up from it
+        _incr(_version_key(namespace))
+
+
+def invalidate_model(model_name):
+    bump_versions(*INVALIDATES.get(model_name, ()))
+
+
+def response_cache_key(request, namespace):
+    params = sorted((key, value) for key in request.query_params for value in request.query_params.getlist(key))
+    # Responses differ for staff (admin-disabled slots) and by day (is_available)
+    variant = f"{request.path}?{params}|staff={request.user.is_staff}|{timezone.localdate()}"
+    digest = hashlib.sha1(variant.encode()).hexdigest()
+    return f'refcache:{namespace}:v{get_version(namespace)}:{digest}'
+
+
+class CachedReadMixin:
+    """Serve list/retrieve from the cache; set `cache_namespace` on the viewset"""
+    cache_namespace = None
+
+    def _cached(self, request, render, *args, **kwargs):
+        key = response_cache_key(request, self.cache_namespace)
+        data = cache.get(key)
+        if data is not None:
+            _incr(_stat_key(self.cache_namespace, 'hits'))
+            return Response(data)
+        _incr(_stat_key(self.cache_namespace, 'misses'))
+        response = render(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, REFERENCE_CACHE_SECONDS)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, super().retrieve, *args, **kwargs)
+
+
+def cache_metrics():
+    """Hit/miss counts and hit rate per namespace, plus the current version"""
+    keys = [_stat_key(ns, outcome) for ns in NAMESPACES for outcome in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+    metrics = {}
+    for namespace in NAMESPACES:
+        hits = counts.get(_stat_key(namespace, 'hits'), 0)
+        misses = counts.get(_stat_key(namespace, 'misses'), 0)
+        metrics[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+            'version': get_version(namespace),
+        }
+    return metrics
+
+
+def reset_cache_metrics():
+    cache.delete_many([_stat_key(ns, outcome) for ns in NAMESPACES for outcome in ('hits', 'misses')])
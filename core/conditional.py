@@ -0,0 +1,102 @@
+"""
+HTTP conditional GET for Red Ball Cricket Academy
+
+The app refreshes bookings, player records and slot lists constantly. A
+validator is computed with one aggregate query over the filtered queryset:
+MAX(updated_at) of the rows and of the related rows their serializer
+embeds, plus the row count (which catches deletions). Requests carrying a
+matching If-None-Match get a 304 before anything is serialized.
+
+There is no Last-Modified: a date cannot show deletions or changes that
+only move counts and cache versions, so If-Modified-Since alone would
+answer 304 to stale copies.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .caching import get_version
+
+
+def queryset_validator(queryset, timestamp_fields, count_fields=()):
+    """(row counts, newest timestamp or None) of a queryset in one query
+
+    The counts are the rows themselves plus the distinct related rows in
+    `count_fields`, which catch deletions of embedded rows (a removed player
+    leaves every remaining updated_at as it was).
+    """
+    aggregates = {f'max_{i}': Max(field) for i, field in enumerate(timestamp_fields)}
+    aggregates.update({f'count_{i}': Count(field, distinct=True) for i, field in enumerate(count_fields)})
+    values = queryset.order_by().aggregate(row_count=Count('pk', distinct=True), **aggregates)
+    timestamps = [values[f'max_{i}'] for i in range(len(timestamp_fields)) if values[f'max_{i}']]
+    counts = [values['row_count'], *(values[f'count_{i}'] for i in range(len(count_fields)))]
+    return counts, max(timestamps, default=None)
+
+
+def conditional_response(request, queryset, timestamp_fields, render, extra='', count_fields=()):
+    """Answer 304 if the client's ETag is current, else render() with a new one"""
+    counts, last_modified = queryset_validator(queryset, timestamp_fields, count_fields)
+    # Responses are per user and per query, so both go into the tag
+    source = '|'.join([
+        request.get_full_path(), str(request.user.pk), ','.join(map(str, counts)),
+        last_modified.isoformat() if last_modified else '', extra,
+    ])
+    etag = quote_etag(hashlib.sha1(source.encode()).hexdigest())
+
+    if get_conditional_response(request, etag=etag) is not None:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = render()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    response['ETag'] = etag
+    # Clients must revalidate, and shared caches must not mix users
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+class ConditionalGetMixin:
+    """ETag on list and retrieve.
+
+    `conditional_fields` lists the timestamp fields that change when the
+    serialized output changes, including related paths such as
+    'slot__updated_at'. `conditional_counts` lists related rows whose
+    deletion changes the output (nested lists, per-row counts). Cached
+    reference viewsets also fold in their core.caching version, which
+    moves on changes the rows cannot show (deleted or related rows,
+    blackout dates) and on the day rolling over.
+    """
+    conditional_fields = ('updated_at',)
+    conditional_counts = ()
+
+    def conditional_extra(self):
+        namespace = getattr(self, 'cache_namespace', None)
+        if namespace is None:
+            return ''
+        return f'{namespace}:{get_version(namespace)}:{timezone.localdate()}'
+
+    def conditional(self, request, queryset, render):
+        return conditional_response(
+            request, queryset, self.conditional_fields, render, self.conditional_extra(), self.conditional_counts
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional(request, queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        render = lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            return render()  # malformed id; retrieve() answers 404
+        return self.conditional(request, queryset, render)
@@ -0,0 +1,168 @@
+"""
+Streaming data exports for Red Ball Cricket Academy
+
+Rows are read with values_list(...).iterator() and written out one at a
+time, so memory stays flat regardless of table size.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Booking, CheckInLog, OrganizerCheckInLog, Player, TimeSlot, UserCheckInLog
+
+EXPORT_CHUNK_SIZE = 2000
+OUTPUT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class ExportSpec:
+    """Describes one exportable table: its rows, columns and filter lookups"""
+
+    def __init__(self, model, columns, date_lookup, sport_lookup=None):
+        self.model = model
+        self.columns = columns  # [(header, lookup), ...]
+        self.date_lookup = date_lookup
+        self.sport_lookup = sport_lookup  # None: rows are not tied to a sport
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, start=None, end=None, sport_id=None):
+        queryset = self.model.objects.all()
+        if start:
+            queryset = queryset.filter(**{f'{self.date_lookup}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{self.date_lookup}__lte': end})
+        if sport_id:
+            queryset = queryset.filter(**{self.sport_lookup: sport_id})
+        return queryset.order_by('pk').values_list(*[lookup for _, lookup in self.columns])
+
+
+EXPORTS = {
+    'bookings': ExportSpec(
+        Booking,
+        [
+            ('id', 'id'),
+            ('user_email', 'user__email'),
+            ('sport', 'slot__sport__name'),
+            ('slot_date', 'slot__date'),
+            ('start_time', 'slot__start_time'),
+            ('end_time', 'slot__end_time'),
+            ('status', 'status'),
+            ('payment_verified', 'payment_verified'),
+            ('amount_paid', 'amount_paid'),
+            ('payment_id', 'payment_id'),
+            ('order_id', 'order_id'),
+            ('is_cancelled', 'is_cancelled'),
+            ('created_at', 'created_at'),
+        ],
+        date_lookup='slot__date',
+        sport_lookup='slot__sport_id',
+    ),
+    'players': ExportSpec(
+        Player,
+        [
+            ('id', 'id'),
+            ('name', 'name'),
+            ('email', 'email'),
+            ('phone', 'phone'),
+            ('booking_id', 'booking_id'),
+            ('sport', 'booking__slot__sport__name'),
+            ('slot_date', 'booking__slot__date'),
+            ('check_in_count', 'check_in_count'),
+            ('is_in', 'is_in'),
+            ('last_check_in', 'last_check_in'),
+            ('last_check_out', 'last_check_out'),
+            ('created_at', 'created_at'),
+        ],
+        date_lookup='booking__slot__date',
+        sport_lookup='booking__slot__sport_id',
+    ),
+    'slots': ExportSpec(
+        TimeSlot,
+        [
+            ('id', 'id'),
+            ('sport', 'sport__name'),
+            ('date', 'date'),
+            ('start_time', 'start_time'),
+            ('end_time', 'end_time'),
+            ('price', 'price'),
+            ('is_booked', 'is_booked'),
+            ('admin_disabled', 'admin_disabled'),
+            ('max_players', 'max_players'),
+        ],
+        date_lookup='date',
+        sport_lookup='sport_id',
+    ),
+    'checkins': ExportSpec(
+        CheckInLog,
+        [
+            ('id', 'id'),
+            ('player_name', 'player__name'),
+            ('player_email', 'player__email'),
+            ('booking_id', 'player__booking_id'),
+            ('sport', 'player__booking__slot__sport__name'),
+            ('action', 'action'),
+            ('timestamp', 'timestamp'),
+            ('location', 'location'),
+        ],
+        date_lookup='timestamp__date',
+        sport_lookup='player__booking__slot__sport_id',
+    ),
+    'user_checkins': ExportSpec(
+        UserCheckInLog,
+        [
+            ('id', 'id'),
+            ('user_email', 'user__email'),
+            ('action', 'action'),
+            ('timestamp', 'timestamp'),
+        ],
+        date_lookup='timestamp__date',
+    ),
+    'organizer_checkins': ExportSpec(
+        OrganizerCheckInLog,
+        [
+            ('id', 'id'),
+            ('user_email', 'user__email'),
+            ('booking_id', 'booking_id'),
+            ('sport', 'booking__slot__sport__name'),
+            ('action', 'action'),
+            ('timestamp', 'timestamp'),
+        ],
+        date_lookup='timestamp__date',
+        sport_lookup='booking__slot__sport_id',
+    ),
+}
+
+
+class Echo:
+    """File-like object whose write() just returns the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(spec, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(spec.headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(spec, rows):
+    headers = spec.headers
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_export(kind, output='csv', start=None, end=None, sport_id=None):
+    """Return a generator of encoded lines for the requested export"""
+    spec = EXPORTS[kind]
+    rows = spec.queryset(start, end, sport_id).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    if output == 'jsonl':
+        return stream_jsonl(spec, rows)
+    return stream_csv(spec, rows)
@@ -0,0 +1,215 @@
+"""
+Plain-dict serializers for the hot read paths of Red Ball Cricket Academy
+
+The slot list, my_bookings and players/me are read far more than anything
+else, and DRF's per-field machinery costs more than their queries. These
+functions read rows with values() in a fixed number of queries and build
+the same dicts (same keys, order and formatting) as TimeSlotSerializer,
+BookingListSerializer and PlayerSerializer. Scalar formatting reuses DRF field
+instances, so dates, times and decimals stay identical. They only apply to
+the default representation; ?fields= / ?expand= go through the regular
+serializers.
+"""
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import BlackoutDate, Booking, Player, TimeSlot
+
+_datetime = serializers.DateTimeField().to_representation
+_date = serializers.DateField().to_representation
+_time = serializers.TimeField().to_representation
+_money = serializers.DecimalField(max_digits=10, decimal_places=2).to_representation
+
+SPORT_FIELDS = ['id', 'name', 'price_per_hour', 'description', 'duration', 'max_players', 'is_active',
+                'created_at', 'updated_at']
+SLOT_FIELDS = ['id', 'sport_id', 'date', 'start_time', 'end_time', 'price', 'is_booked', 'admin_disabled',
+               'max_players', 'created_at', 'updated_at']
+PLAYER_FIELDS = ['id', 'booking_id', 'name', 'email', 'phone', 'qr_code', 'qr_token', 'check_in_count',
+                 'last_check_in', 'last_check_out', 'created_at', 'is_in']
+
+PLAYER_STATUS = {0: 'Registered', 1: 'Checked In'}
+
+
+def uses_default_fields(request):
+    """True unless the request asks for a sparse or expanded representation"""
+    return 'fields' not in request.query_params and 'expand' not in request.query_params
+
+
+def _prefixed(prefix, fields):
+    return [f'{prefix}{name}' for name in fields]
+
+
+def _unprefixed(row, prefix, fields):
+    return {name: row[f'{prefix}{name}'] for name in fields}
+
+
+def _file_urls(model, field_name, request):
+    """(ImageField representation, *_url method field) for a stored file name"""
+    storage = model._meta.get_field(field_name).storage
+
+    def urls(name):
+        if not name:
+            return None, None
+        url = storage.url(name)
+        if request is None:
+            return url, None
+        url = request.build_absolute_uri(url)
+        return url, url
+    return urls
+
+
+def _blackouts(slots):
+    """(sport_id, date) pairs with an active blackout, as TimeSlot.is_available checks"""
+    if not slots:
+        return set()
+    return set(
+        BlackoutDate.objects.filter(
+            sport_id__in={slot['sport_id'] for slot in slots},
+            date__in={slot['date'] for slot in slots},
+            is_active=True,
+        )
+        .values_list('sport_id', 'date')
+    )
+
+
+def _free_slot_counts(sport_ids):
+    rows = (
+        TimeSlot.objects.filter(sport_id__in=sport_ids, is_booked=False)
+        .order_by().values('sport_id').annotate(count=Count('id'))
+    )
+    counts = {row['sport_id']: row['count'] for row in rows}
+    return {sport_id: counts.get(sport_id, 0) for sport_id in sport_ids}
+
+
+def _sport(sport, free_slots):
+    return {
+        'id': sport['id'],
+        'name': sport['name'],
+        'price_per_hour': _money(sport['price_per_hour']),
+        'description': sport['description'],
+        'duration': sport['duration'],
+        'max_players': sport['max_players'],
+        'is_active': sport['is_active'],
+        'created_at': _datetime(sport['created_at']),
+        'updated_at': _datetime(sport['updated_at']),
+        'available_slots_count': free_slots,
+    }
+
+
+def _slot(slot, sport, blackouts, today, free_slots=None):
+    """TimeSlotSerializer output; sport_details only when free_slots is given"""
+    available = not (slot['is_booked'] or slot['admin_disabled'] or slot['date'] < today) and (
+        (slot['sport_id'], slot['date']) not in blackouts
+    )
+    data = {'id': slot['id'], 'sport': slot['sport_id'], 'sport_name': sport['name']}
+    if free_slots is not None:
+        data['sport_details'] = _sport(sport, free_slots[sport['id']])
+    data.update({
+        'date': _date(slot['date']),
+        'start_time': _time(slot['start_time']),
+        'end_time': _time(slot['end_time']),
+        'price': _money(slot['price']),
+        'is_booked': slot['is_booked'],
+        'admin_disabled': slot['admin_disabled'],
+        'max_players': slot['max_players'],
+        'is_available': available,
+        'created_at': _datetime(slot['created_at']),
+        'updated_at': _datetime(slot['updated_at']),
+    })
+    return data
+
+
+def slot_rows(queryset, sport_details=False):
+    """TimeSlotSerializer(many=True).data for a TimeSlot queryset"""
+    rows = list(queryset.values(*SLOT_FIELDS, *_prefixed('sport__', SPORT_FIELDS)))
+    blackouts = _blackouts(rows)
+    free_slots = _free_slot_counts({row['sport_id'] for row in rows}) if sport_details else None
+    today = timezone.now().date()
+    return [
+        _slot(row, _unprefixed(row, 'sport__', SPORT_FIELDS), blackouts, today, free_slots)
+        for row in rows
+    ]
+
+
+def _player(player, booking_details, player_urls):
+    qr_code, qr_code_url = player_urls(player['qr_code'])
+    return {
+        'id': player['id'],
+        'booking': player['booking_id'],
+        'name': player['name'],
+        'email': player['email'],
+        'phone': player['phone'],
+        'qr_code': qr_code,
+        'qr_token': player['qr_token'],
+        'qr_code_url': qr_code_url,
+        'check_in_count': player['check_in_count'],
+        'status': PLAYER_STATUS.get(player['check_in_count'], 'Checked Out'),
+        'last_check_in': _datetime(player['last_check_in']) if player['last_check_in'] else None,
+        'last_check_out': _datetime(player['last_check_out']) if player['last_check_out'] else None,
+        'booking_details': booking_details,
+        'created_at': _datetime(player['created_at']),
+        'is_in': player['is_in'],
+    }
+
+
+def _booking_details(booking_id, slot, sport_name, organizer):
+    """PlayerSerializer.get_booking_details; values stay raw like the method field"""
+    return {
+        'id': booking_id,
+        'slot_date': slot['date'],
+        'sport': sport_name,
+        'start_time': slot['start_time'],
+        'end_time': slot['end_time'],
+        'organizer': organizer['email'],
+        'organizer_name': f"{organizer['first_name']} {organizer['last_name']}".strip() or organizer['email'],
+    }
+
+
+def player_rows(queryset, request=None):
+    """PlayerSerializer(many=True).data for a Player queryset"""
+    rows = queryset.values(
+        *PLAYER_FIELDS,
+        'booking__slot__date', 'booking__slot__start_time', 'booking__slot__end_time',
+        'booking__slot__sport__name', 'booking__user__email', 'booking__user__first_name',
+        'booking__user__last_name',
+    )
+    player_urls = _file_urls(Player, 'qr_code', request)
+    return [
+        _player(row, _booking_details(
+            row['booking_id'],
+            {name: row[f'booking__slot__{name}'] for name in ('date', 'start_time', 'end_time')},
+            row['booking__slot__sport__name'],
+            _unprefixed(row, 'booking__user__', ['email', 'first_name', 'last_name']),
+        ), player_urls)
+        for row in rows
+    ]
+
+
+def booking_list_rows(queryset, request=None):
+    """BookingListSerializer(many=True).data for a Booking queryset annotated with player_count"""
+    rows = queryset.values(
+        'id', 'slot_id', 'slot__date', 'slot__start_time', 'slot__end_time', 'slot__sport_id',
+        'slot__sport__name', 'status', 'payment_verified', 'is_cancelled', 'amount_paid', 'player_count',
+        'organizer_qr_token', 'organizer_qr_code', 'organizer_is_in', 'created_at', 'updated_at',
+    )
+    organizer_urls = _file_urls(Booking, 'organizer_qr_code', request)
+    return [{
+        'id': row['id'],
+        'slot': row['slot_id'],
+        'slot_date': _date(row['slot__date']),
+        'start_time': _time(row['slot__start_time']),
+        'end_time': _time(row['slot__end_time']),
+        'sport': row['slot__sport_id'],
+        'sport_name': row['slot__sport__name'],
+        'status': row['status'],
+        'payment_verified': row['payment_verified'],
+        'is_cancelled': row['is_cancelled'],
+        'amount_paid': _money(row['amount_paid']) if row['amount_paid'] is not None else None,
+        'player_count': row['player_count'],
+        'organizer_qr_token': row['organizer_qr_token'],
+        'organizer_qr_code_url': organizer_urls(row['organizer_qr_code'])[1],
+        'organizer_is_in': row['organizer_is_in'],
+        'created_at': _datetime(row['created_at']),
+        'updated_at': _datetime(row['updated_at']),
+    } for row in rows]
@@ -0,0 +1,178 @@
+"""
+Sparse fieldsets and explicit expansion for Red Ball Cricket Academy
+
+Every output serializer accepts two query params on GET requests:
+
+    ?fields=id,status,slot_details.date     only these (dotted for nested)
+    ?expand=slot_details.sport_details      include these expandable fields
+
+Fields listed in a serializer's Meta.expandable_fields (nested objects and
+per-row count queries) are left out of `list` actions unless expanded or
+named in ?fields=; detail views and custom actions keep the full output.
+
+FieldsetQuerysetMixin walks the fields that will actually be rendered and
+adds the matching select_related/prefetch_related to the viewset queryset.
+Method fields declare the relations they read in Meta.field_relations.
+Viewsets add what their own code walks in `eager_loading`, keyed by action
+('*' for every action), e.g. {'*': ['slot__sport'], 'cancel': ['players']}.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_fieldset(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def _nested(field):
+    """The DynamicFieldsMixin serializer behind a field, or None"""
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    return field if isinstance(field, DynamicFieldsMixin) else None
+
+
+class DynamicFieldsMixin:
+    """Prunes fields per ?fields= / ?expand= and lean list defaults"""
+
+    def _root_fieldset(self):
+        request = self.context.get('request')
+        view = self.context.get('view')
+        if request is None or request.method not in SAFE_METHODS:
+            return None, {}, False
+        only = request.query_params.get('fields')
+        lean = view is not None and getattr(view, 'action', None) in getattr(view, 'lean_actions', ('list',))
+        return (parse_fieldset(only) if only else None), parse_fieldset(request.query_params.get('expand')), lean
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = getattr(self, '_fieldset', None)
+        if fieldset is None:
+            fieldset = self._root_fieldset()
+        only, expand, lean = fieldset
+        expandable = getattr(self.Meta, 'expandable_fields', ())
+
+        for name in list(fields):
+            if only is not None:
+                keep = name in only
+            else:
+                keep = not (lean and name in expandable and name not in expand)
+            if not keep:
+                del fields[name]
+                continue
+            nested = _nested(fields[name])
+            if nested is not None:
+                child_only = (only or {}).get(name) or None
+                nested._fieldset = (child_only, expand.get(name, {}), lean)
+        return fields
+
+
+# Eager loading derived from the rendered fields
+
+def _relation_hops(model, path):
+    """Split a '__' path into (select part, prefetch-from index or None)"""
+    parts = path.split('__')
+    for index, name in enumerate(parts):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return parts[:index], None
+        if not field.is_relation:
+            return parts[:index], None
+        if field.many_to_many or field.one_to_many:
+            return parts[:index], index
+        model = field.related_model
+    return parts, None
+
+
+def _add_path(plan, model, path):
+    select, many_at = _relation_hops(model, path)
+    if many_at is None:
+        if select:
+            plan['select'].add('__'.join(select))
+    else:
+        plan['prefetch'].add('__'.join(path.split('__')[:many_at + 1]))
+
+
+def eager_plan(serializer, model):
+    """select_related paths, prefetch_related paths and Prefetch objects for the rendered fields"""
+    plan = {'select': set(), 'prefetch': set(), 'prefetch_objects': []}
+    relations = getattr(getattr(serializer, 'Meta', None), 'field_relations', {})
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        for path in relations.get(name, ()):
+            _add_path(plan, model, path)
+        source = getattr(field, 'source', None)
+        if not source or source == '*':
+            continue
+        path = source.replace('.', '__')
+        nested = _nested(field)
+        if nested is None:
+            # e.g. sport_name = CharField(source='sport.name')
+            _add_path(plan, model, path.rsplit('__', 1)[0] if '__' in path else '')
+            continue
+        child_model = nested.Meta.model
+        if isinstance(field, serializers.ListSerializer):
+            child = eager_plan(nested, child_model)
+            back_reference = model._meta.get_field(path).remote_field.name
+            # Prefetching a reverse FK already caches the parent on each child
+            child_selects = [p for p in child['select'] if p.split('__')[0] != back_reference]
+            child_queryset = child_model.objects.prefetch_related(*child['prefetch'], *child['prefetch_objects'])
+            if child_selects:
+                child_queryset = child_queryset.select_related(*child_selects)
+            plan['prefetch_objects'].append(Prefetch(path, queryset=child_queryset))
+        else:
+            plan['select'].add(path)
+            child = eager_plan(nested, child_model)
+            plan['select'].update(f'{path}__{p}' for p in child['select'])
+            plan['prefetch'].update(f'{path}__{p}' for p in child['prefetch'])
+            plan['prefetch_objects'].extend(
+                Prefetch(f'{path}__{p.prefetch_through}', queryset=p.queryset) for p in child['prefetch_objects']
+            )
+    plan['select'].discard('')
+    return plan
+
+
+def apply_eager_plan(queryset, serializer=None, paths=()):
+    """Eager-load what `serializer` renders plus the declared relation `paths`"""
+    if serializer is not None:
+        plan = eager_plan(serializer, queryset.model)
+    else:
+        plan = {'select': set(), 'prefetch': set(), 'prefetch_objects': []}
+    for path in paths:
+        _add_path(plan, queryset.model, path)
+    if plan['select']:
+        queryset = queryset.select_related(*sorted(plan['select']))
+    # A Prefetch object for a path replaces the plain lookup of the same path
+    prefetch = sorted(plan['prefetch'] - {p.prefetch_to for p in plan['prefetch_objects']})
+    if prefetch or plan['prefetch_objects']:
+        queryset = queryset.prefetch_related(*prefetch, *plan['prefetch_objects'])
+    return queryset
+
+
+class FieldsetQuerysetMixin:
+    """Eager loading for the declared `eager_loading` plan and, on reads, the requested fieldset"""
+    eager_loading = {}
+
+    def eager_loading_paths(self):
+        plan = self.eager_loading
+        return [*plan.get('*', ()), *plan.get(getattr(self, 'action', None), ())]
+
+    def eager(self, queryset, serializer_class=None):
+        """Declared plan plus what the serializer will render for this request"""
+        serializer = None
+        if self.request.method in SAFE_METHODS:
+            serializer_class = serializer_class or self.get_serializer_class()
+            serializer = serializer_class(context=self.get_serializer_context())
+        return apply_eager_plan(queryset, serializer, self.eager_loading_paths())
+
+    def filter_queryset(self, queryset):
+        return self.eager(super().filter_queryset(queryset))
@@ -0,0 +1,110 @@
+"""
+Idempotency-Key support for Red Ball Cricket Academy
+
+Mobile clients retry POSTs on flaky networks. A request carrying an
+Idempotency-Key header claims a row in IdempotencyRecord before the view
+runs; the first response is stored there and returned as-is for retries
+of the same request within IDEMPOTENCY_TTL, without re-running the view.
+A claim still in progress after IDEMPOTENCY_LEASE belongs to a worker that
+died mid-request; the next retry takes it over instead of getting 409s for
+the rest of the day.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_TTL = timedelta(hours=24)
+# Longer than any request may run (gunicorn's timeout is well under this)
+IDEMPOTENCY_LEASE = timedelta(minutes=5)
+
+
+def request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _claim(request, key, fingerprint):
+    """Insert the in-progress record; returns (record, None) or (None, response to send instead)"""
+    lookup = {'user': request.user, 'endpoint': f"{request.method} {request.path}", 'key': key}
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(request_hash=fingerprint, **lookup), None
+        except IntegrityError:
+            existing = IdempotencyRecord.objects.filter(**lookup).first()
+        if existing is None:
+            continue  # Deleted in the meantime (failed or expired); claim again
+        if existing.created_at < timezone.now() - IDEMPOTENCY_TTL:
+            existing.delete()
+            continue
+        if existing.status_code is None and existing.created_at < timezone.now() - IDEMPOTENCY_LEASE:
+            # Only the retry whose delete wins re-claims; a racing one gets the 409 below
+            IdempotencyRecord.objects.filter(pk=existing.pk, status_code__isnull=True).delete()
+            continue
+        if existing.request_hash != fingerprint:
+            return None, Response(
+                {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if existing.status_code is None:
+            return None, Response(
+                {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'},
+                status=status.HTTP_409_CONFLICT,
+            )
+        replay = Response(existing.response_body, status=existing.status_code)
+        replay['Idempotent-Replayed'] = 'true'
+        return None, replay
+    return None, Response(
+        {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed'},
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def idempotent(view):
+    """Honor Idempotency-Key on a DRF view function or viewset method.
+
+    Requests without the header, or from anonymous users, run normally.
+    Server errors are not stored, so the client can retry them.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': f'{IDEMPOTENCY_HEADER} is too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        record, early_response = _claim(request, key, request_hash(request))
+        if early_response is not None:
+            return early_response
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            # update(), not save(): a lease-expired claim may already be gone
+            IdempotencyRecord.objects.filter(pk=record.pk).update(
+                status_code=response.status_code, response_body=response.data
+            )
+        return response
+    return wrapper
+
+
+def purge_idempotency_records():
+    cutoff = timezone.now() - IDEMPOTENCY_TTL
+    deleted, _ = IdempotencyRecord.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,92 @@
+import gzip
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from core.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+
+
+def slot_payload(rows):
+    """Shaped like the unpaginated TimeSlotSerializer list"""
+    sport = {
+        'id': 1, 'name': 'Box Cricket', 'price_per_hour': '1200.00', 'description': 'Floodlit turf',
+        'duration': 60, 'max_players': 12, 'is_active': True, 'created_at': '2025-01-05T10:00:00.123Z',
+        'updated_at': '2025-03-01T08:30:00.456Z', 'available_slots_count': rows,
+    }
+    today = date(2025, 6, 1)
+    return [{
+        'id': i, 'sport': 1, 'sport_name': 'Box Cricket', 'sport_details': sport,
+        'date': (today + timedelta(days=i // 16)).isoformat(), 'start_time': f'{6 + i % 16:02d}:00:00',
+        'end_time': f'{7 + i % 16:02d}:00:00', 'price': '1200.00', 'is_booked': i % 3 == 0,
+        'admin_disabled': False, 'max_players': 12, 'is_available': i % 3 != 0,
+        'created_at': '2025-05-20T09:00:00.000Z', 'updated_at': '2025-05-21T09:00:00.000Z',
+    } for i in range(rows)]
+
+
+def booking_payload(rows, players=6):
+    """Shaped like BookingSerializer output: slot, user and every player nested"""
+    slots = slot_payload(rows)
+    return [{
+        'id': i, 'user': 7, 'user_details': {'id': 7, 'email': 'organizer@example.com', 'first_name': 'Ravi'},
+        'slot': slot['id'], 'slot_details': slot,
+        'players': [{
+            'id': i * players + p, 'booking': i, 'name': f'Player {p}', 'email': f'player{p}@example.com',
+            'phone': '9876543210', 'qr_code': f'qr_codes/player_{p}.png', 'qr_token': 'x' * 120,
+            'qr_code_url': f'https://example.com/media/qr_codes/player_{p}.png', 'check_in_count': 0,
+            'status': 'Not checked in', 'last_check_in': None, 'last_check_out': None,
+            'booking_details': {'id': i, 'slot_date': slot['date'], 'sport': 'Box Cricket',
+                                'start_time': slot['start_time'], 'end_time': slot['end_time'],
+                                'organizer': 'organizer@example.com', 'organizer_name': 'Ravi'},
+            'created_at': '2025-05-22T10:00:00.000Z', 'is_in': False,
+        } for p in range(players)],
+        'player_count': players, 'created_at': '2025-05-22T10:00:00.000Z', 'updated_at': '2025-05-22T10:05:00.000Z',
+        'payment_verified': True, 'payment_id': 'pay_123', 'order_id': 'order_123', 'amount_paid': '1200.00',
+        'is_cancelled': False, 'cancellation_reason': None, 'status': 'confirmed',
+    } for i, slot in enumerate(slots)]
+
+
+def analytics_payload(rows):
+    """Raw Python values, as the analytics endpoints return them"""
+    start = date(2025, 1, 1)
+    return {'series': [
+        {'date': start + timedelta(days=i), 'sport_id': i % 4, 'revenue': Decimal('1234.50') * (i % 7),
+         'bookings': i % 11, 'utilization': round((i % 10) / 10, 2)}
+        for i in range(rows)
+    ]}
+
+
+class Command(BaseCommand):
+    help = 'Compare render time and payload size of the JSON, orjson and MessagePack renderers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Rows per payload')
+        parser.add_argument('--repeat', type=int, default=20, help='Renders per measurement')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        renderers = [('json', JSONRenderer())]
+        if orjson is not None:
+            renderers.append(('orjson', ORJSONRenderer()))
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+        payloads = [
+            ('slots', slot_payload(rows)),
+            ('bookings', booking_payload(rows)),
+            ('analytics', analytics_payload(rows)),
+        ]
+
+        self.stdout.write(f"{'payload':<10} {'renderer':<8} {'ms/render':>10} {'bytes':>10} {'gzipped':>10}")
+        for payload_name, data in payloads:
+            for renderer_name, renderer in renderers:
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    body = renderer.render(data)
+                elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+                self.stdout.write(
+                    f"{payload_name:<10} {renderer_name:<8} {elapsed_ms:>10.2f} {len(body):>10} "
+                    f"{len(gzip.compress(body)):>10}"
+                )
+        self.stdout.write(self.style.SUCCESS(f'Benchmarked {len(payloads)} payloads of {rows} rows'))
@@ -0,0 +1,83 @@
+import time
+from datetime import time as dt_time, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core import fastserializers
+from core.fieldsets import apply_eager_plan
+from core.models import Booking, CustomUser, Player, Sport, TimeSlot
+from core.serializers import BookingListSerializer, BookingSerializer, PlayerSerializer, TimeSlotSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare per-object cost of the DRF serializers and the plain-dict fast paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200, help='Slots/bookings to create (rolled back)')
+        parser.add_argument('--players', type=int, default=6, help='Players per booking')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['players'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('Benchmark data rolled back'))
+
+    def seed(self, rows, players):
+        user = CustomUser.objects.create_user(email='benchmark-organizer@example.com', first_name='Bench')
+        sport = Sport.objects.create(name='Benchmark Nets', price_per_hour=500)
+        start = timezone.now().date()
+        slots = TimeSlot.objects.bulk_create([
+            TimeSlot(sport=sport, date=start + timedelta(days=i // 16), start_time=dt_time(6 + i % 16),
+                     end_time=dt_time(7 + i % 16), price=500)
+            for i in range(rows)
+        ])
+        bookings = Booking.objects.bulk_create([Booking(user=user, slot=slot) for slot in slots])
+        Player.objects.bulk_create([
+            Player(booking=booking, name=f'Player {n}', email=f'bench{booking.pk}-{n}@example.com', user=user)
+            for booking in bookings for n in range(players)
+        ])
+        return user, sport
+
+    def measure(self, label, count, repeat, render):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        per_object = (time.perf_counter() - started) * 1e6 / repeat / max(count, 1)
+        self.stdout.write(f'{label:<36} {per_object:>10.1f} us/object')
+
+    def run(self, rows, players, repeat):
+        user, sport = self.seed(rows, players)
+        request = Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))
+        context = {'request': request}
+
+        slots = TimeSlot.objects.filter(sport=sport).order_by('date', 'start_time')
+        bookings = Booking.objects.filter(user=user).order_by('-created_at')
+        summaries = bookings.annotate(player_count=Count('players'))
+        player_rows = Player.objects.filter(user=user)
+
+        self.measure('slots: TimeSlotSerializer', rows, repeat, lambda: TimeSlotSerializer(
+            apply_eager_plan(slots, TimeSlotSerializer(context=context)), many=True, context=context).data)
+        self.measure('slots: fast', rows, repeat, lambda: fastserializers.slot_rows(slots, sport_details=True))
+        self.measure('bookings: BookingSerializer', rows, repeat, lambda: BookingSerializer(
+            apply_eager_plan(bookings, BookingSerializer(context=context)), many=True, context=context).data)
+        self.measure('my_bookings: BookingListSerializer', rows, repeat, lambda: BookingListSerializer(
+            apply_eager_plan(summaries, BookingListSerializer(context=context)), many=True, context=context).data)
+        self.measure('my_bookings: fast', rows, repeat,
+                     lambda: fastserializers.booking_list_rows(summaries, request))
+        self.measure('players/me: PlayerSerializer', rows * players, repeat, lambda: PlayerSerializer(
+            apply_eager_plan(player_rows, PlayerSerializer(context=context)), many=True, context=context).data)
+        self.measure('players/me: fast', rows * players, repeat,
+                     lambda: fastserializers.player_rows(player_rows, request))
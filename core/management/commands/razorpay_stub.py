@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.razorpay_stub import StubServer, StubState
+
+class Command(BaseCommand):
+    help = 'Run an in-memory fake Razorpay API for local testing and load runs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9100)
+        parser.add_argument('--latency-ms', type=int, default=0, help='Delay added to every response')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+
+    def handle(self, *args, **options):
+        state = StubState(
+            settings.RAZORPAY_KEY_SECRET or 'stub_secret',
+            latency=options['latency_ms'] / 1000,
+            failure_rate=options['failure_rate'],
+        )
+        server = StubServer((options['host'], options['port']), state)
+        self.stdout.write(self.style.SUCCESS(
+            f'Razorpay stub listening on {server.base_url} (set RAZORPAY_BASE_URL to use it)'
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from core.reconciliation import CHUNK_SIZE, RECONCILE_DAYS, reconcile_payments
+
+class Command(BaseCommand):
+    help = 'Confirm pending bookings whose Razorpay payment was captured and store missing order ids'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=RECONCILE_DAYS, help='Look at bookings created in the last N days')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Report corrections without saving them')
+
+    def handle(self, *args, **options):
+        report = reconcile_payments(days=options['days'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        for row in report:
+            self.stdout.write(
+                f"Booking #{row['booking_id']}: {row['action']} (order {row['order_id']}, payment {row['payment_id'] or '-'})"
+            )
+        verb = 'Would correct' if options['dry_run'] else 'Corrected'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(report)} bookings'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.analytics import refresh_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute revenue and utilization rollups for days changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rebuild rollups for every date')
+
+    def handle(self, *args, **options):
+        count = refresh_rollups(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully refreshed rollups for {count} days'))
@@ -0,0 +1,16 @@
+"""
+Response compression for Red Ball Cricket Academy
+
+Large JSON payloads (the unpaginated slot list, nested bookings) compress
+several-fold; small ones are not worth the CPU, so only bodies of at least
+GZIP_MIN_LENGTH bytes (and streamed exports) are gzipped.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_LENGTH:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.8 on 2026-10-19 13:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySportRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('slots_offered', models.IntegerField(default=0)),
+                ('slots_booked', models.IntegerField(default=0)),
+                ('peak_slots_offered', models.IntegerField(default=0)),
+                ('peak_slots_booked', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sport', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='core.sport')),
+            ],
+            options={
+                'verbose_name': 'Daily Sport Rollup',
+                'verbose_name_plural': 'Daily Sport Rollups',
+                'ordering': ['date', 'sport'],
+                'unique_together': {('sport', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.8 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_daily_sport_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='checkinlog',
+            index=models.Index(fields=['timestamp'], name='core_checki_timesta_50cba3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='organizercheckinlog',
+            index=models.Index(fields=['timestamp'], name='core_organi_timesta_a0ad44_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercheckinlog',
+            index=models.Index(fields=['timestamp'], name='core_userch_timesta_ccce29_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-19 13:40
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_outbox_message'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='core_user_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.8 on 2026-10-19 13:44
+
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Lower, Trim
+
+BATCH_SIZE = 500
+
+
+def normalize_user_emails(apps, schema_editor):
+    """Lower-case stored emails in batches.
+
+    Rows whose lower-cased email already belongs to another account are left
+    as they are; case-insensitive lookups still find them.
+    """
+    User = apps.get_model('core', 'CustomUser')
+    pending = (
+        User.objects.annotate(normalized=Lower(Trim('email')))
+        .exclude(email=F('normalized'))
+        .order_by('pk')
+    )
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        taken = set(
+            User.objects.filter(email__in=[user.normalized for user in batch]).values_list('email', flat=True)
+        )
+        changed = []
+        for user in batch:
+            if user.normalized in taken:
+                continue
+            taken.add(user.normalized)
+            user.email = user.normalized
+            changed.append(user)
+        User.objects.bulk_update(changed, ['email'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_user_emails, migrations.RunPython.noop),
+    ]
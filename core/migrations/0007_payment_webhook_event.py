@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-19 13:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_normalize_user_emails'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=100, unique=True)),
+                ('event', models.CharField(max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('applied', models.BooleanField(default=False)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='webhook_events', to='core.booking')),
+            ],
+            options={
+                'verbose_name': 'Payment Webhook Event',
+                'verbose_name_plural': 'Payment Webhook Events',
+                'ordering': ['-received_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.8 on 2026-10-19 15:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_idempotency_record'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-19 18:40
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_player_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('sport', 'Sport'), ('slot', 'Slot'), ('booking', 'Booking'), ('player', 'Player')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('owner_id', models.BigIntegerField(blank=True, null=True)),
+                ('player_user_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Sync Tombstone',
+                'verbose_name_plural': 'Sync Tombstones',
+                'ordering': ['deleted_at'],
+                'indexes': [models.Index(fields=['kind', 'deleted_at'], name='core_syncto_kind_d9b117_idx')],
+            },
+        ),
+    ]
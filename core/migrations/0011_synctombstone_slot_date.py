@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-19 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_synctombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synctombstone',
+            name='slot_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_synctombstone_slot_date'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='synctombstone',
+            name='booking_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -2,8 +2,9 @@
 Models for Red Ball Cricket Academy Management System
 """
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
@@ -14,21 +15,29 @@ from django.core.files import File
 from PIL import Image
 import json
 from django.conf import settings
-from django.core.mail import send_mail
-try:
-    # Optional Celery task for async emails; fallback to direct send if unavailable
-    from .tasks import send_player_credentials_email  # type: ignore
-except Exception:
-    send_player_credentials_email = None
-try:
-    from .tasks import send_player_credentials_email
-except Exception:
-    send_player_credentials_email = None
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def normalize_email(email):
+    """Emails are stored and compared fully lower-cased"""
+    return (email or '').strip().lower()
 
 
 class CustomUserManager(BaseUserManager):
     """Custom user manager where email is the unique identifier"""
-    
+
+    @classmethod
+    def normalize_email(cls, email):
+        return normalize_email(email)
+
+    def get_by_natural_key(self, username):
+        email = normalize_email(username)
+        try:
+            return self.get(email=email)
+        except self.model.DoesNotExist:
+            # Legacy mixed-case rows the normalization migration had to skip
+            return self.get(email__lower=email)
+
     def create_user(self, email, password=None, **extra_fields):
         """Create and save a regular user with the given email and password"""
         if not email:
@@ -73,9 +82,17 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            # Serves the case-insensitive email__lower lookups
+            models.Index(Lower('email'), name='core_user_email_lower_idx'),
+        ]
     
     def __str__(self):
         return self.email
+
+    def save(self, *args, **kwargs):
+        self.email = normalize_email(self.email)
+        super().save(*args, **kwargs)
     
     def generate_qr_code(self):
         """Generate QR code and token for user"""
@@ -110,8 +127,16 @@ class CustomUser(AbstractUser):
         # Save to ImageField
         filename = f'user_{self.id}_qr.png'
         self.qr_code.save(filename, File(buffer), save=False)
-        
+
         return token
+
+
+# Enables email__lower=... lookups, which compile to LOWER(email) and use the
+# functional index above. Registered on this one field (a Django 4.2
+# instance lookup) rather than on every EmailField in the project.
+CustomUser._meta.get_field('email').register_lookup(Lower)
+
+
 class UserProfile(models.Model):
     USER_TYPE_CHOICES = (
         ('admin', 'Admin'),
@@ -135,6 +160,18 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         if hasattr(instance, 'profile'):
             instance.profile.save()
 
+# Drop the cached auth user whenever the user or their profile changes
+@receiver([post_save, post_delete], sender=CustomUser)
+def forget_cached_auth_user(sender, instance, **kwargs):
+    from .authentication import forget_user
+    forget_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def forget_cached_auth_user_profile(sender, instance, **kwargs):
+    from .authentication import forget_user
+    forget_user(instance.user_id)
+
 # Automatically generate QR code for users
 @receiver(post_save, sender=CustomUser)
 def ensure_user_qr_code(sender, instance, created, **kwargs):
@@ -450,6 +487,7 @@ class Player(models.Model):
     last_check_in = models.DateTimeField(null=True, blank=True)
     last_check_out = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -541,6 +579,7 @@ class CheckInLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['timestamp'])]
         verbose_name = 'Check-In Log'
         verbose_name_plural = 'Check-In Logs'
 
@@ -560,6 +599,7 @@ class UserCheckInLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['timestamp'])]
     
     def __str__(self):
         return f"{self.user.email} - {self.action} at {self.timestamp}"
@@ -578,6 +618,7 @@ class OrganizerCheckInLog(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [models.Index(fields=['timestamp'])]
     
     def __str__(self):
         return f"Booking #{self.booking.id} Organizer - {self.action} at {self.timestamp}"
@@ -586,90 +627,43 @@ class OrganizerCheckInLog(models.Model):
 # Automatically generate organizer QR when booking is confirmed
 @receiver(post_save, sender=Booking)
 def generate_organizer_qr_on_booking_confirm(sender, instance: Booking, created, **kwargs):
-    """Generate organizer QR code when booking is payment verified"""
+    """Queue the organizer QR render when booking is payment verified"""
     if instance.payment_verified and not instance.organizer_qr_token:
-        try:
-            instance.generate_organizer_qr_code()
-            instance.save(update_fields=['organizer_qr_token', 'organizer_qr_code'])
-        except Exception as e:
-            print(f"Failed to generate organizer QR for booking {instance.id}: {e}")
+        from .outbox import enqueue
+        enqueue('organizer_qr', {'booking_id': instance.id})
 
 
 # Automatically handle Player creation side-effects
 @receiver(post_save, sender=Player)
 def ensure_player_account_qr_and_email(sender, instance: Player, created, **kwargs):
     """On Player create:
-    - Create/attach a CustomUser with default password 'redball' if missing
-    - Ensure profile.user_type = 'player'
-    - Generate QR code if not present
-    - Email credentials and booking details
+    - Create/attach a CustomUser with an unusable password if missing
+    - Queue QR code rendering if not present
+    - Queue the activation/booking details email
+
+    Bulk onboarding goes through core.accounts.add_players, which does the
+    same for many players at once without firing this signal.
     """
     if not created:
         return
 
     player = instance
 
-    # 1) Create/attach user account
-    user = player.user
-    if not user and player.email:
-        # Try to find existing user by email
-        user = CustomUser.objects.filter(email__iexact=player.email).first()
-        if not user:
-            user = CustomUser.objects.create_user(
-                email=player.email,
-                password='redball',
-                first_name=player.name,
-            )
-        # Mark as player and attach
-        profile, _ = UserProfile.objects.get_or_create(user=user)
-        if profile.user_type != 'player':
-            profile.user_type = 'player'
-            profile.save()
-        # Save relation
-        player.user = user
-        player.save(update_fields=['user'])
-
-    # 2) Generate QR code if missing
+    # 1) Create/attach user account; no password hash until the player activates it
+    if not player.user_id and player.email:
+        from .accounts import get_or_create_player_users
+        email = normalize_email(player.email)
+        player.user = get_or_create_player_users({email: player.name})[email]
+        player.save(update_fields=['user', 'updated_at'])
+
+    # 2) Render the QR code and 3) send the activation email after commit, via the outbox.
+    # The dispatcher sends all pending credential emails over one connection; outside
+    # a request the activation link is built from SITE_URL.
+    from .outbox import enqueue
     if not player.qr_token:
-        try:
-            player.generate_qr_code()
-            player.save(update_fields=['qr_token', 'qr_code'])
-        except Exception as e:
-            print(f"Failed to generate QR for player {player.id}: {e}")
-            pass
-
-    # 3) Email credentials (best-effort). Prefer Celery if available
-    try:
-        booking = player.booking
-        slot = booking.slot if booking else None
-        sport_name = slot.sport.name if slot else ''
-        date_str = str(slot.date) if slot else ''
-        time_window = f"{slot.start_time} - {slot.end_time}" if slot else ''
-        if send_player_credentials_email:
-            send_player_credentials_email.delay(player.email, player.name, sport_name, date_str, time_window)
-        else:
-            send_mail(
-                subject='Your Player Account - Red Ball Cricket Academy',
-                message=(
-                    f"Hello {player.name},\n\n"
-                    f"An account has been created for you at Red Ball Cricket Academy.\n\n"
-                    f"Login Details:\n"
-                    f"Email: {player.email}\n"
-                    f"Temporary Password: redball\n\n"
-                    f"Booking Details:\n"
-                    f"Sport: {sport_name}\n"
-                    f"Date: {date_str}\n"
-                    f"Time: {time_window}\n\n"
-                    f"Use the app to view your QR code and check-in on the day of your booking.\n"
-                    f"For security, please change your password after first login.\n\n"
-                    f"Regards,\nRed Ball Cricket Academy"
-                ),
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[player.email] if player.email else [],
-                fail_silently=True,
-            )
-    except Exception:
-        pass
+        enqueue('player_qr', {'player_id': player.id})
+    if player.email:
+        enqueue('player_credentials_email', {'player_id': player.id})
 
 
 # Automatically generate QR code for new users
@@ -683,3 +677,177 @@ def ensure_user_qr_code(sender, instance: CustomUser, created, **kwargs):
         except Exception as e:
             print(f"Failed to generate QR for user {instance.id}: {e}")
             pass
+
+
+# Cached reference responses (core.caching) are invalidated by version bump
+@receiver([post_save, post_delete], sender=Sport)
+@receiver([post_save, post_delete], sender=BookingConfiguration)
+@receiver([post_save, post_delete], sender=BreakTime)
+@receiver([post_save, post_delete], sender=BlackoutDate)
+@receiver([post_save, post_delete], sender=TimeSlot)
+def invalidate_reference_cache(sender, instance, **kwargs):
+    from .caching import invalidate_model
+    invalidate_model(sender.__name__)
+
+
+class DailySportRollup(models.Model):
+    """Pre-aggregated revenue and slot utilization per sport per day"""
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    bookings_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    slots_offered = models.IntegerField(default=0)
+    slots_booked = models.IntegerField(default=0)
+    peak_slots_offered = models.IntegerField(default=0)
+    peak_slots_booked = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date', 'sport']
+        unique_together = ['sport', 'date']
+        verbose_name = 'Daily Sport Rollup'
+        verbose_name_plural = 'Daily Sport Rollups'
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.date}"
+
+
+class RollupCheckpoint(models.Model):
+    """Watermark of the last successful rollup refresh"""
+    name = models.CharField(max_length=50, unique=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_run_at}"
+
+
+class OutboxMessage(models.Model):
+    """Side effect (email, QR render, notification) written in the same
+    transaction as the change that caused it and dispatched after commit"""
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'available_at'])]
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+
+
+class PaymentWebhookEvent(models.Model):
+    """Razorpay webhook deliveries, one row per event id, so retries and
+    duplicate deliveries are applied at most once"""
+    event_id = models.CharField(max_length=100, unique=True)
+    event = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='webhook_events')
+    applied = models.BooleanField(default=False)  # Whether it changed booking state
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-received_at']
+        verbose_name = 'Payment Webhook Event'
+        verbose_name_plural = 'Payment Webhook Events'
+
+    def __str__(self):
+        return f"{self.event} {self.event_id}"
+
+
+class IdempotencyRecord(models.Model):
+    """First response to a request sent with an Idempotency-Key header,
+    replayed when the client retries the same request"""
+    user = models.ForeignKey('CustomUser', on_delete=models.CASCADE, related_name='idempotency_records')
+    endpoint = models.CharField(max_length=200)  # e.g. "POST /api/bookings/"
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # None while in progress
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        unique_together = ['user', 'endpoint', 'key']
+        verbose_name = 'Idempotency Record'
+        verbose_name_plural = 'Idempotency Records'
+
+    def __str__(self):
+        return f"{self.endpoint} [{self.key}]"
+
+
+class SyncTombstone(models.Model):
+    """Deleted sport, slot, booking or player, so delta sync can tell
+    clients to drop it from their local store and the analytics rollups
+    can recompute the day it was on"""
+    KIND_SPORT = 'sport'
+    KIND_SLOT = 'slot'
+    KIND_BOOKING = 'booking'
+    KIND_PLAYER = 'player'
+    KIND_CHOICES = (
+        (KIND_SPORT, 'Sport'),
+        (KIND_SLOT, 'Slot'),
+        (KIND_BOOKING, 'Booking'),
+        (KIND_PLAYER, 'Player'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Plain ids rather than foreign keys: tombstones outlive the rows they point at
+    owner_id = models.BigIntegerField(null=True, blank=True)  # Booking owner, for bookings and players
+    player_user_id = models.BigIntegerField(null=True, blank=True)  # Player's own account
+    slot_date = models.DateField(null=True, blank=True)  # Slot's date, for slots and bookings: rollups redo that day
+    booking_id = models.BigIntegerField(null=True, blank=True)  # Player's booking: sync re-sends its player_count
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [models.Index(fields=['kind', 'deleted_at'])]
+        verbose_name = 'Sync Tombstone'
+        verbose_name_plural = 'Sync Tombstones'
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} deleted {self.deleted_at}"
+
+
+SYNC_KINDS = {
+    Sport: SyncTombstone.KIND_SPORT,
+    TimeSlot: SyncTombstone.KIND_SLOT,
+    Booking: SyncTombstone.KIND_BOOKING,
+    Player: SyncTombstone.KIND_PLAYER,
+}
+
+
+@receiver(post_delete, sender=Sport)
+@receiver(post_delete, sender=TimeSlot)
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Player)
+def record_sync_tombstone(sender, instance, **kwargs):
+    owner_id = player_user_id = slot_date = booking_id = None
+    if sender is TimeSlot:
+        slot_date = instance.date
+    elif sender is Booking:
+        owner_id = instance.user_id
+        slot_date = TimeSlot.objects.filter(pk=instance.slot_id).values_list('date', flat=True).first()
+    elif sender is Player:
+        # Cascades delete players before their booking, so the row is still there
+        owner_id = Booking.objects.filter(pk=instance.booking_id).values_list('user_id', flat=True).first()
+        player_user_id = instance.user_id
+        booking_id = instance.booking_id
+    SyncTombstone.objects.create(
+        kind=SYNC_KINDS[sender], object_id=instance.pk, owner_id=owner_id, player_user_id=player_user_id,
+        slot_date=slot_date, booking_id=booking_id,
+    )
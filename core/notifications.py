@@ -0,0 +1,209 @@
+"""
+Outgoing email for Red Ball Cricket Academy
+
+Player account emails are sent in batches over a single SMTP connection.
+The connection is kept open between batches (e.g. inside a Celery worker)
+and transparently re-opened if the server dropped it. Failures are
+reported per message, so a retry never re-sends what already went out.
+"""
+import logging
+import smtplib
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+PLAYER_CREDENTIALS_SUBJECT = 'Your Player Account - Red Ball Cricket Academy'
+
+_connection_lock = threading.Lock()
+_connection = None
+
+
+def player_credentials_message(email, name, sport_name, date_str, time_window, activation_url=None):
+    """Build the account email for a player added to a booking.
+
+    New accounts have no password yet and get a one-time activation link;
+    players who already had an account are told they were added.
+    """
+    if activation_url:
+        intro = "An account has been created for you at Red Ball Cricket Academy.\n\n"
+        login_details = (
+            f"Set your password to activate your account:\n"
+            f"{activation_url}\n\n"
+            f"Email: {email}\n\n"
+        )
+    else:
+        intro = "You have been added to a booking at Red Ball Cricket Academy.\n\n"
+        login_details = (
+            f"Login Details:\n"
+            f"Email: {email}\n"
+            f"Use your existing password, or 'Forgot password' in the app to set one.\n\n"
+        )
+    return EmailMessage(
+        subject=PLAYER_CREDENTIALS_SUBJECT,
+        body=(
+            f"Hello {name},\n\n"
+            f"{intro}"
+            f"{login_details}"
+            f"Booking Details:\n"
+            f"Sport: {sport_name}\n"
+            f"Date: {date_str}\n"
+            f"Time: {time_window}\n\n"
+            f"Use the app to view your QR code and check-in on the day of your booking.\n\n"
+            f"Regards,\nRed Ball Cricket Academy"
+        ),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+    )
+
+
+def player_credentials_messages(players, base_url=None):
+    """Account emails for players loaded with booking__slot__sport and user.
+
+    Accounts without a usable password always get an activation link, so a
+    base URL (the request's, else SITE_URL) is required for them.
+    """
+    from .accounts import activation_link
+
+    base_url = base_url or settings.SITE_URL
+    messages = []
+    for player in players:
+        if not player.email:
+            continue
+        slot = player.booking.slot if player.booking_id else None
+        user = player.user
+        needs_activation = user is not None and not user.has_usable_password()
+        if needs_activation and not base_url:
+            raise ImproperlyConfigured('SITE_URL must be set to send activation links outside a request')
+        messages.append(player_credentials_message(
+            player.email,
+            player.name,
+            slot.sport.name if slot else '',
+            str(slot.date) if slot else '',
+            f"{slot.start_time} - {slot.end_time}" if slot else '',
+            activation_link(user, base_url) if needs_activation else None,
+        ))
+    return messages
+
+
+def get_mail_connection():
+    """Return the shared, already-open mail connection for this process"""
+    global _connection
+    if _connection is None:
+        _connection = get_connection(fail_silently=False)
+        _connection.open()
+    return _connection
+
+
+def close_mail_connection():
+    global _connection
+    with _connection_lock:
+        if _connection is not None:
+            try:
+                _connection.close()
+            except Exception:
+                pass
+            _connection = None
+
+
+class PartialSendError(Exception):
+    """Some messages of a batch were not sent; `failed` maps their keys to the error.
+
+    Every other message went out, so retries should cover `failed` only.
+    """
+
+    def __init__(self, sent, failed):
+        self.sent = sent
+        self.failed = failed
+        super().__init__(f"{len(failed)} of {sent + len(failed)} messages not sent: {next(iter(failed.values()))}")
+
+
+def _connection_dropped(error):
+    """A lost connection, worth re-opening, rather than a refusal of this message"""
+    # SMTPException subclasses OSError; only SMTPServerDisconnected among them means the link is gone
+    return isinstance(error, smtplib.SMTPServerDisconnected) or not isinstance(error, smtplib.SMTPException)
+
+
+def _drop_connection():
+    global _connection
+    try:
+        if _connection is not None:
+            _connection.close()
+    except Exception:
+        pass
+    _connection = None
+
+
+def send_messages(messages, keys=None):
+    """Send messages one by one over the shared connection.
+
+    A dropped connection is re-opened once and sending resumes with the
+    message that failed, so nothing already sent goes out twice. Messages
+    the server refuses (e.g. SMTPRecipientsRefused) do not stop the rest.
+    Returns the number sent; raises PartialSendError, keyed by `keys`
+    (default: position), if any message was not sent.
+    """
+    keys = list(range(len(messages))) if keys is None else list(keys)
+    sent, failed, reconnected = 0, {}, False
+    with _connection_lock:
+        for key, message in zip(keys, messages):
+            while True:
+                try:
+                    get_mail_connection().send_messages([message])
+                    sent += 1
+                except OSError as e:
+                    if _connection_dropped(e):
+                        _drop_connection()
+                        if not reconnected:
+                            logger.warning("Mail connection failed (%s); reconnecting", e)
+                            reconnected = True
+                            continue
+                    failed[key] = e
+                break
+    if failed:
+        raise PartialSendError(sent, failed)
+    return sent
+
+
+def send_player_credentials_emails(player_ids, base_url=None):
+    """Send account emails for the given players in one batch.
+
+    Activation tokens are minted at send time, never stored.
+    """
+    from .models import Player
+
+    players = [
+        player for player in Player.objects.filter(id__in=player_ids).select_related('booking__slot__sport', 'user')
+        if player.email
+    ]
+    # PartialSendError.failed is keyed by player id, so retries skip players already emailed
+    return send_messages(player_credentials_messages(players, base_url), keys=[p.id for p in players])
+
+
+def password_reset_message(user, base_url):
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    reset_link = f"{base_url}/api/reset-password/?uid={uid}&token={token}"
+    return EmailMessage(
+        subject='Password Reset Request - Red Ball Cricket Academy',
+        body=f'Hello,\n\nYou requested to reset your password for Red Ball Cricket Academy.\n\nClick the link below to reset your password:\n{reset_link}\n\nThis link will expire in 24 hours.\n\nIf you did not request this, please ignore this email.\n\nBest regards,\nRed Ball Cricket Academy Team',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+
+def send_password_reset_email(user_id, base_url):
+    """Send a password reset link; the token is minted at send time, never stored"""
+    from django.contrib.auth import get_user_model
+
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        return 0
+    return send_messages([password_reset_message(user, base_url)])
@@ -0,0 +1,258 @@
+"""
+Transactional outbox for Red Ball Cricket Academy
+
+Side effects (emails, QR renders) are written to OutboxMessage inside the
+same transaction as the change that caused them, so nothing is sent for a
+rolled-back change and nothing runs before the data is committed. After
+commit the dispatcher is nudged from a background thread, so the request
+never waits on the broker. Without a broker the in-process task backend
+(core.taskqueue) drains the table; otherwise a periodic Celery task drains
+anything left behind.
+"""
+import logging
+import threading
+from datetime import timedelta
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, CustomUser, OutboxMessage, Player
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+# Claimed rows are hidden from other dispatchers for this long
+LEASE_SECONDS = 5 * 60
+
+HANDLERS = {}
+
+
+def handler(kind, batch=False):
+    """Register a handler for an outbox kind.
+
+    Batch handlers receive every claimed message of that kind at once
+    (e.g. to send emails over one connection); others get one message.
+    A batch handler returns {message id: error} for the messages that
+    failed, so only those are retried; raising fails the whole batch.
+    """
+    def register(func):
+        HANDLERS[kind] = (func, batch)
+        return func
+    return register
+
+
+def enqueue(kind, payload):
+    """Record a side effect in the current transaction"""
+    return enqueue_many(kind, [payload])[0]
+
+
+def enqueue_many(kind, payloads):
+    messages = OutboxMessage.objects.bulk_create(
+        [OutboxMessage(kind=kind, payload=payload) for payload in payloads]
+    )
+    if messages:
+        # Every call queues a hook but the flag lets only the first one kick
+        connection.outbox_kick_pending = True
+        transaction.on_commit(_kick_once)
+    return messages
+
+
+def _kick_once():
+    """Kick the dispatcher once per committed transaction, however many enqueues it made"""
+    if getattr(connection, 'outbox_kick_pending', False):
+        connection.outbox_kick_pending = False
+        kick_dispatcher()
+
+
+def kick_dispatcher():
+    """Start draining the outbox without blocking the caller"""
+    threading.Thread(target=_kick, name='outbox-kick', daemon=True).start()
+
+
+def _kick():
+    from .taskqueue import BACKEND_INPROCESS, active_backend, wake
+    try:
+        if active_backend() != BACKEND_INPROCESS:
+            try:
+                from .tasks import drain_outbox
+                drain_outbox.apply_async(retry=False)
+                return
+            except Exception as e:
+                logger.warning("Outbox: broker unavailable (%s); draining in-process", e)
+        wake()
+    finally:
+        connection.close()
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def claim_batch(batch_size=BATCH_SIZE):
+    """Lease the next batch of due messages to this dispatcher"""
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxMessage.STATUS_PENDING, available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(id__in=[m.id for m in messages]).update(
+                attempts=F('attempts') + 1,
+                available_at=now + timedelta(seconds=LEASE_SECONDS),
+            )
+    for message in messages:
+        message.attempts += 1
+    return messages
+
+
+def _mark_done(messages):
+    OutboxMessage.objects.filter(id__in=[m.id for m in messages]).update(
+        status=OutboxMessage.STATUS_DONE, processed_at=timezone.now(), last_error=None
+    )
+
+
+def _mark_failed(message, error):
+    message.last_error = str(error)[:2000]
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = OutboxMessage.STATUS_FAILED
+        logger.error("Outbox: giving up on %s after %s attempts: %s", message, message.attempts, error)
+    else:
+        message.available_at = timezone.now() + backoff(message.attempts)
+        logger.warning("Outbox: %s failed (attempt %s), retrying: %s", message, message.attempts, error)
+    message.save(update_fields=['status', 'available_at', 'last_error'])
+
+
+def _run_batch(func, group):
+    try:
+        failed = func(group) or {}
+    except Exception as e:
+        failed = {message.id: e for message in group}
+    _mark_done([message for message in group if message.id not in failed])
+    for message in group:
+        if message.id in failed:
+            _mark_failed(message, failed[message.id])
+
+
+def _run_one(func, message):
+    try:
+        func(message)
+    except Exception as e:
+        _mark_failed(message, e)
+    else:
+        _mark_done([message])
+
+
+def jobs_for(messages):
+    """Split claimed messages into independent units of work"""
+    by_kind = {}
+    for message in messages:
+        by_kind.setdefault(message.kind, []).append(message)
+
+    jobs = []
+    for kind, group in by_kind.items():
+        if kind not in HANDLERS:
+            for message in group:
+                _mark_failed(message, f"No handler for outbox kind '{kind}'")
+            continue
+        func, batch = HANDLERS[kind]
+        if batch:
+            jobs.append(partial(_run_batch, func, group))
+        else:
+            jobs.extend(partial(_run_one, func, message) for message in group)
+    return jobs
+
+
+def run_inline(jobs):
+    for job in jobs:
+        job()
+
+
+def dispatch_outbox(batch_size=BATCH_SIZE, max_batches=50, run=run_inline):
+    """Drain due outbox messages in batches; returns how many were processed.
+
+    `run` executes the units of work for a batch, e.g. on a thread pool.
+    """
+    processed = 0
+    for _ in range(max_batches):
+        messages = claim_batch(batch_size)
+        if not messages:
+            break
+        run(jobs_for(messages))
+        processed += len(messages)
+    return processed
+
+
+def purge_outbox(older_than_days=7):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboxMessage.objects.filter(
+        status=OutboxMessage.STATUS_DONE, processed_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+# Handlers
+
+@handler('player_credentials_email', batch=True)
+def send_player_credentials(messages):
+    """All pending account emails go out over one SMTP connection"""
+    from .notifications import PartialSendError, send_player_credentials_emails
+    by_base_url = {}
+    for m in messages:
+        by_base_url.setdefault(m.payload.get('base_url'), []).append(m)
+    failed = {}
+    for base_url, group in by_base_url.items():
+        try:
+            send_player_credentials_emails([m.payload['player_id'] for m in group], base_url)
+        except PartialSendError as e:
+            failed.update({m.id: e.failed[m.payload['player_id']] for m in group if m.payload['player_id'] in e.failed})
+        except Exception as e:
+            failed.update({m.id: e for m in group})
+    return failed
+
+
+@handler('user_qr')
+def render_user_qr(message):
+    """QR for accounts created in bulk, which skip the post_save QR signal"""
+    user = CustomUser.objects.filter(id=message.payload['user_id']).first()
+    if user and not user.qr_token:
+        user.generate_qr_code()
+        user.save(update_fields=['qr_token', 'qr_code'])
+
+
+@handler('player_qr')
+def render_player_qr(message):
+    player = Player.objects.select_related('booking').filter(id=message.payload['player_id']).first()
+    if player and not player.qr_code:
+        player.generate_qr_code()
+        player.save(update_fields=['qr_token', 'qr_code', 'updated_at'])
+
+
+@handler('organizer_qr')
+def render_organizer_qr(message):
+    booking = (
+        Booking.objects.select_related('user', 'slot__sport')
+        .filter(id=message.payload['booking_id']).first()
+    )
+    if booking and booking.payment_verified and not booking.organizer_qr_token:
+        booking.generate_organizer_qr_code()
+        booking.save(update_fields=['organizer_qr_token', 'organizer_qr_code', 'updated_at'])
+
+
+@handler('task')
+def run_queued_task(message):
+    """Celery task call persisted by the in-process task backend"""
+    from .taskqueue import run_task
+    run_task(message.payload['task'], message.payload['args'], message.payload['kwargs'])
+
+
+@handler('password_reset_email')
+def send_password_reset(message):
+    from .notifications import send_password_reset_email
+    send_password_reset_email(message.payload['user_id'], message.payload['base_url'])
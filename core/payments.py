@@ -0,0 +1,205 @@
+"""
+Razorpay gateway client for Red Ball Cricket Academy
+
+One process-wide client shares a pooled HTTP session. Every call has
+connect/read timeouts, idempotent (GET) calls are retried a bounded number
+of times, and a circuit breaker fails fast while the gateway is down
+instead of tying up workers. Payment and webhook signatures are checked
+locally with HMAC, without touching the network.
+
+Point RAZORPAY_BASE_URL at `python manage.py razorpay_stub` for tests and
+load runs.
+"""
+import hashlib
+import hmac
+import threading
+import time
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+GatewayError = razorpay.errors.GatewayError
+BadRequestError = razorpay.errors.BadRequestError
+
+
+class GatewayUnavailable(Exception):
+    """The gateway is failing or the circuit breaker is open; retry later"""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures.
+
+    While open, calls fail immediately. After `reset_timeout` seconds one
+    trial call is let through; success closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def before_call(self):
+        with self.lock:
+            state = self.state
+            if state == 'open':
+                raise GatewayUnavailable('Payment gateway is temporarily unavailable')
+            if state == 'half-open':
+                # Let this call probe the gateway; others keep failing fast
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def build_session(pool_size, max_retries):
+    """requests.Session with a connection pool and retries limited to GET"""
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=0.2,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class PaymentGateway:
+    # Failures that say something about gateway health; BadRequestError does not
+    TRANSIENT_ERRORS = (requests.RequestException, razorpay.errors.ServerError, GatewayError, ValueError)
+
+    def __init__(self, key_id, key_secret, base_url=None, connect_timeout=3.0, read_timeout=10.0,
+                 max_retries=2, pool_size=10, breaker=None):
+        self.key_id = key_id
+        self.key_secret = key_secret
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        options = {'base_url': base_url} if base_url else {}
+        self.client = razorpay.Client(
+            session=build_session(pool_size, max_retries), auth=(key_id, key_secret), **options
+        )
+
+    @property
+    def configured(self):
+        return bool(self.key_id and self.key_secret)
+
+    def _call(self, func, *args, **kwargs):
+        self.breaker.before_call()
+        try:
+            result = func(*args, timeout=self.timeout, **kwargs)
+        except self.TRANSIENT_ERRORS as e:
+            self.breaker.record_failure()
+            raise GatewayUnavailable(str(e) or e.__class__.__name__) from e
+        self.breaker.record_success()
+        return result
+
+    # API calls
+
+    def create_order(self, amount, currency='INR', notes=None, receipt=None):
+        """Create an order; `amount` is in paise. Not retried (not idempotent)."""
+        data = {'amount': amount, 'currency': currency, 'payment_capture': 1, 'notes': notes or {}}
+        if receipt:
+            data['receipt'] = receipt
+        return self._call(self.client.order.create, data=data)
+
+    def fetch_order(self, order_id):
+        return self._call(self.client.order.fetch, order_id)
+
+    def fetch_payment(self, payment_id):
+        return self._call(self.client.payment.fetch, payment_id)
+
+    def order_payments(self, order_id):
+        return self._call(self.client.order.payments, order_id)['items']
+
+    def iter_orders(self, start, end):
+        """All orders created between two unix timestamps, 100 per request"""
+        return self._paginate(self.client.order.all, start, end)
+
+    def iter_payments(self, start, end):
+        """All payments created between two unix timestamps, 100 per request"""
+        return self._paginate(self.client.payment.all, start, end)
+
+    def _paginate(self, func, start, end, page_size=100):
+        skip = 0
+        while True:
+            page = self._call(func, data={'from': start, 'to': end, 'count': page_size, 'skip': skip})['items']
+            yield from page
+            if len(page) < page_size:
+                return
+            skip += page_size
+
+    # Local signature checks
+
+    def payment_signature(self, order_id, payment_id):
+        message = f"{order_id}|{payment_id}".encode()
+        return hmac.new(self.key_secret.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        """True if the checkout callback signature matches"""
+        if not (self.key_secret and signature):
+            return False
+        return hmac.compare_digest(self.payment_signature(order_id, payment_id), signature)
+
+
+def verify_webhook_signature(body, signature, secret):
+    """True if X-Razorpay-Signature matches the raw request body"""
+    if not (secret and signature):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+_gateway_lock = threading.Lock()
+_gateway = None
+
+
+def get_gateway():
+    """The shared gateway client for this process"""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = PaymentGateway(
+                    settings.RAZORPAY_KEY_ID,
+                    settings.RAZORPAY_KEY_SECRET,
+                    base_url=settings.RAZORPAY_BASE_URL or None,
+                    connect_timeout=settings.RAZORPAY_CONNECT_TIMEOUT,
+                    read_timeout=settings.RAZORPAY_READ_TIMEOUT,
+                    max_retries=settings.RAZORPAY_MAX_RETRIES,
+                )
+    return _gateway
+
+
+def reset_gateway():
+    """Drop the shared client, e.g. after settings change in tests"""
+    global _gateway
+    with _gateway_lock:
+        _gateway = None
@@ -0,0 +1,214 @@
+"""
+In-memory fake of the Razorpay orders/payments API
+
+Serves the subset of /v1 the gateway client uses, so tests and load runs
+never leave the machine:
+
+    python manage.py razorpay_stub --port 9100
+    RAZORPAY_BASE_URL=http://127.0.0.1:9100 python manage.py runserver
+
+POST /stub/orders/<order_id>/pay simulates a successful checkout: it
+captures a payment for the order and returns the checkout callback fields,
+signed with the configured key secret. webhook_delivery() builds signed
+webhook requests for the same entities. Latency and failure rate can be
+injected to exercise timeouts and the circuit breaker.
+"""
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _new_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:14]}"
+
+
+class StubState:
+    def __init__(self, key_secret, latency=0.0, failure_rate=0.0):
+        self.key_secret = key_secret
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.orders = {}
+        self.payments = {}
+        self.lock = threading.Lock()
+
+    def create_order(self, data):
+        order = {
+            'id': _new_id('order'),
+            'entity': 'order',
+            'amount': int(data.get('amount', 0)),
+            'amount_paid': 0,
+            'amount_due': int(data.get('amount', 0)),
+            'currency': data.get('currency', 'INR'),
+            'receipt': data.get('receipt'),
+            'status': 'created',
+            'attempts': 0,
+            'notes': data.get('notes') or {},
+            'created_at': int(time.time()),
+        }
+        with self.lock:
+            self.orders[order['id']] = order
+        return order
+
+    def pay(self, order_id):
+        with self.lock:
+            order = self.orders[order_id]
+            payment = {
+                'id': _new_id('pay'),
+                'entity': 'payment',
+                'amount': order['amount'],
+                'currency': order['currency'],
+                'status': 'captured',
+                'order_id': order_id,
+                'captured': True,
+                'notes': order['notes'],
+                'created_at': int(time.time()),
+            }
+            self.payments[payment['id']] = payment
+            order.update(status='paid', amount_paid=order['amount'], amount_due=0, attempts=order['attempts'] + 1)
+        signature = hmac.new(
+            self.key_secret.encode(), f"{order_id}|{payment['id']}".encode(), hashlib.sha256
+        ).hexdigest()
+        return {
+            'razorpay_order_id': order_id,
+            'razorpay_payment_id': payment['id'],
+            'razorpay_signature': signature,
+            'payment': payment,
+        }
+
+
+def _collection(items, query):
+    start = int(query.get('from', [0])[0])
+    end = int(query.get('to', [2 ** 63])[0])
+    skip = int(query.get('skip', [0])[0])
+    count = int(query.get('count', [10])[0])
+    items = sorted(
+        (item for item in items if start <= item['created_at'] <= end),
+        key=lambda item: item['created_at'], reverse=True,
+    )[skip:skip + count]
+    return {'entity': 'collection', 'count': len(items), 'items': items}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    routes = [
+        ('POST', re.compile(r'^/v1/orders$'), 'create_order'),
+        ('GET', re.compile(r'^/v1/orders$'), 'list_orders'),
+        ('GET', re.compile(r'^/v1/orders/(?P<order_id>[\w-]+)$'), 'fetch_order'),
+        ('GET', re.compile(r'^/v1/orders/(?P<order_id>[\w-]+)/payments$'), 'order_payments'),
+        ('GET', re.compile(r'^/v1/payments$'), 'list_payments'),
+        ('GET', re.compile(r'^/v1/payments/(?P<payment_id>[\w-]+)$'), 'fetch_payment'),
+        ('POST', re.compile(r'^/stub/orders/(?P<order_id>[\w-]+)/pay$'), 'pay_order'),
+    ]
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def dispatch(self, method):
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.failure_rate and random.random() < self.state.failure_rate:
+            return self.respond(503, {'error': {'code': 'SERVER_ERROR', 'description': 'Injected failure'}})
+
+        url = urlparse(self.path)
+        for route_method, pattern, name in self.routes:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                try:
+                    return self.respond(200, getattr(self, name)(parse_qs(url.query), **match.groupdict()))
+                except KeyError:
+                    return self.not_found()
+        return self.not_found()
+
+    def not_found(self):
+        self.respond(400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'The id provided does not exist'}})
+
+    def respond(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    # Routes
+
+    def create_order(self, query):
+        return self.state.create_order(self.read_json())
+
+    def list_orders(self, query):
+        return _collection(list(self.state.orders.values()), query)
+
+    def fetch_order(self, query, order_id):
+        return self.state.orders[order_id]
+
+    def order_payments(self, query, order_id):
+        self.state.orders[order_id]
+        return _collection([p for p in self.state.payments.values() if p['order_id'] == order_id], {'count': [100]})
+
+    def list_payments(self, query):
+        return _collection(list(self.state.payments.values()), query)
+
+    def fetch_payment(self, query, payment_id):
+        return self.state.payments[payment_id]
+
+    def pay_order(self, query, order_id):
+        return self.state.pay(order_id)
+
+
+def webhook_delivery(event, entity_name, entity, webhook_secret, event_id=None):
+    """Body and headers of a signed webhook POST, as Razorpay would send it"""
+    body = json.dumps({
+        'entity': 'event',
+        'event': event,
+        'payload': {entity_name: {'entity': entity}},
+        'created_at': int(time.time()),
+    }).encode()
+    headers = {
+        'X-Razorpay-Signature': hmac.new(webhook_secret.encode(), body, hashlib.sha256).hexdigest(),
+        'X-Razorpay-Event-Id': event_id or _new_id('evt'),
+    }
+    return body, headers
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state):
+        super().__init__(address, StubHandler)
+        self.state = state
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up (timeouts under injected latency) are expected
+        pass
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(key_secret, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0):
+    """Start a stub server on a background thread; call .shutdown() when done"""
+    server = StubServer((host, port), StubState(key_secret, latency, failure_rate))
+    threading.Thread(target=server.serve_forever, name='razorpay-stub', daemon=True).start()
+    return server
@@ -0,0 +1,133 @@
+"""
+Payment reconciliation for Red Ball Cricket Academy
+
+Finds bookings left pending although Razorpay captured their payment (the
+app was closed before /payment/verify/ and the webhook never arrived),
+and bookings whose order id was never stored. Captures short of the slot
+price are reported but not confirmed. Gateway data for the whole
+window is loaded with a few paged list calls rather than one call per
+booking; corrections are written per chunk with one bulk_update.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Booking
+from .outbox import enqueue_many
+from .payments import get_gateway
+
+RECONCILE_DAYS = 7
+CHUNK_SIZE = 200
+UPDATE_FIELDS = ['order_id', 'payment_id', 'payment_verified', 'status', 'amount_paid', 'updated_at']
+
+
+def gateway_snapshot(gateway, start, end):
+    """Orders keyed by the booking id in their notes, and captured payments by order id"""
+    start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+    orders_by_booking = {}
+    for order in gateway.iter_orders(start_ts, end_ts):
+        booking_id = str((order.get('notes') or {}).get('booking_id') or '')
+        if booking_id:
+            # Every checkout attempt, paid ones first
+            orders = orders_by_booking.setdefault(booking_id, [])
+            if order.get('status') == 'paid':
+                orders.insert(0, order)
+            else:
+                orders.append(order)
+    captured_by_order = {
+        payment['order_id']: payment
+        for payment in gateway.iter_payments(start_ts, end_ts)
+        if payment.get('status') == 'captured' and payment.get('order_id')
+    }
+    return orders_by_booking, captured_by_order
+
+
+def reconcile_booking(booking, orders_by_booking, captured_by_order, now):
+    """Apply gateway state to one booking in memory; returns the action taken or None.
+
+    Every order of the booking is checked, not just the stored one: the
+    stored id is the latest checkout attempt, and an earlier one may be the
+    attempt that got paid. A capture below the slot price is reported as
+    'amount_mismatch' and the booking stays pending for an admin to look at.
+    """
+    order_ids = [order['id'] for order in orders_by_booking.get(str(booking.pk), ())]
+    if booking.order_id:
+        order_ids.insert(0, booking.order_id)
+    if not order_ids:
+        return None
+    payment = next((captured_by_order[o] for o in order_ids if o in captured_by_order), None)
+
+    action = None
+    order_id = payment['order_id'] if payment is not None else order_ids[0]
+    if booking.order_id != order_id:
+        booking.order_id = order_id
+        action = 'order_id_stored'
+
+    if payment is not None:
+        amount = Decimal(payment.get('amount') or 0) / 100
+        if amount < booking.slot.price:
+            if action or booking.payment_id != payment['id']:
+                booking.payment_id = payment['id']
+                booking.updated_at = now
+            return 'amount_mismatch'
+        booking.payment_id = payment['id']
+        booking.payment_verified = True
+        booking.status = 'confirmed'
+        booking.amount_paid = amount
+        action = 'confirmed'
+
+    if action:
+        booking.updated_at = now
+    return action
+
+
+def reconcile_payments(days=RECONCILE_DAYS, chunk_size=CHUNK_SIZE, dry_run=False, gateway=None):
+    """Reconcile pending bookings created in the last `days` days.
+
+    Returns a report: one dict per corrected booking. With dry_run nothing
+    is written.
+    """
+    gateway = gateway or get_gateway()
+    now = timezone.now()
+    pending = Booking.objects.filter(
+        payment_verified=False, is_cancelled=False, created_at__gte=now - timedelta(days=days)
+    )
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    if oldest is None:
+        return []
+    # Orders are created shortly after the booking; a small margin covers clock skew
+    orders_by_booking, captured_by_order = gateway_snapshot(gateway, oldest - timedelta(minutes=5), now)
+
+    report = []
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                pending.filter(pk__gt=last_pk).select_related('slot').order_by('pk')
+                .select_for_update(skip_locked=True, of=('self',))[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            changed = []
+            for booking in chunk:
+                action = reconcile_booking(booking, orders_by_booking, captured_by_order, now)
+                # A repeated amount_mismatch is reported again but has nothing to write
+                if booking.updated_at == now:
+                    changed.append(booking)
+                if action:
+                    report.append({
+                        'booking_id': booking.pk,
+                        'action': action,
+                        'order_id': booking.order_id,
+                        'payment_id': booking.payment_id,
+                    })
+            if changed and not dry_run:
+                Booking.objects.bulk_update(changed, UPDATE_FIELDS)
+                # bulk_update skips the post_save signal that queues organizer QRs
+                enqueue_many('organizer_qr', [{'booking_id': b.pk} for b in changed if b.payment_verified])
+    return report
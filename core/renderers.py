@@ -0,0 +1,84 @@
+"""
+Fast JSON and MessagePack renderers/parsers for Red Ball Cricket Academy
+
+ORJSONRenderer produces the same bytes as DRF's JSONRenderer (compact,
+UTF-8, dates and Decimals encoded the way rest_framework.utils.encoders
+does) but serializes in C. Clients can opt into MessagePack with
+`Accept: application/msgpack` or `?format=msgpack` when msgpack is
+installed. Both libraries are optional; without them the stock DRF
+classes' behaviour is used.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional; falls back to the stdlib json path
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional; MessagePack is only offered when installed
+    msgpack = None
+
+# DRF's encoder formats datetimes (millisecond precision, 'Z'), dates, times,
+# Decimals, lazy strings and querysets; reuse it so output stays identical
+_encode_default = JSONEncoder().default
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer with an orjson fast path for compact output"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        ret = orjson.dumps(data, default=_encode_default, option=ORJSON_OPTIONS)
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            # JSONRenderer escapes these so the output is also valid JavaScript
+            ret = ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser with an orjson fast path for UTF-8 bodies"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Same scalar encoding as JSON so clients can switch formats freely
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True, datetime=False)
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
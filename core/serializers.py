@@ -3,12 +3,15 @@ Serializers for Red Ball Cricket Academy API
 """
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.utils import timezone
+from .fieldsets import DynamicFieldsMixin
 from .models import Sport, TimeSlot, Booking, Player, CheckInLog, BookingConfiguration, BreakTime, BlackoutDate
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for User model"""
     qr_code_url = serializers.SerializerMethodField()
     
@@ -26,7 +29,7 @@ class UserSerializer(serializers.ModelSerializer):
         return None
 
 
-class BookingConfigurationSerializer(serializers.ModelSerializer):
+class BookingConfigurationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for BookingConfiguration model"""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
     total_slots_per_day = serializers.ReadOnlyField()
@@ -75,7 +78,7 @@ class BookingConfigurationSerializer(serializers.ModelSerializer):
         return data
 
 
-class BreakTimeSerializer(serializers.ModelSerializer):
+class BreakTimeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for BreakTime model"""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
     
@@ -87,7 +90,7 @@ class BreakTimeSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class BlackoutDateSerializer(serializers.ModelSerializer):
+class BlackoutDateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for BlackoutDate model"""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
     
@@ -97,7 +100,7 @@ class BlackoutDateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class SportSerializer(serializers.ModelSerializer):
+class SportSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Sport model"""
     available_slots_count = serializers.SerializerMethodField()
 
@@ -106,9 +109,17 @@ class SportSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'price_per_hour', 'description', 'duration', 'max_players', 'is_active', 
                   'created_at', 'updated_at', 'available_slots_count']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = ['available_slots_count']
 
     def get_available_slots_count(self, obj):
-        return obj.slots.filter(is_booked=False).count()
+        # One grouped query per response instead of a count per sport
+        counts = self.context.get('_free_slot_counts')
+        if counts is None:
+            counts = self.context['_free_slot_counts'] = dict(
+                TimeSlot.objects.filter(is_booked=False).order_by().values('sport_id')
+                .annotate(count=Count('id')).values_list('sport_id', 'count')
+            )
+        return counts.get(obj.pk, 0)
     
     def validate_price_per_hour(self, value):
         """Ensure price_per_hour is a valid decimal"""
@@ -126,7 +137,7 @@ class SportSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Invalid price format")
 
 
-class TimeSlotSerializer(serializers.ModelSerializer):
+class TimeSlotSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for TimeSlot model"""
     sport_name = serializers.CharField(source='sport.name', read_only=True)
     sport_details = SportSerializer(source='sport', read_only=True)
@@ -138,10 +149,19 @@ class TimeSlotSerializer(serializers.ModelSerializer):
                   'start_time', 'end_time', 'price', 'is_booked', 'admin_disabled',
                   'max_players', 'is_available', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expandable_fields = ['sport_details']
 
     def get_is_available(self, obj):
-        """Get computed availability status"""
-        return obj.is_available()
+        """Get computed availability status (TimeSlot.is_available with blackouts loaded once)"""
+        today = timezone.now().date()
+        blackouts = self.context.get('_active_blackouts')
+        if blackouts is None:
+            blackouts = self.context['_active_blackouts'] = set(
+                BlackoutDate.objects.filter(is_active=True, date__gte=today).values_list('sport_id', 'date')
+            )
+        if obj.is_booked or obj.admin_disabled or obj.date < today:
+            return False
+        return (obj.sport_id, obj.date) not in blackouts
 
     def validate(self, data):
         """Validate that end_time is after start_time"""
@@ -153,7 +173,7 @@ class TimeSlotSerializer(serializers.ModelSerializer):
         return data
 
 
-class PlayerSerializer(serializers.ModelSerializer):
+class PlayerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Player model"""
     booking_details = serializers.SerializerMethodField()
     status = serializers.CharField(source='get_status', read_only=True)
@@ -166,6 +186,8 @@ class PlayerSerializer(serializers.ModelSerializer):
                       'last_check_out', 'booking_details', 'created_at', 'is_in']
         read_only_fields = ['id', 'qr_code', 'qr_token', 'check_in_count', 'last_check_in', 
                            'last_check_out', 'created_at', 'is_in']
+        expandable_fields = ['booking_details']
+        field_relations = {'booking_details': ['booking__slot__sport', 'booking__user']}
 
     def get_booking_details(self, obj):
         return {
@@ -186,7 +208,7 @@ class PlayerSerializer(serializers.ModelSerializer):
         return None
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for Booking model"""
     user_details = UserSerializer(source='user', read_only=True)
     slot_details = TimeSlotSerializer(source='slot', read_only=True)
@@ -205,8 +227,12 @@ class BookingSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'payment_verified', 'status',
                            'organizer_qr_token', 'organizer_qr_code', 'organizer_is_in',
                            'organizer_check_in_count']
+        expandable_fields = ['user_details', 'slot_details', 'players']
 
     def get_player_count(self, obj):
+        # Lists annotate player_count; prefetched players are counted in memory
+        if hasattr(obj, 'player_count'):
+            return obj.player_count
         return obj.players.count()
     
     def get_organizer_qr_code_url(self, obj):
@@ -234,6 +260,27 @@ class BookingSerializer(serializers.ModelSerializer):
         return booking
 
 
+class BookingListSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """Flat booking summary for lists; players live on the detail view"""
+    slot_date = serializers.DateField(source='slot.date', read_only=True)
+    start_time = serializers.TimeField(source='slot.start_time', read_only=True)
+    end_time = serializers.TimeField(source='slot.end_time', read_only=True)
+    sport = serializers.IntegerField(source='slot.sport_id', read_only=True)
+    sport_name = serializers.CharField(source='slot.sport.name', read_only=True)
+    player_count = serializers.IntegerField(read_only=True)  # Count('players') annotation
+    organizer_qr_code_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Booking
+        fields = ['id', 'slot', 'slot_date', 'start_time', 'end_time', 'sport', 'sport_name',
+                  'status', 'payment_verified', 'is_cancelled', 'amount_paid', 'player_count',
+                  'organizer_qr_token', 'organizer_qr_code_url', 'organizer_is_in',
+                  'created_at', 'updated_at']
+        read_only_fields = fields
+
+    get_organizer_qr_code_url = BookingSerializer.get_organizer_qr_code_url
+
+
 class BookingCreateSerializer(serializers.ModelSerializer):
     """Simplified serializer for creating bookings"""
     class Meta:
@@ -290,7 +337,7 @@ class BulkPlayerCreateSerializer(serializers.Serializer):
         return value
 
 
-class CheckInLogSerializer(serializers.ModelSerializer):
+class CheckInLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """Serializer for CheckInLog model"""
     player_name = serializers.CharField(source='player.name', read_only=True)
     player_email = serializers.CharField(source='player.email', read_only=True)
@@ -319,9 +366,8 @@ class QRCodeScanSerializer(serializers.Serializer):
 
 
 class PaymentOrderSerializer(serializers.Serializer):
-    """Serializer for creating Razorpay order"""
+    """Serializer for creating Razorpay order; the amount comes from the booking's slot"""
     booking_id = serializers.IntegerField()
-    amount = serializers.DecimalField(max_digits=10, decimal_places=2)
 
 
 class PaymentVerificationSerializer(serializers.Serializer):
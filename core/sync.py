@@ -0,0 +1,143 @@
+"""
+Delta sync for the Red Ball Cricket Academy mobile app
+
+GET /api/sync/ returns every sport, upcoming slot, booking and player the
+user can see, plus a cursor. Sending it back as ?since=<cursor> returns only
+the records created or updated since then and the ids of those deleted
+(SyncTombstone rows). A record counts as updated when any row it embeds
+moved: a booking carries its slot, sport and player_count, so it is re-sent
+when those change or one of its players is added, edited or deleted. Clients upsert `updated` and drop
+`deleted` in their local store. A cursor older than TOMBSTONE_TTL, whose
+deletes may already be purged, gets a full snapshot with `reset: true`.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import fastserializers
+from .models import Booking, Player, Sport, SyncTombstone, TimeSlot
+from .serializers import SportSerializer
+
+TOMBSTONE_TTL = timedelta(days=30)
+
+# The cursor trails the read so rows written by transactions still in flight
+# are picked up next time; clients may see a few records twice
+CURSOR_LAG = timedelta(seconds=5)
+
+# updated_at of every row embedded in a synced record (bootstrap's validators use them too)
+SLOT_FIELDS = ('updated_at', 'sport__updated_at')
+BOOKING_FIELDS = ('updated_at', 'slot__updated_at', 'slot__sport__updated_at')
+PLAYER_FIELDS = ('updated_at', 'booking__updated_at', 'booking__slot__updated_at', 'booking__slot__sport__updated_at')
+
+
+def encode_cursor(moment):
+    return base64.urlsafe_b64encode(moment.isoformat().encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode an opaque cursor into an aware datetime; raises ValueError if malformed"""
+    try:
+        moment = datetime.fromisoformat(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if timezone.is_naive(moment):
+        raise ValueError('Invalid cursor')
+    return moment
+
+
+def visible_bookings(user):
+    """Same rule as BookingViewSet: own bookings, admins see all"""
+    if user.is_staff:
+        return Booking.objects.all()
+    return Booking.objects.filter(user=user)
+
+
+def visible_players(user):
+    """Players on the user's bookings and the user's own player records"""
+    if user.is_staff:
+        return Player.objects.all()
+    return Player.objects.filter(Q(booking__user=user) | Q(user=user)).distinct()
+
+
+def _tombstones(kind, since, user=None, field='object_id'):
+    tombstones = SyncTombstone.objects.filter(kind=kind, deleted_at__gte=since)
+    if user is not None and not user.is_staff:
+        tombstones = tombstones.filter(Q(owner_id=user.pk) | Q(player_user_id=user.pk))
+    return list(tombstones.values_list(field, flat=True).distinct())
+
+
+def changed_since(fields, since):
+    """Q matching rows where any of the given updated_at lookups moved at or after `since`"""
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__gte': since})
+    return condition
+
+
+def _slots(user, since):
+    slots = TimeSlot.objects.filter(date__gte=timezone.now().date()).order_by('date', 'start_time')
+    if since is None:
+        if not user.is_staff:
+            slots = slots.filter(admin_disabled=False)
+        return fastserializers.slot_rows(slots), []
+    changed = slots.filter(changed_since(SLOT_FIELDS, since))
+    deleted = _tombstones(SyncTombstone.KIND_SLOT, since)
+    if not user.is_staff:
+        # A slot an admin disabled disappears for everyone else
+        deleted += list(changed.filter(admin_disabled=True).values_list('id', flat=True))
+        changed = changed.filter(admin_disabled=False)
+    return fastserializers.slot_rows(changed), deleted
+
+
+def sync_payload(user, cursor=None, request=None):
+    """Records visible to `user` changed since `cursor` (everything when None)"""
+    now = timezone.now()
+    since = decode_cursor(cursor) if cursor else None
+    reset = since is None or since < now - TOMBSTONE_TTL
+    if reset:
+        since = None
+
+    sports = Sport.objects.order_by('id')
+    bookings = visible_bookings(user).annotate(player_count=Count('players')).order_by('-created_at')
+    players = visible_players(user).order_by('id')
+    if since is not None:
+        sports = sports.filter(updated_at__gte=since)
+        # player_count moves when players are added or removed; a subquery keeps the count's join single
+        player_changes = (
+            Q(pk__in=Player.objects.filter(updated_at__gte=since).values('booking_id'))
+            | Q(pk__in=_tombstones(SyncTombstone.KIND_PLAYER, since, field='booking_id'))
+        )
+        bookings = bookings.filter(changed_since(BOOKING_FIELDS, since) | player_changes)
+        players = players.filter(changed_since(PLAYER_FIELDS, since))
+    slots, deleted_slots = _slots(user, since)
+
+    def deleted(kind, scoped=False):
+        if since is None:
+            return []
+        return _tombstones(kind, since, user if scoped else None)
+
+    return {
+        'cursor': encode_cursor(now - CURSOR_LAG),
+        'reset': reset,
+        'sports': {
+            'updated': SportSerializer(sports, many=True, context={'request': request}).data,
+            'deleted': deleted(SyncTombstone.KIND_SPORT),
+        },
+        'slots': {'updated': slots, 'deleted': deleted_slots},
+        'bookings': {
+            'updated': fastserializers.booking_list_rows(bookings, request),
+            'deleted': deleted(SyncTombstone.KIND_BOOKING, scoped=True),
+        },
+        'players': {
+            'updated': fastserializers.player_rows(players, request),
+            'deleted': deleted(SyncTombstone.KIND_PLAYER, scoped=True),
+        },
+    }
+
+
+def purge_tombstones():
+    cutoff = timezone.now() - TOMBSTONE_TTL
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
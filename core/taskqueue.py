@@ -0,0 +1,161 @@
+"""
+Pluggable task backend for Red Ball Cricket Academy
+
+Tasks keep the usual @shared_task / .delay() API. Where to run them is
+decided by settings.TASK_BACKEND:
+
+- 'celery': publish to the Celery broker as usual
+- 'inprocess': persist the call in the outbox table and run it on a small,
+  bounded thread pool inside the web process (no broker needed)
+- 'auto' (default): use Celery when the broker answers, otherwise in-process
+
+Because in-process calls are stored in the database first, work queued
+before a restart is picked up again when the next process starts.
+settings.TASK_INPROCESS_AUTOSTART (off under `manage.py test`) controls
+whether the web process starts the dispatcher thread at all; when off,
+queued rows wait for dispatch_outbox() or the Celery drain task.
+"""
+import logging
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+
+try:
+    from celery import Task
+except ImportError:  # Celery is optional; in-process execution still works
+    Task = object
+
+logger = logging.getLogger(__name__)
+
+BACKEND_CELERY = 'celery'
+BACKEND_INPROCESS = 'inprocess'
+BROKER_PROBE_TIMEOUT = 0.3
+BROKER_PROBE_TTL = 30
+POLL_INTERVAL = 30
+
+_probe_lock = threading.Lock()
+_probe = {'checked_at': 0.0, 'reachable': False}
+
+
+def broker_reachable():
+    """Cheap TCP probe of the broker, cached for BROKER_PROBE_TTL seconds"""
+    with _probe_lock:
+        if time.monotonic() - _probe['checked_at'] < BROKER_PROBE_TTL:
+            return _probe['reachable']
+        url = urlparse(getattr(settings, 'CELERY_BROKER_URL', '') or '')
+        default_ports = {'redis': 6379, 'rediss': 6379, 'amqp': 5672, 'amqps': 5671}
+        reachable = False
+        if url.hostname and url.scheme in default_ports:
+            try:
+                socket.create_connection(
+                    (url.hostname, url.port or default_ports[url.scheme]), timeout=BROKER_PROBE_TIMEOUT
+                ).close()
+                reachable = True
+            except OSError:
+                reachable = False
+        _probe.update(checked_at=time.monotonic(), reachable=reachable)
+        return reachable
+
+
+def active_backend():
+    backend = getattr(settings, 'TASK_BACKEND', 'auto')
+    if backend in (BACKEND_CELERY, BACKEND_INPROCESS):
+        return backend
+    if getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        return BACKEND_CELERY
+    return BACKEND_CELERY if broker_reachable() else BACKEND_INPROCESS
+
+
+class BackendTask(Task):
+    """Celery task base that routes .delay()/.apply_async() through active_backend()"""
+
+    def apply_async(self, args=None, kwargs=None, **options):
+        if active_backend() == BACKEND_INPROCESS:
+            return submit(self.name, args or (), kwargs or {})
+        return super().apply_async(args, kwargs, **options)
+
+
+def submit(task_name, args=(), kwargs=None):
+    """Persist a task call; it runs on the in-process pool after commit"""
+    from .outbox import enqueue
+    return enqueue('task', {'task': task_name, 'args': list(args), 'kwargs': kwargs or {}})
+
+
+def run_task(task_name, args, kwargs):
+    from celery import current_app
+    return current_app.tasks[task_name](*args, **kwargs)
+
+
+def _run_job(job):
+    from django.db import close_old_connections
+    close_old_connections()
+    try:
+        return job()
+    finally:
+        close_old_connections()
+
+
+class InProcessWorker:
+    """One dispatcher thread that claims due outbox rows and runs them on a bounded pool"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.wakeup = threading.Event()
+        self.executor = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='task-worker')
+            self.thread = threading.Thread(target=self.run, name='task-dispatcher', daemon=True)
+            self.thread.start()
+
+    def wake(self):
+        self.ensure_started()
+        self.wakeup.set()
+
+    def run_jobs(self, jobs):
+        """Run jobs on the bounded pool and wait, so claimed rows finish within their lease"""
+        for future in [self.executor.submit(_run_job, job) for job in jobs]:
+            future.exception()
+
+    def run(self):
+        from django.db import connection
+        from .outbox import dispatch_outbox
+
+        while True:
+            try:
+                dispatch_outbox(run=self.run_jobs)
+            except Exception:
+                logger.exception("In-process task dispatcher failed")
+            finally:
+                connection.close()
+            self.wakeup.wait(POLL_INTERVAL)
+            self.wakeup.clear()
+
+
+worker = InProcessWorker(max_workers=getattr(settings, 'TASK_INPROCESS_WORKERS', 2))
+
+
+def autostart_enabled():
+    return getattr(settings, 'TASK_INPROCESS_AUTOSTART', True)
+
+
+def wake():
+    if autostart_enabled():
+        worker.wake()
+
+
+def start_on_first_request(**kwargs):
+    """Resume queued work after a restart without waiting for a new enqueue"""
+    if autostart_enabled() and active_backend() == BACKEND_INPROCESS:
+        worker.ensure_started()
@@ -1,30 +1,48 @@
 from celery import shared_task
-from django.core.mail import send_mail
-from django.conf import settings
+from celery.signals import worker_process_shutdown
+
+from .notifications import close_mail_connection
+
+
+@shared_task
+def drain_outbox():
+    """Dispatch pending outbox messages (emails, QR renders)"""
+    from .outbox import dispatch_outbox
+    return dispatch_outbox()
+
+
+@shared_task
+def purge_outbox():
+    from .outbox import purge_outbox as purge
+    return purge()
+
+
+@shared_task
+def purge_idempotency_records():
+    from .idempotency import purge_idempotency_records as purge
+    return purge()
+
+
+@shared_task
+def purge_sync_tombstones():
+    from .sync import purge_tombstones
+    return purge_tombstones()
+
+
+@worker_process_shutdown.connect
+def _close_mail_connection(**kwargs):
+    close_mail_connection()
+
+
+@shared_task
+def refresh_analytics_rollups(full=False):
+    """Recompute revenue/utilization rollups for days touched since the last run"""
+    from .analytics import refresh_rollups
+    return refresh_rollups(full=full)
+
 
 @shared_task
-def send_player_credentials_email(email, name, sport_name, date_str, time_window):
-    try:
-        send_mail(
-            subject='Your Player Account - Red Ball Cricket Academy',
-            message=(
-                f"Hello {name},\n\n"
-                f"An account has been created for you at Red Ball Cricket Academy.\n\n"
-                f"Login Details:\n"
-                f"Email: {email}\n"
-                f"Temporary Password: redball\n\n"
-                f"Booking Details:\n"
-                f"Sport: {sport_name}\n"
-                f"Date: {date_str}\n"
-                f"Time: {time_window}\n\n"
-                f"Use the app to view your QR code and check-in on the day of your booking.\n"
-                f"For security, please change your password after first login.\n\n"
-                f"Regards,\nRed Ball Cricket Academy"
-            ),
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-            fail_silently=True,
-        )
-    except Exception:
-        # Best effort; do not raise to Celery
-        pass
+def reconcile_payments():
+    """Confirm bookings whose payment was captured but never verified"""
+    from .reconciliation import reconcile_payments as reconcile
+    return len(reconcile())
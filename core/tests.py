@@ -1,3 +1,1485 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time
+from datetime import date, time as dt_time, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import http_date, urlsafe_base64_encode
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .accounts import activation_token_generator
+from .authentication import CachedJWTAuthentication
+from .caching import cache_metrics
+from .models import (
+    Booking, CustomUser, OrganizerCheckInLog, OutboxMessage, PaymentWebhookEvent, Player, Sport, TimeSlot,
+    UserCheckInLog, UserProfile,
+)
+from .notifications import close_mail_connection, send_player_credentials_emails
+from .outbox import dispatch_outbox, enqueue
+from .payments import BadRequestError, CircuitBreaker, GatewayUnavailable, PaymentGateway
+from .reconciliation import reconcile_payments
+from .razorpay_stub import start_stub_server, webhook_delivery
+from .tasks import refresh_analytics_rollups
+from .throttling import TokenBucketThrottle
+
+try:
+    import msgpack
+except ImportError:  # Optional, like in core.renderers
+    msgpack = None
+
+
+class TempMediaTestCase(TestCase):
+    """QR codes and other files are written to a temporary MEDIA_ROOT, removed with the class"""
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        # Class cleanups run after tearDownClass, last added first
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.addClassCleanup(media.disable)
+        super().setUpClass()
+
+
+class CountingEmailBackend(EmailBackend):
+    """locmem backend that records how many connections were opened"""
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+
+class FlakyEmailBackend(CountingEmailBackend):
+    """Refuses 'refused@' recipients and drops the connection once on 'drop@'"""
+    dropped = False
+
+    def send_messages(self, messages):
+        import smtplib
+
+        to = messages[0].to[0]
+        if to.startswith('refused@'):
+            raise smtplib.SMTPRecipientsRefused({to: (550, b'No such user')})
+        if to.startswith('drop@') and not FlakyEmailBackend.dropped:
+            FlakyEmailBackend.dropped = True
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='core.tests.CountingEmailBackend',
+    CELERY_TASK_ALWAYS_EAGER=True,
+    SITE_URL='https://academy.example.com',
+)
+class PlayerCredentialsEmailTests(TempMediaTestCase):
+    def setUp(self):
+        close_mail_connection()
+        CountingEmailBackend.opened = 0
+        self.owner = CustomUser.objects.create_user(email='owner@example.com', password='secret')
+        sport = Sport.objects.create(name='Cricket', price_per_hour=500, max_players=22)
+        slot = TimeSlot.objects.create(
+            sport=sport, date=timezone.now().date(), start_time=dt_time(7), end_time=dt_time(8), price=500
+        )
+        self.booking = Booking.objects.create(user=self.owner, slot=slot, payment_verified=True)
+
+    def tearDown(self):
+        close_mail_connection()
+
+    def test_batch_uses_one_connection(self):
+        players = []
+        for i in range(10):
+            players.append(Player.objects.create(booking=self.booking, name=f'Player {i}', email=f'p{i}@example.com'))
+        mail.outbox = []
+
+        sent = send_player_credentials_emails([p.id for p in players])
+
+        self.assertEqual(sent, 10)
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+
+    def test_connection_is_reused_across_batches(self):
+        player = Player.objects.create(booking=self.booking, name='Solo', email='solo@example.com')
+
+        send_player_credentials_emails([player.id])
+        send_player_credentials_emails([player.id])
+
+        self.assertEqual(CountingEmailBackend.opened, 1)
+
+    @override_settings(EMAIL_BACKEND='core.tests.FlakyEmailBackend')
+    def test_failures_are_per_message_and_nothing_is_sent_twice(self):
+        from .notifications import PartialSendError
+
+        FlakyEmailBackend.dropped = False
+        players = [
+            Player.objects.create(booking=self.booking, name=name, email=f'{name}@example.com')
+            for name in ('first', 'drop', 'refused', 'last')
+        ]
+        mail.outbox = []
+        with self.assertRaises(PartialSendError) as raised:
+            send_player_credentials_emails([p.id for p in players])
+        self.assertEqual(list(raised.exception.failed), [players[2].id])
+        self.assertEqual(raised.exception.sent, 3)
+        # The dropped connection was re-opened and only the unsent message retried
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         ['drop@example.com', 'first@example.com', 'last@example.com'])
+        self.assertEqual(CountingEmailBackend.opened, 2)
+
+    def test_add_players_sends_one_batch(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        payload = {'players': [{'name': f'P{i}', 'email': f'squad{i}@example.com'} for i in range(5)]}
+        mail.outbox = []
+
+        with mock.patch('core.outbox.kick_dispatcher') as kick:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(f'/api/bookings/{self.booking.id}/add_players/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        # Nothing is sent inside the request; one dispatcher nudge after commit
+        self.assertEqual(mail.outbox, [])
+        kick.assert_called_once()
+
+        dispatch_outbox()
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), sorted(p['email'] for p in payload['players']))
+        self.assertIn('http://testserver/api/activate/?uid=', mail.outbox[0].body)
+        self.assertEqual(CountingEmailBackend.opened, 1)
+        self.assertFalse(OutboxMessage.objects.exclude(status=OutboxMessage.STATUS_DONE).exists())
+        self.assertTrue(all(p.qr_code for p in Player.objects.filter(booking=self.booking)))
+
+    @override_settings(EMAIL_BACKEND='core.tests.FlakyEmailBackend')
+    def test_outbox_retries_only_the_refused_email(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        payload = {'players': [{'name': name, 'email': f'{name}@example.com'} for name in ('first', 'refused', 'last')]}
+        with mock.patch('core.outbox.kick_dispatcher'):
+            with self.captureOnCommitCallbacks(execute=True):
+                client.post(f'/api/bookings/{self.booking.id}/add_players/', payload, format='json')
+        mail.outbox = []
+
+        dispatch_outbox()
+
+        pending = OutboxMessage.objects.filter(kind='player_credentials_email').exclude(status=OutboxMessage.STATUS_DONE)
+        self.assertEqual([m.payload['player_id'] for m in pending],
+                         [Player.objects.get(email='refused@example.com').id])
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['first@example.com', 'last@example.com'])
+
+        mail.outbox = []
+        OutboxMessage.objects.update(available_at=timezone.now())
+        dispatch_outbox()
+        # The retry does not resend the emails that already went out
+        self.assertEqual(mail.outbox, [])
+
+    def test_add_players_provisions_accounts_without_hashing(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        payload = {'players': [{'name': f'P{i}', 'email': f'squad{i}@example.com'} for i in range(10)]}
+
+        with mock.patch('core.outbox.kick_dispatcher'), \
+                mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode') as encode:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(f'/api/bookings/{self.booking.id}/add_players/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        encode.assert_not_called()
+        users = CustomUser.objects.filter(email__startswith='squad')
+        self.assertEqual(users.count(), 10)
+        self.assertFalse(any(user.has_usable_password() for user in users))
+        self.assertTrue(all(user.profile.user_type == 'player' for user in users))
+
+    def test_single_player_create_sends_activation_link(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        with mock.patch('core.outbox.kick_dispatcher'):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post('/api/players/', {'booking': self.booking.id, 'name': 'Solo', 'email': 'Solo@Example.com'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        mail.outbox = []
+
+        dispatch_outbox()
+
+        self.assertEqual([m.to[0] for m in mail.outbox], ['solo@example.com'])
+        self.assertIn('http://testserver/api/activate/?uid=', mail.outbox[0].body)
+        self.assertIn('An account has been created for you', mail.outbox[0].body)
+
+    def test_existing_account_is_told_it_was_added(self):
+        CustomUser.objects.create_user(email='regular@example.com', password='secret')
+        player = Player.objects.create(booking=self.booking, name='Regular', email='regular@example.com')
+        mail.outbox = []
+
+        send_player_credentials_emails([player.id])
+
+        body = mail.outbox[0].body
+        self.assertIn('You have been added to a booking', body)
+        self.assertNotIn('An account has been created', body)
+        self.assertNotIn('/api/activate/', body)
+
+    def test_activation_link_falls_back_to_site_url(self):
+        player = Player.objects.create(booking=self.booking, name='New', email='new@example.com')
+        mail.outbox = []
+
+        send_player_credentials_emails([player.id])
+
+        self.assertIn('https://academy.example.com/api/activate/?uid=', mail.outbox[0].body)
+        with override_settings(SITE_URL=''):
+            # Never tell a passwordless account to use its existing password
+            with self.assertRaises(ImproperlyConfigured):
+                send_player_credentials_emails([player.id])
+
+    def test_activation_link_sets_first_password_once(self):
+        player = Player.objects.create(booking=self.booking, name='New', email='new@example.com')
+        user = CustomUser.objects.get(email='new@example.com')
+        self.assertFalse(user.has_usable_password())
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        token = activation_token_generator.make_token(user)
+        payload = {'uid': uid, 'token': token, 'new_password': 'chosen-password'}
+
+        response = APIClient().post('/api/auth/activate/', payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('chosen-password'))
+        # The token is single-use: setting the password invalidates it
+        response = APIClient().post('/api/auth/activate/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(player.user_id, user.id)
+
+
+class OutboxTests(TempMediaTestCase):
+    def test_rolled_back_changes_leave_no_messages(self):
+        try:
+            with transaction.atomic():
+                enqueue('player_qr', {'player_id': 1})
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_failures_are_retried_with_backoff(self):
+        message = enqueue('unknown_kind', {})
+        dispatch_outbox()
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxMessage.STATUS_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.available_at, timezone.now())
+        self.assertIn('No handler', message.last_error)
+
+
+@override_settings(TASK_BACKEND='inprocess')
+class InProcessTaskBackendTests(TempMediaTestCase):
+    def test_delay_is_persisted_and_run_by_dispatcher(self):
+        with mock.patch('core.outbox.kick_dispatcher') as kick, mock.patch('core.analytics.refresh_rollups') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                refresh_analytics_rollups.delay(full=True)
+            kick.assert_called_once()
+            self.assertTrue(OutboxMessage.objects.filter(kind='task', status=OutboxMessage.STATUS_PENDING).exists())
+            refresh.assert_not_called()
+
+            dispatch_outbox()
+
+        refresh.assert_called_once_with(full=True)
+        self.assertEqual(OutboxMessage.objects.get(kind='task').status, OutboxMessage.STATUS_DONE)
+
+    @override_settings(TASK_INPROCESS_AUTOSTART=False)
+    def test_dispatcher_thread_is_not_started_when_autostart_is_off(self):
+        from .taskqueue import wake, worker
+
+        with mock.patch.object(worker, 'ensure_started') as ensure_started:
+            self.client.get('/api/sports/')
+            wake()
+        ensure_started.assert_not_called()
+
+
+class LoginThrottleTests(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        CustomUser.objects.create_user(email='Member@Example.com', password='right-password')
+
+    def login(self, email, password):
+        return self.client.post('/api/auth/jwt_login/', {'email': email, 'password': password}, format='json')
+
+    def test_login_is_case_insensitive_and_hashes_once(self):
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode', autospec=True,
+                        side_effect=PBKDF2PasswordHasher.encode) as encode:
+            self.assertEqual(self.login('member@example.com', 'right-password').status_code, 200)
+            self.assertEqual(self.login('member@example.com', 'wrong').status_code, 401)
+            self.assertEqual(self.login('nobody@example.com', 'wrong').status_code, 401)
+        self.assertEqual(encode.call_count, 3)
+
+    def test_emails_are_stored_lower_cased(self):
+        self.assertTrue(CustomUser.objects.filter(email='member@example.com').exists())
+        response = self.client.post(
+            '/api/auth/jwt_register/', {'email': 'MEMBER@example.com', 'password': 'x'}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_lower_lookup_is_limited_to_the_user_email(self):
+        from django.core.exceptions import FieldError
+        from django.db import models
+
+        self.assertTrue(CustomUser.objects.filter(email__lower='member@example.com').exists())
+        self.assertNotIn('lower', models.EmailField.get_lookups())
+        with self.assertRaises(FieldError):
+            Player.objects.filter(email__lower='member@example.com').exists()
+
+    def test_non_object_body_is_throttled_by_ip(self):
+        from rest_framework.parsers import JSONParser
+
+        from .throttling import AuthIdentifierThrottle
+
+        request = Request(APIRequestFactory().post('/', ['member@example.com'], format='json'), parsers=[JSONParser()])
+        throttle = AuthIdentifierThrottle()
+        self.assertEqual(throttle.get_cache_key(request, None),
+                         throttle.cache_format % {'scope': 'auth_identifier', 'ident': throttle.get_ident(request)})
+        for path, expected in (('/api/auth/jwt_login/', 401), ('/api/auth/jwt_register/', 400),
+                               ('/api/auth/password-reset/', 400)):
+            response = self.client.post(path, ['member@example.com'], format='json')
+            self.assertEqual(response.status_code, expected, path)
+
+    def test_identifier_is_throttled_before_hashing(self):
+        rates = {'auth_ip': '100/min', 'auth_identifier': '3/min'}
+        with mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', rates):
+            for _ in range(3):
+                self.assertEqual(self.login('member@example.com', 'wrong').status_code, 401)
+            with mock.patch('core.views.User.check_password') as check_password:
+                response = self.login('MEMBER@example.com', 'right-password')
+            self.assertEqual(response.status_code, 429)
+            check_password.assert_not_called()
+            # Other accounts are unaffected
+            self.assertEqual(self.login('other@example.com', 'wrong').status_code, 401)
+
+    def test_parallel_attempts_cannot_share_a_token(self):
+        import threading
+        from .throttling import AuthIPThrottle
+
+        from django.core.cache.backends.locmem import LocMemCache
+
+        slow_get = LocMemCache.get
+
+        def get(*args, **kwargs):
+            value = slow_get(*args, **kwargs)
+            time.sleep(0.01)  # widen the window between reading the bucket and writing it back
+            return value
+
+        request = RequestFactory().post('/api/auth/jwt_login/', REMOTE_ADDR='10.0.0.7')
+        allowed = []
+        with mock.patch.object(TokenBucketThrottle, 'THROTTLE_RATES', {'auth_ip': '2/min'}), \
+                mock.patch.object(LocMemCache, 'get', autospec=True, side_effect=get):
+            threads = [threading.Thread(target=lambda: allowed.append(AuthIPThrottle().allow_request(request, None)))
+                       for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(allowed), [False, False, False, True, True])
+
+    def test_accounts_without_a_password_still_hash(self):
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode', autospec=True,
+                        side_effect=PBKDF2PasswordHasher.encode) as encode:
+            CustomUser.objects.create_user(email='invited@example.com', password=None)
+            encode.reset_mock()
+            self.assertEqual(self.login('invited@example.com', 'guess').status_code, 401)
+        self.assertEqual(encode.call_count, 1)
+
+
+class CachedJWTAuthenticationTests(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='cached@example.com', password='secret')
+        token = RefreshToken.for_user(self.user).access_token
+        self.request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_user_and_profile_come_from_cache(self):
+        CachedJWTAuthentication().authenticate(self.request)
+        with self.assertNumQueries(0):
+            user, _ = CachedJWTAuthentication().authenticate(self.request)
+            self.assertEqual(user.profile.user_type, 'customer')
+
+    def test_profile_change_invalidates_cache(self):
+        CachedJWTAuthentication().authenticate(self.request)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.user_type = 'player'
+        profile.save()
+
+        user, _ = CachedJWTAuthentication().authenticate(self.request)
+        self.assertEqual(user.profile.user_type, 'player')
+
+    def test_user_cached_by_a_racing_read_is_not_served(self):
+        from .authentication import user_cache_key
+
+        # A request read the row, then the user was deactivated before it cached it
+        stale = CustomUser.objects.select_related('profile').get(pk=self.user.pk)
+        key = user_cache_key(self.user.pk)
+        self.user.is_active = False
+        self.user.save()
+        cache.set(key, stale, 60)
+
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(self.request)
+
+
+class PaymentGatewayTests(TempMediaTestCase):
+    def gateway(self, server, **kwargs):
+        return PaymentGateway('rzp_test', 'stub_secret', base_url=server.base_url, **kwargs)
+
+    def start(self, **kwargs):
+        server = start_stub_server('stub_secret', **kwargs)
+        self.addCleanup(server.shutdown)
+        return server
+
+    def test_order_round_trip_and_local_signature_check(self):
+        server = self.start()
+        gateway = self.gateway(server)
+
+        order = gateway.create_order(50000, notes={'booking_id': '7'})
+        callback = server.state.pay(order['id'])
+
+        self.assertEqual(gateway.fetch_order(order['id'])['status'], 'paid')
+        self.assertEqual(gateway.order_payments(order['id'])[0]['id'], callback['razorpay_payment_id'])
+        self.assertTrue(gateway.verify_payment_signature(
+            order['id'], callback['razorpay_payment_id'], callback['razorpay_signature']
+        ))
+        self.assertFalse(gateway.verify_payment_signature(order['id'], callback['razorpay_payment_id'], 'forged'))
+
+    def test_slow_gateway_times_out_and_opens_breaker(self):
+        server = self.start(latency=0.5)
+        gateway = self.gateway(
+            server, read_timeout=0.1, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        )
+        for _ in range(2):
+            with self.assertRaises(GatewayUnavailable):
+                gateway.fetch_order('order_missing')
+        self.assertEqual(gateway.breaker.state, 'open')
+
+        started = time.monotonic()
+        with self.assertRaises(GatewayUnavailable):
+            gateway.fetch_order('order_missing')
+        self.assertLess(time.monotonic() - started, 0.05)
+
+    def test_bad_requests_do_not_trip_breaker(self):
+        gateway = self.gateway(self.start(), breaker=CircuitBreaker(failure_threshold=1))
+        with self.assertRaises(BadRequestError):
+            gateway.fetch_order('order_missing')
+        self.assertEqual(gateway.breaker.state, 'closed')
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET='whsec')
+class RazorpayWebhookTests(TempMediaTestCase):
+    def setUp(self):
+        owner = CustomUser.objects.create_user(email='payer@example.com', password='secret')
+        sport = Sport.objects.create(name='Nets', price_per_hour=800, max_players=6)
+        self.slot = TimeSlot.objects.create(
+            sport=sport, date=timezone.now().date(), start_time=dt_time(9), end_time=dt_time(10),
+            price=800, is_booked=True,
+        )
+        self.booking = Booking.objects.create(user=owner, slot=self.slot, order_id='order_abc')
+        self.payment = {'id': 'pay_1', 'order_id': 'order_abc', 'amount': 80000, 'notes': {}}
+
+    def deliver(self, event, entity_name, entity, event_id=None, secret='whsec'):
+        body, headers = webhook_delivery(event, entity_name, entity, secret, event_id)
+        return APIClient().post(
+            '/api/payment/webhook/', body, content_type='application/json',
+            HTTP_X_RAZORPAY_SIGNATURE=headers['X-Razorpay-Signature'],
+            HTTP_X_RAZORPAY_EVENT_ID=headers['X-Razorpay-Event-Id'],
+        )
+
+    def test_captured_event_is_applied_once(self):
+        for _ in range(3):
+            response = self.deliver('payment.captured', 'payment', self.payment, event_id='evt_1')
+            self.assertEqual(response.status_code, 200)
+        # A redelivery under a new event id is recorded but changes nothing
+        self.assertFalse(self.deliver('payment.captured', 'payment', self.payment).data['applied'])
+
+        self.booking.refresh_from_db()
+        self.assertTrue(self.booking.payment_verified)
+        self.assertEqual(self.booking.status, 'confirmed')
+        self.assertEqual(self.booking.payment_id, 'pay_1')
+        self.assertEqual(self.booking.amount_paid, 800)
+        self.assertEqual(PaymentWebhookEvent.objects.count(), 2)
+        self.assertEqual(OutboxMessage.objects.filter(kind='organizer_qr').count(), 1)
+
+    def test_order_id_wins_over_notes(self):
+        other = Booking.objects.create(
+            user=self.booking.user, order_id='order_other',
+            slot=TimeSlot.objects.create(sport=self.slot.sport, date=self.slot.date, start_time=dt_time(11),
+                                         end_time=dt_time(12), price=800, is_booked=True),
+        )
+        payment = {**self.payment, 'order_id': 'order_other', 'notes': {'booking_id': str(self.booking.pk)}}
+        self.deliver('payment.captured', 'payment', payment)
+        other.refresh_from_db()
+        self.booking.refresh_from_db()
+        self.assertTrue(other.payment_verified)
+        self.assertFalse(self.booking.payment_verified)
+
+        # Notes are the fallback when no booking has the order id
+        self.deliver('payment.captured', 'payment', {**payment, 'id': 'pay_2', 'order_id': 'order_lost'})
+        self.booking.refresh_from_db()
+        self.assertTrue(self.booking.payment_verified)
+
+    def test_capture_below_slot_price_is_recorded_but_not_confirmed(self):
+        response = self.deliver('payment.captured', 'payment', {**self.payment, 'amount': 100})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['applied'])
+        self.assertEqual(PaymentWebhookEvent.objects.get().booking_id, self.booking.pk)
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.payment_verified, self.booking.status), (False, 'pending'))
+
+    def test_order_amount_comes_from_the_slot(self):
+        from . import payments
+
+        server = start_stub_server('stub_secret')
+        self.addCleanup(server.shutdown)
+        gateway = PaymentGateway('rzp_test', 'stub_secret', base_url=server.base_url)
+        client = APIClient()
+        client.force_authenticate(self.booking.user)
+        with mock.patch.object(payments, 'get_gateway', return_value=gateway):
+            response = client.post('/api/payment/create-order/', {'booking_id': self.booking.pk, 'amount': 1},
+                                   format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['amount'], 80000)
+            self.assertEqual(server.state.orders[response.data['order_id']]['amount'], 80000)
+            missing = client.post('/api/payment/create-order/', {'booking_id': 0}, format='json')
+        self.assertEqual(missing.status_code, 404)
+
+    def test_bad_signature_is_rejected(self):
+        response = self.deliver('payment.captured', 'payment', self.payment, secret='wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentWebhookEvent.objects.exists())
+
+    def test_full_refund_cancels_booking_and_frees_slot(self):
+        self.deliver('payment.captured', 'payment', self.payment)
+        self.deliver('refund.processed', 'refund', {'id': 'rfnd_1', 'payment_id': 'pay_1', 'amount': 80000})
+
+        self.booking.refresh_from_db()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.booking.status, 'cancelled')
+        self.assertFalse(self.slot.is_booked)
+
+
+class PaymentReconciliationTests(TempMediaTestCase):
+    def setUp(self):
+        self.server = start_stub_server('stub_secret')
+        self.addCleanup(self.server.shutdown)
+        self.gateway = PaymentGateway('rzp_test', 'stub_secret', base_url=self.server.base_url)
+        owner = CustomUser.objects.create_user(email='late@example.com', password='secret')
+        sport = Sport.objects.create(name='Turf', price_per_hour=600, max_players=10)
+        self.bookings = [
+            Booking.objects.create(user=owner, slot=TimeSlot.objects.create(
+                sport=sport, date=timezone.now().date(), start_time=dt_time(h), end_time=dt_time(h + 1), price=600,
+            ))
+            for h in (6, 7, 8)
+        ]
+        # 0: paid, order id never stored; 1: paid, order id stored; 2: abandoned checkout
+        for booking, pay in zip(self.bookings, (True, True, False)):
+            order = self.server.state.create_order({'amount': 60000, 'notes': {'booking_id': str(booking.pk)}})
+            if booking is self.bookings[1]:
+                Booking.objects.filter(pk=booking.pk).update(order_id=order['id'])
+            if pay:
+                self.server.state.pay(order['id'])
+
+    def test_dry_run_reports_without_writing(self):
+        report = reconcile_payments(dry_run=True, gateway=self.gateway)
+        self.assertEqual(
+            sorted((row['booking_id'], row['action']) for row in report),
+            sorted([(self.bookings[0].pk, 'confirmed'), (self.bookings[1].pk, 'confirmed'),
+                    (self.bookings[2].pk, 'order_id_stored')]),
+        )
+        self.assertFalse(Booking.objects.filter(payment_verified=True).exists())
+
+    def test_corrections_are_applied(self):
+        reconcile_payments(chunk_size=2, gateway=self.gateway)
+
+        confirmed, also_confirmed, abandoned = [Booking.objects.get(pk=b.pk) for b in self.bookings]
+        self.assertEqual((confirmed.status, confirmed.amount_paid), ('confirmed', 600))
+        self.assertTrue(confirmed.order_id and confirmed.payment_id)
+        self.assertEqual(also_confirmed.status, 'confirmed')
+        self.assertEqual(abandoned.status, 'pending')
+        self.assertTrue(abandoned.order_id)
+        self.assertEqual(reconcile_payments(gateway=self.gateway), [])
+
+    def test_paid_earlier_attempt_confirms_booking_with_a_newer_order(self):
+        abandoned = self.bookings[2]
+        earlier = self.server.state.create_order({'amount': 60000, 'notes': {'booking_id': str(abandoned.pk)}})
+        self.server.state.pay(earlier['id'])
+        retry = self.server.state.create_order({'amount': 60000, 'notes': {'booking_id': str(abandoned.pk)}})
+        Booking.objects.filter(pk=abandoned.pk).update(order_id=retry['id'])
+
+        reconcile_payments(gateway=self.gateway)
+
+        abandoned.refresh_from_db()
+        self.assertEqual((abandoned.status, abandoned.order_id), ('confirmed', earlier['id']))
+
+    def test_capture_below_slot_price_is_not_confirmed(self):
+        short = self.server.state.create_order({'amount': 100, 'notes': {'booking_id': str(self.bookings[2].pk)}})
+        self.server.state.pay(short['id'])
+
+        report = reconcile_payments(gateway=self.gateway)
+
+        self.assertIn((self.bookings[2].pk, 'amount_mismatch'), [(row['booking_id'], row['action']) for row in report])
+        booking = Booking.objects.get(pk=self.bookings[2].pk)
+        self.assertEqual((booking.status, booking.payment_verified), ('pending', False))
+
+
+class IdempotencyKeyTests(TempMediaTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='retry@example.com', password='secret')
+        sport = Sport.objects.create(name='Box', price_per_hour=400, max_players=8)
+        self.slot = TimeSlot.objects.create(
+            sport=sport, date=timezone.now().date(), start_time=dt_time(18), end_time=dt_time(19), price=400
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def book(self, key, slot=None):
+        return self.client.post(
+            '/api/bookings/', {'slot': (slot or self.slot).pk}, format='json', HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.book('k-1')
+        self.assertEqual(first.status_code, 201)
+        retry = self.book('k-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['id'], first.data['id'])
+        self.assertEqual(Booking.objects.count(), 1)
+        # Without the key the slot is already taken
+        self.assertEqual(self.client.post('/api/bookings/', {'slot': self.slot.pk}, format='json').status_code, 400)
+
+    def test_key_reused_for_other_request_is_rejected(self):
+        self.book('k-2')
+        other = TimeSlot.objects.create(
+            sport=self.slot.sport, date=self.slot.date, start_time=dt_time(19), end_time=dt_time(20), price=400
+        )
+        self.assertEqual(self.book('k-2', slot=other).status_code, 422)
+
+    def test_claim_left_by_a_crashed_worker_expires(self):
+        from .idempotency import IDEMPOTENCY_LEASE
+        from .models import IdempotencyRecord
+
+        self.book('k-3')
+        # As if the worker died after claiming the key, before the booking committed
+        Booking.objects.all().delete()
+        TimeSlot.objects.update(is_booked=False)
+        IdempotencyRecord.objects.update(status_code=None, response_body=None)
+        self.assertEqual(self.book('k-3').status_code, 409)
+
+        IdempotencyRecord.objects.update(created_at=timezone.now() - IDEMPOTENCY_LEASE - timedelta(seconds=1))
+        retry = self.book('k-3')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(self.book('k-3')['Idempotent-Replayed'], 'true')
+
+
+class ReferenceCacheTests(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.sport = Sport.objects.create(name='Nets', price_per_hour=500, max_players=6)
+        self.slot = TimeSlot.objects.create(
+            sport=self.sport, date=timezone.now().date(), start_time=dt_time(7), end_time=dt_time(8), price=500
+        )
+        self.client = APIClient()
+
+    def test_second_read_is_served_from_cache(self):
+        first = self.client.get('/api/slots/', {'sport': self.sport.pk})
+        with self.assertNumQueries(1):  # the conditional GET validator
+            second = self.client.get('/api/slots/', {'sport': self.sport.pk})
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(cache_metrics()['slots']['hits'], 1)
+        self.assertEqual(cache_metrics()['slots']['misses'], 1)
+
+    def test_save_bumps_dependent_namespaces(self):
+        self.client.get('/api/slots/')
+        self.client.get('/api/sports/', {'expand': 'available_slots_count'})
+        self.sport.name = 'Indoor Nets'
+        self.sport.save()
+
+        slots = self.client.get('/api/slots/').json()
+        self.assertEqual(slots[0]['sport_name'], 'Indoor Nets')
+        self.slot.delete()
+        sports = self.client.get('/api/sports/', {'expand': 'available_slots_count'}).json()
+        results = sports['results'] if isinstance(sports, dict) else sports
+        self.assertEqual(results[0]['available_slots_count'], 0)
+        self.assertEqual(cache_metrics()['sports']['hits'], 0)
+
+    def test_evicted_version_does_not_serve_stale_responses(self):
+        self.client.get('/api/slots/')
+        cache.delete('refcache:version:slots')
+        Sport.objects.update(name='Renamed')  # no signal, so only a new version hides the old entry
+
+        self.assertEqual(self.client.get('/api/slots/').json()[0]['sport_name'], 'Renamed')
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'core.cache_backends.FailOpenRedisCache', 'LOCATION': 'redis://127.0.0.1:1/0',
+    }})
+    def test_unreachable_redis_fails_open(self):
+        with self.assertLogs('core.cache_backends', 'WARNING'):
+            user = CustomUser.objects.create_user(email='outage@example.com', password='secret')
+            token = RefreshToken.for_user(user).access_token
+            self.assertEqual(self.client.get('/api/slots/').status_code, 200)
+            response = self.client.get('/api/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}')
+            self.assertEqual(cache_metrics()['slots']['hits'], 0)
+        self.assertEqual(response.status_code, 200)
+
+    def test_metrics_require_staff(self):
+        user = CustomUser.objects.create_user(email='viewer@example.com', password='secret')
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get('/api/cache/metrics/').status_code, 403)
+        user.is_staff = True
+        user.save()
+        self.client.force_authenticate(user)
+        self.assertIn('slots', self.client.get('/api/cache/metrics/').json())
+
+
+class ConditionalGetTests(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='poller@example.com', password='secret')
+        sport = Sport.objects.create(name='Turf', price_per_hour=600, max_players=10)
+        self.slot = TimeSlot.objects.create(
+            sport=sport, date=timezone.now().date(), start_time=dt_time(9), end_time=dt_time(10), price=600
+        )
+        self.booking = Booking.objects.create(user=self.user, slot=self.slot)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_bookings_answer_304_without_serializing(self):
+        first = self.client.get('/api/bookings/my_bookings/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(1):
+            again = self.client.get('/api/bookings/my_bookings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        self.assertNotIn('Last-Modified', first)
+
+    def test_changes_and_other_users_get_fresh_responses(self):
+        etag = self.client.get('/api/bookings/my_bookings/')['ETag']
+        self.slot.max_players = 12
+        self.slot.save()  # embedded in slot_details
+        changed = self.client.get('/api/bookings/my_bookings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+
+        other = CustomUser.objects.create_user(email='other@example.com', password='secret')
+        self.client.force_authenticate(other)
+        self.assertEqual(
+            self.client.get('/api/bookings/my_bookings/', HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 200
+        )
+
+    def test_deleting_a_player_changes_the_etag(self):
+        players = [
+            Player.objects.create(booking=self.booking, name=name, email=f'{name}@example.com') for name in 'ab'
+        ]
+        first = self.client.get('/api/bookings/my_bookings/')
+        detail = self.client.get(f'/api/bookings/{self.booking.pk}/')
+        players[0].delete()
+        changed = self.client.get('/api/bookings/my_bookings/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()[0]['player_count'], 1)
+        changed = self.client.get(f'/api/bookings/{self.booking.pk}/', HTTP_IF_NONE_MATCH=detail['ETag'])
+        self.assertEqual(len(changed.json()['players']), 1)
+        # A date alone cannot tell the deletion happened
+        since = self.client.get('/api/bookings/my_bookings/', HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(since.status_code, 200)
+
+    def test_player_me_and_slots(self):
+        player = Player.objects.create(booking=self.booking, name='Asha', email='poller@example.com', user=self.user)
+        me = self.client.get('/api/players/me/')
+        self.assertEqual(me.status_code, 200)
+        self.assertEqual(self.client.get('/api/players/me/', HTTP_IF_NONE_MATCH=me['ETag']).status_code, 304)
+        player.check_in_count = 1
+        player.save()
+        self.assertEqual(self.client.get('/api/players/me/', HTTP_IF_NONE_MATCH=me['ETag']).status_code, 200)
+
+        slots = self.client.get('/api/slots/')
+        self.assertEqual(self.client.get('/api/slots/', HTTP_IF_NONE_MATCH=slots['ETag']).status_code, 304)
+
+
+class RendererTests(TempMediaTestCase):
+    def test_orjson_output_matches_drf_json(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import ORJSONRenderer
+
+        data = {
+            'price': Decimal('12.50'), 'day': date(2025, 1, 2), 'at': dt_time(9, 30, 1, 123456),
+            'when': timezone.now(), 'text': 'line break é', 7: [1.5, None, True],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    @override_settings(GZIP_MIN_LENGTH=1024)
+    def test_large_responses_are_gzipped(self):
+        sport = Sport.objects.create(name='Nets', price_per_hour=500, max_players=6)
+        for hour in range(6, 18):
+            TimeSlot.objects.create(
+                sport=sport, date=timezone.now().date(), start_time=dt_time(hour), end_time=dt_time(hour + 1), price=500
+            )
+        client = APIClient()
+        response = client.get('/api/slots/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        small = client.get('/api/break-times/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    @skipUnless(msgpack, 'msgpack is not installed')
+    def test_msgpack_is_negotiated_and_parsed(self):
+        import json
+
+        Sport.objects.create(name='Nets', price_per_hour=Decimal('500.00'), max_players=6)
+        client = APIClient()
+        as_json = json.loads(client.get('/api/sports/').content)
+        for kwargs in ({'HTTP_ACCEPT': 'application/msgpack'}, {'data': {'format': 'msgpack'}}):
+            response = client.get('/api/sports/', **kwargs)
+            self.assertEqual(response['Content-Type'], 'application/msgpack')
+            # Same scalars as JSON: Decimals and dates arrive as strings
+            self.assertEqual(msgpack.unpackb(response.content), as_json)
+
+        CustomUser.objects.create_user(email='packed@example.com', password='secret')
+        body = msgpack.packb({'email': 'packed@example.com', 'password': 'secret'})
+        response = client.post('/api/auth/jwt_login/', body, content_type='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+        response = client.post('/api/auth/jwt_login/', b'\xc1', content_type='application/msgpack')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('MessagePack parse error', response.json()['detail'])
+
+    @skipIf(msgpack, 'msgpack is installed')
+    def test_msgpack_is_not_offered_without_the_library(self):
+        response = APIClient().get('/api/sports/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 406)
+
+
+class FieldsetTests(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(email='desk@example.com', password='secret', is_staff=True)
+        sport = Sport.objects.create(name='Nets', price_per_hour=500, max_players=6)
+        for hour in range(6, 9):
+            slot = TimeSlot.objects.create(
+                sport=sport, date=timezone.now().date(), start_time=dt_time(hour), end_time=dt_time(hour + 1), price=500
+            )
+            booking = Booking.objects.create(user=self.admin, slot=slot)
+            for n in range(3):
+                Player.objects.create(booking=booking, name=f'P{n}', email=f'p{hour}{n}@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def results(self, response):
+        data = response.json()
+        return data['results'] if isinstance(data, dict) else data
+
+    def test_list_is_lean_and_detail_is_full(self):
+        row = self.results(self.client.get('/api/bookings/'))[0]
+        self.assertNotIn('players', row)
+        self.assertNotIn('slot_details', row)
+        self.assertIn('player_count', row)
+        detail = self.client.get(f"/api/bookings/{row['id']}/").json()
+        self.assertEqual(len(detail['players']), 3)
+        self.assertIn('sport_details', detail['slot_details'])
+
+    def test_fields_and_expand(self):
+        rows = self.results(self.client.get('/api/bookings/', {'fields': 'id,status,slot_details.date'}))
+        self.assertEqual(set(rows[0]), {'id', 'status', 'slot_details'})
+        self.assertEqual(set(rows[0]['slot_details']), {'date'})
+
+        rows = self.results(self.client.get('/api/bookings/', {'expand': 'players,slot_details.sport_details'}))
+        self.assertEqual(len(rows[0]['players']), 3)
+        self.assertNotIn('booking_details', rows[0]['players'][0])
+        self.assertIn('sport_details', rows[0]['slot_details'])
+
+    def test_eager_loading_follows_requested_fields(self):
+        expand = {'expand': 'players.booking_details,slot_details,user_details'}
+        self.client.get('/api/bookings/', expand)
+        # validator, count, bookings + slot/sport/user, players, active blackouts
+        with self.assertNumQueries(5):
+            rows = self.results(self.client.get('/api/bookings/', expand))
+        self.assertEqual(rows[0]['players'][0]['booking_details']['sport'], 'Nets')
+
+
+class QueryCountTests(TempMediaTestCase):
+    """Each endpoint runs a fixed number of queries however many rows it returns"""
+
+    def setUp(self):
+        from .models import BlackoutDate, BookingConfiguration, BreakTime
+
+        self.user = CustomUser.objects.create_user(email='org@example.com', password='secret')
+        self.admin = CustomUser.objects.create_user(email='admin@example.com', password='secret', is_staff=True)
+        self.client = APIClient()
+        self.sports = []
+        for name in ('Nets', 'Turf'):
+            sport = Sport.objects.create(name=name, price_per_hour=500)
+            BookingConfiguration.objects.create(sport=sport)
+            BreakTime.objects.create(sport=sport, start_time=dt_time(12), end_time=dt_time(13))
+            BlackoutDate.objects.create(sport=sport, date=timezone.now().date(), reason='Maintenance')
+            self.sports.append(sport)
+        self.days = 0
+
+    def add_bookings(self, count):
+        for sport in self.sports:
+            for _ in range(count):
+                day = timezone.now().date() + timedelta(days=self.days)
+                slot = TimeSlot.objects.create(sport=sport, date=day, start_time=dt_time(6), end_time=dt_time(7),
+                                               price=500, is_booked=True)
+                TimeSlot.objects.create(sport=sport, date=day, start_time=dt_time(7), end_time=dt_time(8), price=500)
+                booking = Booking.objects.create(user=self.user, slot=slot)
+                for n in range(2):
+                    Player.objects.create(booking=booking, name=f'P{n}', email=f'p{booking.pk}-{n}@example.com',
+                                          user=self.user)
+                self.days += 1
+
+    def query_counts(self, user, path, params=None):
+        counts = []
+        for size in (1, 3):
+            self.add_bookings(size)
+            cache.clear()
+            self.client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(path, params)
+            self.assertEqual(response.status_code, 200, path)
+            counts.append(len(queries))
+        return counts
+
+    def test_query_count_does_not_grow_with_rows(self):
+        endpoints = [
+            (self.user, '/api/sports/', None),
+            (self.user, '/api/sports/', {'expand': 'available_slots_count'}),
+            (self.user, '/api/slots/', None),
+            (self.user, '/api/slots/', {'expand': 'sport_details'}),
+            (self.user, '/api/bookings/', None),
+            (self.user, '/api/bookings/', {'expand': 'players.booking_details,slot_details.sport_details'}),
+            (self.user, '/api/bookings/my_bookings/', None),
+            (self.user, '/api/bookings/my_bookings/', {'fields': 'id,sport_name,player_count'}),
+            (self.admin, '/api/players/', None),
+            (self.admin, '/api/players/', {'expand': 'booking_details'}),
+            (self.user, '/api/players/me/', None),
+            (self.user, '/api/booking-configurations/', None),
+            (self.user, '/api/break-times/', None),
+            (self.user, '/api/blackout-dates/', None),
+        ]
+        for user, path, params in endpoints:
+            with self.subTest(path=path, params=params):
+                small, large = self.query_counts(user, path, params)
+                self.assertEqual(small, large)
+
+    def test_detail_and_custom_actions(self):
+        self.add_bookings(1)
+        booking = Booking.objects.first()
+        self.client.force_authenticate(self.user)
+        for path in (f'/api/bookings/{booking.pk}/', f'/api/bookings/{booking.pk}/players/'):
+            with self.subTest(path=path):
+                self.client.get(path)
+                cache.clear()
+                with CaptureQueriesContext(connection) as small:
+                    self.client.get(path)
+                for n in range(4):
+                    Player.objects.create(booking=booking, name=f'X{n}', email=f'x{n}@example.com')
+                with CaptureQueriesContext(connection) as large:
+                    self.assertEqual(self.client.get(path).status_code, 200)
+                self.assertEqual(len(small), len(large))
+
+
+class FastSerializerParityTests(TempMediaTestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from .models import BlackoutDate
+
+        self.user = CustomUser.objects.create_user(
+            email='org@example.com', password='secret', first_name='Ravi', last_name='Kumar'
+        )
+        today = timezone.now().date()
+        sport = Sport.objects.create(name='Nets', price_per_hour=Decimal('450.5'), max_players=6)
+        other = Sport.objects.create(name='Turf', price_per_hour=900, max_players=12, description='Outdoor')
+        BlackoutDate.objects.create(sport=other, date=today, reason='Maintenance')
+        slots = [
+            TimeSlot.objects.create(sport=sport, date=today, start_time=dt_time(6), end_time=dt_time(7), price=450),
+            TimeSlot.objects.create(sport=other, date=today, start_time=dt_time(7, 30), end_time=dt_time(8), price=900),
+            TimeSlot.objects.create(
+                sport=sport, date=today - timedelta(days=1), start_time=dt_time(9), end_time=dt_time(10), price=450
+            ),
+            TimeSlot.objects.create(sport=sport, date=today, start_time=dt_time(11), end_time=dt_time(12), price=450),
+        ]
+        paid = Booking.objects.create(user=self.user, slot=slots[0], payment_verified=True, amount_paid=Decimal('450'))
+        Booking.objects.create(user=self.user, slot=slots[1])
+        Player.objects.create(booking=paid, name='Asha', email='org@example.com', user=self.user)
+        checked_in = Player.objects.create(booking=paid, name='Bala', email='bala@example.com', phone='98765')
+        checked_in.check_in_count = 1
+        checked_in.last_check_in = timezone.now()
+        checked_in.save()
+        Player.objects.filter(pk=checked_in.pk).update(qr_code='qr_codes/bala.png')
+        Booking.objects.filter(pk=paid.pk).update(organizer_qr_code='qr_codes/organizers/paid.png')
+        CustomUser.objects.filter(pk=self.user.pk).update(qr_code='qr_codes/users/org.png')
+        self.request = Request(APIRequestFactory().get('/'))
+
+    def assertSameOutput(self, fast, drf):
+        from .renderers import ORJSONRenderer
+        self.assertEqual(ORJSONRenderer().render(fast), ORJSONRenderer().render(drf))
+
+    def test_slot_rows_match_time_slot_serializer(self):
+        from .fastserializers import slot_rows
+        from .serializers import TimeSlotSerializer
+
+        queryset = TimeSlot.objects.order_by('date', 'start_time')
+        self.assertSameOutput(slot_rows(queryset, sport_details=True), TimeSlotSerializer(queryset, many=True).data)
+
+    def test_booking_list_rows_match_booking_list_serializer(self):
+        from django.db.models import Count
+        from .fastserializers import booking_list_rows
+        from .serializers import BookingListSerializer
+
+        queryset = (Booking.objects.filter(user=self.user).annotate(player_count=Count('players'))
+                    .order_by('-created_at'))
+        context = {'request': self.request}
+        self.assertSameOutput(
+            booking_list_rows(queryset, self.request), BookingListSerializer(queryset, many=True, context=context).data
+        )
+        self.assertSameOutput(booking_list_rows(queryset), BookingListSerializer(queryset, many=True).data)
+
+    def test_player_rows_match_player_serializer(self):
+        from .fastserializers import player_rows
+        from .serializers import PlayerSerializer
+
+        queryset = Player.objects.all()
+        context = {'request': self.request}
+        self.assertSameOutput(
+            player_rows(queryset, self.request), PlayerSerializer(queryset, many=True, context=context).data
+        )
+
+    def test_endpoints_use_fast_path(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.assertNumQueries(2):  # validator, bookings with player counts
+            bookings = client.get('/api/bookings/my_bookings/').json()
+        self.assertEqual([b['player_count'] for b in bookings], [0, 2])
+        self.assertNotIn('players', bookings[1])
+        # Players come with the detail view, in one prefetch
+        with self.assertNumQueries(5):  # validator, booking + slot/sport/user, players, free slots, blackouts
+            detail = client.get(f"/api/bookings/{bookings[1]['id']}/").json()
+        self.assertEqual(detail['players'][0]['booking_details']['organizer_name'], 'Ravi Kumar')
+        self.assertEqual(detail['player_count'], 2)
+        self.assertEqual(len(client.get('/api/players/me/').json()), 1)
+        slots = client.get('/api/slots/').json()
+        self.assertNotIn('sport_details', slots[0])
+        self.assertFalse(next(s for s in slots if s['sport_name'] == 'Turf')['is_available'])  # blackout
+
+
+class DeltaSyncTests(TempMediaTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='org@example.com', password='secret')
+        self.other = CustomUser.objects.create_user(email='other@example.com', password='secret')
+        self.sport = Sport.objects.create(name='Nets', price_per_hour=500)
+        today = timezone.now().date()
+        self.slot = TimeSlot.objects.create(sport=self.sport, date=today, start_time=dt_time(6),
+                                            end_time=dt_time(7), price=500, is_booked=True)
+        self.booking = Booking.objects.create(user=self.user, slot=self.slot)
+        self.player = Player.objects.create(booking=self.booking, name='Asha', email='asha@example.com')
+        other_slot = TimeSlot.objects.create(sport=self.sport, date=today, start_time=dt_time(8),
+                                             end_time=dt_time(9), price=500, is_booked=True)
+        self.other_booking = Booking.objects.create(user=self.other, slot=other_slot)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, section):
+        return [row['id'] for row in section['updated']]
+
+    def test_full_snapshot_then_only_changes(self):
+        first = self.client.get('/api/sync/').json()
+        self.assertTrue(first['reset'])
+        self.assertEqual(self.ids(first['bookings']), [self.booking.pk])
+        self.assertEqual(self.ids(first['players']), [self.player.pk])
+        self.assertEqual(len(first['slots']['updated']), 2)
+
+        # Everything is older than the cursor lag
+        past = timezone.now() - timedelta(minutes=1)
+        for model in (Sport, TimeSlot, Booking, Player):
+            model.objects.update(updated_at=past)
+        from .models import SyncTombstone
+        SyncTombstone.objects.update(deleted_at=past)
+
+        with mock.patch('core.sync.CURSOR_LAG', timedelta(0)):
+            cursor = self.client.get('/api/sync/').json()['cursor']
+        player_id = self.player.pk
+        self.player.delete()
+        self.other_booking.delete()
+
+        delta = self.client.get('/api/sync/', {'since': cursor}).json()
+        self.assertFalse(delta['reset'])
+        self.assertEqual(delta['sports']['updated'], [])
+        # Untouched itself, but its player_count dropped
+        self.assertEqual(self.ids(delta['bookings']), [self.booking.pk])
+        self.assertEqual(delta['bookings']['updated'][0]['player_count'], 0)
+        self.assertEqual(delta['bookings']['deleted'], [])  # someone else's booking
+        self.assertEqual(delta['players'], {'updated': [], 'deleted': [player_id]})
+
+    def test_changes_to_embedded_rows_resend_their_records(self):
+        past = timezone.now() - timedelta(minutes=1)
+        for model in (Sport, TimeSlot, Booking, Player):
+            model.objects.update(updated_at=past)
+        with mock.patch('core.sync.CURSOR_LAG', timedelta(0)):
+            cursor = self.client.get('/api/sync/').json()['cursor']
+
+        Player.objects.create(booking=self.booking, name='Ravi')
+        delta = self.client.get('/api/sync/', {'since': cursor}).json()
+        self.assertEqual(self.ids(delta['bookings']), [self.booking.pk])
+        self.assertEqual(delta['bookings']['updated'][0]['player_count'], 2)
+        self.assertEqual(len(delta['players']['updated']), 1)
+        self.assertEqual(delta['slots']['updated'], [])
+
+        Sport.objects.filter(pk=self.sport.pk).update(name='Indoor Nets', updated_at=timezone.now())
+        delta = self.client.get('/api/sync/', {'since': cursor}).json()
+        self.assertEqual([row['sport_name'] for row in delta['bookings']['updated']], ['Indoor Nets'])
+        self.assertEqual(sorted(self.ids(delta['players'])), sorted(Player.objects.values_list('id', flat=True)))
+        self.assertEqual(len(delta['slots']['updated']), 2)
+
+    def test_disabled_slots_and_bad_cursors(self):
+        cursor = self.client.get('/api/sync/').json()['cursor']
+        TimeSlot.objects.filter(pk=self.slot.pk).update(admin_disabled=True, updated_at=timezone.now())
+        delta = self.client.get('/api/sync/', {'since': cursor}).json()
+        self.assertIn(self.slot.pk, delta['slots']['deleted'])
+        self.assertNotIn(self.slot.pk, self.ids(delta['slots']))
+
+        self.assertEqual(self.client.get('/api/sync/', {'since': 'not-a-cursor'}).status_code, 400)
+        from .sync import encode_cursor
+        stale = encode_cursor(timezone.now() - timedelta(days=60))
+        self.assertTrue(self.client.get('/api/sync/', {'since': stale}).json()['reset'])
+
+
+class BootstrapTests(TempMediaTestCase):
+    def setUp(self):
+        from .models import BookingConfiguration
+
+        self.user = CustomUser.objects.create_user(email='org@example.com', password='secret', first_name='Ravi')
+        self.sport = Sport.objects.create(name='Nets', price_per_hour=500)
+        BookingConfiguration.objects.create(sport=self.sport)
+        slot = TimeSlot.objects.create(sport=self.sport, date=timezone.now().date(), start_time=dt_time(6),
+                                       end_time=dt_time(7), price=500, is_booked=True)
+        self.booking = Booking.objects.create(user=self.user, slot=slot)
+        Player.objects.create(booking=self.booking, name='Asha', email='asha@example.com', user=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def test_matches_individual_endpoints(self):
+        data = self.client.get('/api/bootstrap/').json()
+        self.assertEqual(data['user'], self.client.get('/api/users/me/').json())
+        self.assertEqual(data['my_bookings'], self.client.get('/api/bookings/my_bookings/').json())
+        self.assertEqual(data['players'], self.client.get('/api/players/me/').json())
+        self.assertEqual([s['name'] for s in data['sports']], ['Nets'])
+        self.assertEqual(data['booking_configurations'][0]['sport_name'], 'Nets')
+
+    def test_cached_until_user_data_or_reference_data_changes(self):
+        self.client.get('/api/bootstrap/')
+        with self.assertNumQueries(2):  # booking and player validators
+            self.client.get('/api/bootstrap/')
+
+        Booking.objects.filter(pk=self.booking.pk).update(status='confirmed', updated_at=timezone.now())
+        self.assertEqual(self.client.get('/api/bootstrap/').json()['my_bookings'][0]['status'], 'confirmed')
+
+        Player.objects.create(booking=self.booking, name='Bala', email='bala@example.com')
+        self.assertEqual(self.client.get('/api/bootstrap/').json()['my_bookings'][0]['player_count'], 2)
+
+        self.sport.name = 'Box Nets'
+        self.sport.save()
+        self.assertEqual(self.client.get('/api/bootstrap/').json()['sports'][0]['name'], 'Box Nets')
+
+
+class BatchRequestTests(TempMediaTestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(email='admin@example.com', password='secret', is_staff=True)
+        sport = Sport.objects.create(name='Nets', price_per_hour=500)
+        slot = TimeSlot.objects.create(sport=sport, date=timezone.now().date(), start_time=dt_time(6),
+                                       end_time=dt_time(7), price=500, is_booked=True)
+        self.booking = Booking.objects.create(user=self.admin, slot=slot)
+        Player.objects.create(booking=self.booking, name='Asha', email='asha@example.com')
+        self.client = APIClient()
+
+    def test_runs_sub_requests_as_the_caller(self):
+        token = str(RefreshToken.for_user(self.admin).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.post('/api/batch/', {'requests': [
+            {'method': 'GET', 'path': f'/api/bookings/{self.booking.pk}/players/'},
+            {'path': '/api/bookings/my_bookings/?fields=id,player_count'},
+            {'method': 'POST', 'path': f'/api/bookings/{self.booking.pk}/cancel/', 'body': {'reason': 'Rain'}},
+            {'path': '/api/nowhere/'},
+            {'path': '/api/batch/', 'method': 'POST'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['responses']
+        self.assertEqual([r['status'] for r in results], [200, 200, 200, 404, 400])
+        self.assertEqual(results[0]['body'][0]['name'], 'Asha')
+        self.assertEqual(results[1]['body'], [{'id': self.booking.pk, 'player_count': 1}])
+        self.assertIn('ETag', results[1]['headers'])
+        self.booking.refresh_from_db()
+        self.assertTrue(self.booking.is_cancelled)
+
+    def test_batch_size_is_capped(self):
+        from .batch import MAX_BATCH_SIZE
+
+        self.client.force_authenticate(self.admin)
+        too_many = [{'path': '/api/sports/'}] * (MAX_BATCH_SIZE + 1)
+        self.assertEqual(self.client.post('/api/batch/', {'requests': too_many}, format='json').status_code, 400)
+        self.assertEqual(self.client.post('/api/batch/', {'requests': []}, format='json').status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.client.post('/api/batch/', {'requests': [{'path': '/api/sports/'}]}, format='json').status_code, 401
+        )
+
+    def test_body_must_be_an_object(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post('/api/batch/', [{'path': '/api/sports/'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_api_paths_are_batched(self):
+        self.client.force_authenticate(self.admin)
+        with mock.patch('core.batch.resolve') as resolve:
+            response = self.client.post('/api/batch/', {'requests': [
+                {'path': '/admin/'}, {'path': 'api/sports/'}, {'path': '/api/batch'}, {'path': '/api/batch/?x=1'},
+            ]}, format='json')
+        resolve.assert_not_called()
+        self.assertEqual([r['status'] for r in response.json()['responses']], [400, 400, 400, 400])
+
+    def test_other_credentials_do_not_reach_jwt_only_views(self):
+        import base64
+
+        basic = base64.b64encode(b'admin@example.com:secret').decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {basic}')
+        self.assertEqual(self.client.get('/api/bookings/my_bookings/').status_code, 401)
+        response = self.client.post('/api/batch/', {'requests': [{'path': '/api/bookings/my_bookings/'}]},
+                                    format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class AnalyticsRollupTests(TempMediaTestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(email='finance@example.com', password='secret', is_staff=True)
+        self.sport = Sport.objects.create(name='Turf', price_per_hour=600, max_players=10)
+        self.day = timezone.now().date() - timedelta(days=2)
+        self.slots = [
+            TimeSlot.objects.create(sport=self.sport, date=self.day, start_time=dt_time(h), end_time=dt_time(h + 1),
+                                    price=600)
+            for h in (6, 7)
+        ]
+        self.booking = Booking.objects.create(user=self.admin, slot=self.slots[0], payment_verified=True,
+                                              amount_paid=Decimal('600'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.window = {'start': self.day.isoformat(), 'end': self.day.isoformat()}
+
+    def revenue(self):
+        return self.client.get('/api/analytics/revenue/', self.window).json()['results']
+
+    def test_command_builds_rollups_served_by_the_endpoints(self):
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('refresh_rollups', '--full', stdout=out)
+        self.assertIn('for 1 days', out.getvalue())
+
+        [row] = self.revenue()
+        self.assertEqual((row['sport'], row['bookings'], Decimal(str(row['revenue']))), (self.sport.pk, 1, 600))
+        [row] = self.client.get('/api/analytics/utilization/', self.window).json()['results']
+        self.assertEqual((row['slots_offered'], row['slots_booked'], row['utilization']), (2, 1, 0.5))
+
+    def test_task_refreshes_only_days_touched_since_the_last_run(self):
+        self.assertEqual(refresh_analytics_rollups(full=True), 1)
+        self.assertEqual(refresh_analytics_rollups(), 0)
+
+        self.booking.delete()
+        self.assertEqual(refresh_analytics_rollups(), 1)
+        self.assertEqual(self.revenue()[0]['bookings'], 0)
+
+        # A day with every slot deleted loses its rollup row
+        TimeSlot.objects.filter(date=self.day).delete()
+        refresh_analytics_rollups()
+        self.assertEqual(self.revenue(), [])
+
+    def test_bad_params_and_non_staff_are_rejected(self):
+        for params in ({'sport': 'abc'}, {'granularity': 'hour'}, {'start': '2026-02-30'},
+                       {'start': '2026-03-02', 'end': '2026-03-01'}):
+            for endpoint in ('revenue', 'utilization'):
+                response = self.client.get(f'/api/analytics/{endpoint}/', params)
+                self.assertEqual(response.status_code, 400, (endpoint, params))
+        self.client.force_authenticate(CustomUser.objects.create_user(email='coach@example.com', password='secret'))
+        self.assertEqual(self.client.get('/api/analytics/revenue/').status_code, 403)
+
+
+class HeatmapTests(TempMediaTestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = CustomUser.objects.create_user(email='ops@example.com', password='secret', is_staff=True)
+        self.sport = Sport.objects.create(name='Nets', price_per_hour=500, max_players=6)
+        # A Wednesday in the past, so no-shows count
+        self.day = date(2026, 3, 4)
+        booked, _ = [
+            TimeSlot.objects.create(sport=self.sport, date=self.day + timedelta(days=7 * week),
+                                    start_time=dt_time(18), end_time=dt_time(19), price=500)
+            for week in (0, 1)
+        ]
+        booking = Booking.objects.create(user=self.admin, slot=booked)
+        Player.objects.create(booking=booking, name='Came', check_in_count=1)
+        Player.objects.create(booking=booking, name='Stayed home')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cells_hold_booking_and_no_show_rates(self):
+        from .analytics import compute_heatmap
+
+        data = compute_heatmap(self.day, self.day + timedelta(days=7))
+        self.assertEqual(data['sports'], [{'id': self.sport.pk, 'name': 'Nets'}])
+        wednesday = data['weekdays'].index('Wed')
+        self.assertEqual(data['offered'][0][wednesday][18], 2)
+        self.assertEqual(data['booking_rate'][0][wednesday][18], 0.5)
+        self.assertEqual(data['no_show_rate'][0][wednesday][18], 0.5)
+        self.assertIsNone(data['offered'][0][wednesday][17])
+        self.assertIsNone(data['booking_rate'][0][0][18])
+
+    def test_endpoint_filters_by_sport_and_rejects_bad_params(self):
+        window = {'start': '2026-03-01', 'end': '2026-03-31'}
+        other = Sport.objects.create(name='Turf', price_per_hour=600, max_players=10)
+        response = self.client.get('/api/analytics/heatmap/', {**window, 'sport': other.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['sports'], [])
+        data = self.client.get('/api/analytics/heatmap/', window).json()
+        self.assertEqual([len(data['offered'][0]), len(data['offered'][0][0])], [7, 24])
+
+        self.assertEqual(self.client.get('/api/analytics/heatmap/', {**window, 'sport': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/analytics/heatmap/', {'start': 'soon'}).status_code, 400)
+        self.client.force_authenticate(CustomUser.objects.create_user(email='coach2@example.com', password='secret'))
+        self.assertEqual(self.client.get('/api/analytics/heatmap/', window).status_code, 403)
+
+
+class ExportTests(TempMediaTestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(email='books@example.com', password='secret', is_staff=True)
+        self.sport = Sport.objects.create(name='Nets', price_per_hour=500, max_players=6)
+        self.slots = [
+            TimeSlot.objects.create(sport=self.sport, date=date(2026, 3, day), start_time=dt_time(6),
+                                    end_time=dt_time(7), price=500)
+            for day in (1, 2, 3)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, kind, **params):
+        return self.client.get(f'/api/exports/{kind}/', params)
+
+    def test_csv_streams_header_and_rows(self):
+        import csv
+
+        response = self.export('slots')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="slots-', response['Content-Disposition'])
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'sport', 'date'])
+        self.assertEqual([row[2] for row in rows[1:]], ['2026-03-01', '2026-03-02', '2026-03-03'])
+
+    def test_jsonl_honours_inclusive_date_bounds_and_sport(self):
+        import json
+
+        response = self.export('slots', output='jsonl', start='2026-03-02', end='2026-03-03', sport=self.sport.pk)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['date'] for line in lines], ['2026-03-02', '2026-03-03'])
+        other = Sport.objects.create(name='Turf', price_per_hour=600, max_players=10)
+        response = self.export('slots', output='jsonl', sport=other.pk)
+        self.assertEqual(b''.join(response.streaming_content), b'')
+
+    def test_user_and_organizer_checkins_are_exported(self):
+        import json
+
+        booking = Booking.objects.create(user=self.admin, slot=self.slots[0])
+        UserCheckInLog.objects.create(user=self.admin, action='IN')
+        OrganizerCheckInLog.objects.create(booking=booking, user=self.admin, action='OUT')
+
+        lines = b''.join(self.export('user_checkins', output='jsonl').streaming_content).decode().splitlines()
+        self.assertEqual([(row['user_email'], row['action']) for row in map(json.loads, lines)],
+                         [('books@example.com', 'IN')])
+        response = self.export('organizer_checkins', output='jsonl', sport=self.sport.pk)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([(row['booking_id'], row['sport'], row['action']) for row in rows],
+                         [(booking.pk, 'Nets', 'OUT')])
+        self.assertEqual(self.export('user_checkins', sport=self.sport.pk).status_code, 400)
+
+    def test_bad_requests_are_rejected_before_streaming(self):
+        self.assertEqual(self.export('invoices').status_code, 404)
+        self.assertEqual(self.export('slots', output='xml').status_code, 400)
+        self.assertEqual(self.export('slots', start='2026-13-01').status_code, 400)
+        self.assertEqual(self.export('bookings', sport='abc').status_code, 400)
+        self.client.force_authenticate(CustomUser.objects.create_user(email='coach3@example.com', password='secret'))
+        self.assertEqual(self.export('slots').status_code, 403)
+
+
+class ActivityStreamTests(TempMediaTestCase):
+    def setUp(self):
+        from .models import CheckInLog, OrganizerCheckInLog, UserCheckInLog
+
+        self.admin = CustomUser.objects.create_user(email='desk@example.com', password='secret', is_staff=True)
+        self.sport = Sport.objects.create(name='Nets', price_per_hour=500, max_players=6)
+        slot = TimeSlot.objects.create(sport=self.sport, date=timezone.now().date(), start_time=dt_time(6),
+                                       end_time=dt_time(7), price=500)
+        self.booking = Booking.objects.create(user=self.admin, slot=slot)
+        player = Player.objects.create(booking=self.booking, name='Asha')
+        self.tie = timezone.now().replace(microsecond=0) - timedelta(hours=1)
+        # Three rows of each kind, all sharing one timestamp, plus one newer player row
+        for _ in range(3):
+            CheckInLog.objects.create(player=player, action='IN')
+            UserCheckInLog.objects.create(user=self.admin, action='IN')
+            OrganizerCheckInLog.objects.create(booking=self.booking, user=self.admin, action='IN')
+        for model in (CheckInLog, UserCheckInLog, OrganizerCheckInLog):
+            model.objects.update(timestamp=self.tie)
+        self.newest = CheckInLog.objects.create(player=player, action='OUT')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def pages(self, **params):
+        rows, cursor = [], None
+        while True:
+            page = self.client.get('/api/dashboard/activity/', {**params, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(page.status_code, 200)
+            rows += [(row['kind'], row['id']) for row in page.json()['results']]
+            cursor = page.json()['next_cursor']
+            if cursor is None:
+                return rows
+
+    def test_keyset_pages_cover_ties_across_sources_once_in_order(self):
+        from .activity import activity_stream
+
+        rows = self.pages(limit=2)
+        self.assertEqual(rows[0], ('player', self.newest.pk))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(len(set(rows)), 10)
+        # Tied timestamps fall back to kind, then id, both descending
+        self.assertEqual(rows[1:], sorted(rows[1:], reverse=True))
+        self.assertEqual(rows, [(row['kind'], row['id']) for row in activity_stream(limit=50)['results']])
+
+    def test_filters_drop_user_check_ins(self):
+        rows = self.pages(booking=self.booking.pk, limit=4)
+        self.assertEqual({kind for kind, _ in rows}, {'player', 'organizer'})
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(len(self.pages(sport=self.sport.pk, date=self.tie.date().isoformat())), 7)
+
+    def test_bad_params_are_rejected(self):
+        for params in ({'cursor': 'garbage'}, {'sport': 'abc'}, {'booking': 'x'}, {'date': 'today'}):
+            self.assertEqual(self.client.get('/api/dashboard/activity/', params).status_code, 400, params)
+        response = self.client.get('/api/dashboard/activity/', {'limit': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'limit must be an integer'})
+
+    def test_dashboard_stats_include_recent_activity(self):
+        recent = self.client.get('/api/dashboard/stats/').json()['recent_activity']
+        self.assertEqual(len(recent), 10)
+        self.assertEqual((recent[0]['kind'], recent[0]['subject']['name']), ('player', 'Asha'))
+        self.assertEqual(recent[0]['sport_name'], 'Nets')
+        self.assertEqual({row['kind'] for row in recent}, {'player', 'user', 'organizer'})
@@ -0,0 +1,99 @@
+"""
+Brute-force protection for the auth endpoints
+
+Token buckets kept in the Django cache, checked by DRF before the view runs,
+so a rejected attempt costs a few cache calls and never reaches password
+hashing. Rates come from REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] ('10/min'
+means a burst of 10, refilled at 10 per minute).
+
+Each bucket is read and written under a short cache.add() lock, so parallel
+attempts cannot all spend the same token. When the cache is unreachable the
+lock is skipped and the bucket reads as full: throttling fails open.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+
+# Held for a get and a set; the expiry only matters if a worker dies holding it
+LOCK_SECONDS = 2
+LOCK_ATTEMPTS = 50
+LOCK_WAIT_SECONDS = 0.002
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    cache = cache
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        lock = f'{self.key}:lock'
+        self._acquire(lock)
+        try:
+            return self._take_token()
+        finally:
+            self.cache.delete(lock)
+
+    def _acquire(self, lock):
+        vanished = 0
+        for _ in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock, 1, LOCK_SECONDS):
+                return
+            if self.cache.get(lock) is None:
+                # Released in between (retry now), or twice running: the cache is down
+                vanished += 1
+                if vanished > 1:
+                    return
+                continue
+            vanished = 0
+            time.sleep(LOCK_WAIT_SECONDS)
+        # Still held after ~0.1s: a stale lock from a dead worker, go ahead
+
+    def _take_token(self):
+        capacity, period = self.num_requests, self.duration
+        refill_per_second = capacity / period
+        now = time.time()
+        tokens, updated_at = self.cache.get(self.key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / refill_per_second
+            self.cache.set(self.key, (tokens, now), period)
+            return False
+        self.cache.set(self.key, (tokens - 1, now), period)
+        return True
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Attempts per client IP"""
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class AuthIdentifierThrottle(TokenBucketThrottle):
+    """Attempts per account identifier, whichever IP they come from"""
+    scope = 'auth_identifier'
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, dict):
+            # e.g. a JSON list body: nothing to key on but the client
+            return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+        identifier = request.data.get('username') or request.data.get('email')
+        if not identifier or not isinstance(identifier, str):
+            return None
+        digest = hashlib.sha256(identifier.strip().lower().encode()).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': digest}
+
+
+AUTH_THROTTLES = [AuthIPThrottle, AuthIdentifierThrottle]
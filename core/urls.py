@@ -22,6 +22,10 @@ urlpatterns = [
     
     # Password Reset Page (for email links)
     path('reset-password/', TemplateView.as_view(template_name='reset_password.html'), name='reset_password_page'),
+    path('activate/', TemplateView.as_view(
+        template_name='reset_password.html',
+        extra_context={'activation': True},
+    ), name='activate_account_page'),
     
     # Authentication endpoints
     path('auth/jwt_login/', views.jwt_login, name='jwt_login'),
@@ -29,11 +33,28 @@ urlpatterns = [
     path('auth/change-password/', views.change_password, name='change_password'),
     path('auth/password-reset/', views.password_reset_request, name='password_reset_request'),
     path('auth/password-reset-confirm/', views.password_reset_confirm, name='password_reset_confirm'),
+    path('auth/activate/', views.activate_account, name='activate_account'),
     
     # Payment endpoints
     path('payment/create-order/', views.create_razorpay_order, name='create_razorpay_order'),
     path('payment/verify/', views.verify_razorpay_payment, name='verify_razorpay_payment'),
+    path('payment/webhook/', views.razorpay_webhook, name='razorpay_webhook'),
     
     # Dashboard
     path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
+    path('dashboard/activity/', views.activity_stream, name='activity_stream'),
+
+    # Data exports (Admin)
+    path('exports/<str:kind>/', views.export_data, name='export_data'),
+
+    # Analytics (Admin)
+    path('analytics/revenue/', views.revenue_analytics, name='revenue_analytics'),
+    path('analytics/utilization/', views.utilization_analytics, name='utilization_analytics'),
+    path('analytics/heatmap/', views.heatmap_analytics, name='heatmap_analytics'),
+    path('cache/metrics/', views.reference_cache_metrics, name='reference_cache_metrics'),
+
+    # Mobile app launch and delta sync
+    path('bootstrap/', views.app_bootstrap, name='app_bootstrap'),
+    path('sync/', views.delta_sync, name='delta_sync'),
+    path('batch/', views.batch_requests, name='batch_requests'),
 ]
@@ -2,18 +2,18 @@
 Views for Red Ball Cricket Academy API
 """
 from rest_framework import viewsets, status, permissions
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.conf import settings
 from django.db import transaction
+from django.db.models import Count
 from django.views.decorators.csrf import csrf_exempt
-import razorpay
 import hmac
 import hashlib
 import json
@@ -21,9 +21,9 @@ from datetime import datetime, timedelta
 
 User = get_user_model()
 
-from .models import Sport, TimeSlot, Booking, Player, CheckInLog, UserProfile, BookingConfiguration, BreakTime, BlackoutDate, CustomUser
+from .models import Sport, TimeSlot, Booking, Player, CheckInLog, UserProfile, BookingConfiguration, BreakTime, BlackoutDate, CustomUser, normalize_email
 from .serializers import (
-    SportSerializer, TimeSlotSerializer, BookingSerializer, 
+    SportSerializer, TimeSlotSerializer, BookingSerializer, BookingListSerializer, 
     PlayerSerializer, CheckInLogSerializer, UserSerializer,
     BookingCreateSerializer, PlayerCreateSerializer, BulkPlayerCreateSerializer,
     QRCodeScanSerializer, PaymentOrderSerializer, PaymentVerificationSerializer,
@@ -34,45 +34,40 @@ from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
 from django.core.mail import send_mail
+from . import accounts, activity, analytics, batch, bootstrap, exports, fastserializers, payments, sync, webhooks
+from .outbox import enqueue
+from .authentication import JWT_ONLY
+from .caching import CachedReadMixin, cache_metrics
+from .conditional import ConditionalGetMixin
+from .fieldsets import FieldsetQuerysetMixin
+from .idempotency import idempotent
+from .throttling import AUTH_THROTTLES
 # JWT login endpoint
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(AUTH_THROTTLES)
 def jwt_login(request):
     # Allow login with email or username
-    identifier = request.data.get('username') or request.data.get('email')
-    password = request.data.get('password')
-    
-    print(f"🔐 Login attempt - Email/Username: {identifier}, Password provided: {bool(password)}")
-    
-    user = None
-    if identifier and password:
-        # CustomUser uses email as USERNAME_FIELD, so authenticate with email
-        user = authenticate(request, email=identifier, password=password)
-        print(f"   First auth attempt (email): {'✅ Success' if user else '❌ Failed'}")
-        
-        # Fallback: try as username field for backwards compatibility
-        if not user:
-            try:
-                user_obj = User.objects.filter(email__iexact=identifier).first()
-                if user_obj:
-                    print(f"   Found user by email: {user_obj.email}")
-                    if user_obj.check_password(password):
-                        user = user_obj
-                        print(f"   Password check: ✅ Success")
-                    else:
-                        print(f"   Password check: ❌ Failed")
-                else:
-                    print(f"   No user found with email: {identifier}")
-            except Exception as e:
-                print(f"   Exception during fallback: {e}")
-    else:
-        print(f"   ❌ Missing credentials - identifier: {identifier}, password: {bool(password)}")
-    
+    data = request.data if isinstance(request.data, dict) else {}
+    identifier = data.get('username') or data.get('email')
+    password = data.get('password')
+    if not identifier or not password:
+        return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
+
+    # One indexed lookup and exactly one password hash per attempt
+    user = User.objects.select_related('profile').filter(email__lower=normalize_email(identifier)).first()
+    if user is None or not user.has_usable_password():
+        # Hash anyway so unknown emails and not-yet-activated accounts
+        # (check_password returns early for them) take as long as wrong passwords
+        User().set_password(password)
+        user = None
+    elif not (user.check_password(password) and user.is_active):
+        user = None
+
     if user:
         refresh = RefreshToken.for_user(user)
         profile = getattr(user, 'profile', None)
         user_type = profile.user_type if profile else 'customer'
-        print(f"   ✅ Login successful for {user.email}")
         return Response({
             'refresh': str(refresh),
             'access': str(refresh.access_token),
@@ -80,8 +75,7 @@ def jwt_login(request):
             'user_type': user_type,
             'is_staff': user.is_staff
         })
-    
-    print(f"   ❌ Login failed - returning 401")
+
     return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
 
@@ -99,23 +93,18 @@ def change_password(request):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(AUTH_THROTTLES)
 def password_reset_request(request):
     serializer = PasswordResetRequestSerializer(data=request.data)
     if serializer.is_valid():
         email = serializer.validated_data['email']
-        user = User.objects.filter(email__iexact=email).first()
+        user = User.objects.filter(email__lower=normalize_email(email)).first()
         if user:
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            token = default_token_generator.make_token(user)
-            reset_link = f"{request.scheme}://{request.get_host()}/api/reset-password/?uid={uid}&token={token}"
-            # send email
-            send_mail(
-                subject='Password Reset Request - Red Ball Cricket Academy',
-                message=f'Hello,\n\nYou requested to reset your password for Red Ball Cricket Academy.\n\nClick the link below to reset your password:\n{reset_link}\n\nThis link will expire in 24 hours.\n\nIf you did not request this, please ignore this email.\n\nBest regards,\nRed Ball Cricket Academy Team',
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[email],
-                fail_silently=False,
-            )
+            # Sent after commit by the outbox dispatcher; the token is minted at send time
+            enqueue('password_reset_email', {
+                'user_id': user.pk,
+                'base_url': f"{request.scheme}://{request.get_host()}",
+            })
         # always return success to avoid leaking emails
         return Response({'message': 'If an account with that email exists, a reset link has been sent.'})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -142,20 +131,52 @@ def password_reset_confirm(request):
         return Response({'message': 'Password has been reset successfully'})
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@throttle_classes(AUTH_THROTTLES)
+def activate_account(request):
+    """Set the first password of a bulk-provisioned player account and log in"""
+    serializer = PasswordResetConfirmSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        uid_decoded = force_str(urlsafe_base64_decode(serializer.validated_data['uid']))
+        user = User.objects.select_related('profile').get(pk=uid_decoded)
+    except Exception:
+        return Response({'error': 'Invalid token or uid'}, status=status.HTTP_400_BAD_REQUEST)
+    if not accounts.activation_token_generator.check_token(user, serializer.validated_data['token']):
+        return Response({'error': 'Invalid or expired activation link'}, status=status.HTTP_400_BAD_REQUEST)
+
+    user.set_password(serializer.validated_data['new_password'])
+    user.save(update_fields=['password'])
+    refresh = RefreshToken.for_user(user)
+    profile = getattr(user, 'profile', None)
+    return Response({
+        'message': 'Account activated successfully',
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'user': UserSerializer(user).data,
+        'user_type': profile.user_type if profile else 'customer',
+        'is_staff': user.is_staff
+    })
+
+
 # JWT register endpoint
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes(AUTH_THROTTLES)
 def jwt_register(request):
-    email = request.data.get('email')
-    password = request.data.get('password')
-    user_type = request.data.get('user_type', 'customer')
-    first_name = request.data.get('first_name', '')
-    last_name = request.data.get('last_name', '')
+    data = request.data if isinstance(request.data, dict) else {}
+    email = data.get('email')
+    password = data.get('password')
+    user_type = data.get('user_type', 'customer')
+    first_name = data.get('first_name', '')
+    last_name = data.get('last_name', '')
     
     if not email or not password:
         return Response({'error': 'Email and password are required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if User.objects.filter(email=email).exists():
+    if User.objects.filter(email__lower=normalize_email(email)).exists():
         return Response({'error': 'Email already exists'}, status=status.HTTP_400_BAD_REQUEST)
     
     try:
@@ -184,14 +205,9 @@ def jwt_register(request):
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-# Initialize Razorpay client
-razorpay_client = razorpay.Client(
-    auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-)
-
-
-class SportViewSet(viewsets.ModelViewSet):
+class SportViewSet(ConditionalGetMixin, CachedReadMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet for Sport CRUD operations"""
+    cache_namespace = 'sports'
     queryset = Sport.objects.all()
     serializer_class = SportSerializer
     
@@ -257,10 +273,14 @@ class SportViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class SlotViewSet(viewsets.ModelViewSet):
+class SlotViewSet(ConditionalGetMixin, CachedReadMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet for Slot CRUD operations"""
+    conditional_fields = ('updated_at', 'sport__updated_at')
+    cache_namespace = 'slots'
+    eager_loading = {'*': ['sport']}
     queryset = TimeSlot.objects.all()
     serializer_class = TimeSlotSerializer
+    authentication_classes = JWT_ONLY
     pagination_class = None  # Disable pagination to show all slots in admin interface
 
     def get_permissions(self):
@@ -269,6 +289,15 @@ class SlotViewSet(viewsets.ModelViewSet):
             return [IsAdminUser()]
         return [AllowAny()]
 
+    def list(self, request, *args, **kwargs):
+        if not fastserializers.uses_default_fields(request):
+            return super().list(request, *args, **kwargs)
+        # Same output as TimeSlotSerializer, without the per-field machinery
+        queryset = self.get_queryset()
+        return self.conditional(request, queryset, lambda: self._cached(
+            request, lambda *a, **kw: Response(fastserializers.slot_rows(queryset))
+        ))
+
     def get_queryset(self):
         """Filter slots based on query parameters"""
         queryset = TimeSlot.objects.all()
@@ -293,18 +322,6 @@ class SlotViewSet(viewsets.ModelViewSet):
             today = timezone.now().date()
             queryset = queryset.filter(is_booked=False, admin_disabled=False, date__gte=today)
         
-        # Enhanced logging for debugging
-        total_slots = TimeSlot.objects.count()
-        print(f"🔍 Slots Query Debug:")
-        print(f"   Total slots in DB: {total_slots}")
-        print(f"   Query params - Sport: {sport_id}, Date: {date}, Available: {available}")
-        print(f"   Filtered count: {queryset.count()}")
-        
-        # Log a few sample slots
-        sample_slots = queryset[:5]
-        for slot in sample_slots:
-            print(f"   📅 Sample slot: {slot.sport.name} | {slot.date} | {slot.start_time}-{slot.end_time} | Booked: {slot.is_booked}")
-
         return queryset.order_by('date', 'start_time')
 
     @action(detail=False, methods=['post'])
@@ -602,7 +619,7 @@ class SlotViewSet(viewsets.ModelViewSet):
             )
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ConditionalGetMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def confirm_payment(self, request, pk=None):
         """Confirm payment for a booking and update status"""
@@ -613,21 +630,41 @@ class BookingViewSet(viewsets.ModelViewSet):
     """ViewSet for Booking operations"""
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    authentication_classes = JWT_ONLY
     permission_classes = [IsAuthenticated]
+    conditional_fields = ('updated_at', 'slot__updated_at', 'slot__sport__updated_at', 'players__updated_at')
+    conditional_counts = ('players',)  # player_count and nested players drop on delete
+    # cancel re-serializes the booking with its players
+    eager_loading = {'*': ['user', 'slot__sport'], 'cancel': ['players']}
 
     def get_queryset(self):
         """Users see their own bookings, admins see all"""
         if self.request.user.is_staff:
-            return Booking.objects.all()
-        return Booking.objects.filter(user=self.request.user)
+            queryset = Booking.objects.all()
+        else:
+            queryset = Booking.objects.filter(user=self.request.user)
+        if self.action in ('list', 'my_bookings'):
+            queryset = queryset.annotate(player_count=Count('players'))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'my_bookings':
+            return BookingListSerializer
+        return super().get_serializer_class()
     
     @action(detail=False, methods=['get'])
     def my_bookings(self, request):
-        """Get current user's bookings"""
+        """Get current user's bookings as summaries; players are on the detail view"""
         bookings = self.get_queryset().order_by('-created_at')
-        serializer = BookingSerializer(bookings, many=True, context={'request': request})
-        return Response(serializer.data)
-
+        if fastserializers.uses_default_fields(request):
+            return self.conditional(request, bookings, lambda: Response(
+                fastserializers.booking_list_rows(bookings, request)
+            ))
+        return self.conditional(request, bookings, lambda: Response(
+            self.get_serializer(self.eager(bookings), many=True).data
+        ))
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         """Create a new booking"""
         serializer = BookingCreateSerializer(data=request.data)
@@ -733,52 +770,29 @@ class BookingViewSet(viewsets.ModelViewSet):
                 'available_slots': available_slots
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create players
-        created_players = []
-        
+        # Check for duplicate emails in this booking
+        emails = [player_data['email'] for player_data in players_data]
+        duplicate = booking.players.filter(email__in=emails).values_list('email', flat=True).first()
+        if duplicate is None and len(set(emails)) < len(emails):
+            duplicate = next(email for email in emails if emails.count(email) > 1)
+        if duplicate is not None:
+            return Response({
+                'error': f'Player with email {duplicate} already exists in this booking'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Accounts are created in bulk with unusable passwords; each player
+        # gets an activation link, and QR codes and emails go out after commit
+        entries = [
+            {
+                'name': player_data['name'].strip(),
+                'email': player_data['email'],
+                'phone': player_data.get('phone', '').strip(),
+            }
+            for player_data in players_data
+        ]
         with transaction.atomic():
-            for player_data in players_data:
-                name = player_data['name'].strip()
-                email = player_data['email'].strip().lower()
-                phone = player_data.get('phone', '').strip()
-                
-                # Check for duplicate emails in this booking
-                if booking.players.filter(email=email).exists():
-                    return Response({
-                        'error': f'Player with email {email} already exists in this booking'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                # Create or get user with email as username and "redball" as password
-                user, user_created = CustomUser.objects.get_or_create(
-                    email=email,
-                    defaults={
-                        'first_name': name,
-                    }
-                )
-                
-                if user_created:
-                    user.set_password('redball')
-                    user.save()
-                    print(f"✅ Created new user account: {email} (password: redball)")
-                    
-                    # Set user profile as player type
-                    profile, _ = UserProfile.objects.get_or_create(user=user)
-                    profile.user_type = 'player'
-                    profile.save()
-                else:
-                    print(f"ℹ️  Using existing user account: {email}")
-                
-                # Create player (this triggers the signal for QR and email)
-                player = Player.objects.create(
-                    booking=booking,
-                    name=name,
-                    email=email,
-                    phone=phone,
-                    user=user
-                )
-                print(f"✅ Created player record for {name} ({email})")
-                created_players.append(player)
-        
+            created_players = accounts.add_players(booking, entries, base_url=f"{request.scheme}://{request.get_host()}")
+
         # Return created players
         response_serializer = PlayerSerializer(
             created_players, 
@@ -826,7 +840,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         logger.info(f"[ORGANIZER QR] Booking ID: {booking_id}, Slot Date: {slot_date}")
 
         try:
-            booking = Booking.objects.get(id=booking_id)
+            booking = self.eager(Booking.objects.all()).get(id=booking_id)
         except Booking.DoesNotExist:
             logger.error(f"[ORGANIZER QR] Booking not found: {booking_id}")
             return Response({'error': 'Booking not found'}, status=status.HTTP_404_NOT_FOUND)
@@ -896,10 +910,13 @@ class BookingViewSet(viewsets.ModelViewSet):
         })
 
 
-class PlayerViewSet(viewsets.ModelViewSet):
+class PlayerViewSet(ConditionalGetMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet for Player operations"""
+    conditional_fields = ('updated_at', 'booking__updated_at', 'booking__slot__updated_at', 'booking__slot__sport__updated_at')
+    eager_loading = {'*': ['booking__slot__sport', 'booking__user']}
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
+    authentication_classes = JWT_ONLY
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -925,7 +942,7 @@ class PlayerViewSet(viewsets.ModelViewSet):
             booking_id = serializer.validated_data['booking'].id
             
             # Verify booking belongs to user
-            booking = get_object_or_404(Booking, id=booking_id)
+            booking = get_object_or_404(Booking.objects.select_related('slot__sport'), id=booking_id)
             if booking.user != request.user and not request.user.is_staff:
                 return Response(
                     {'error': 'You do not have permission to add players to this booking'},
@@ -951,8 +968,11 @@ class PlayerViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Create player. Account creation, QR, and email will be handled by a post_save signal.
-            player = serializer.save()
+            # Create player with its account; QR and activation email go through the outbox
+            data = serializer.validated_data
+            entry = {'name': data['name'], 'email': normalize_email(data['email']), 'phone': data.get('phone')}
+            with transaction.atomic():
+                player, = accounts.add_players(booking, [entry], base_url=f"{request.scheme}://{request.get_host()}")
             
             response_serializer = PlayerSerializer(player, context={'request': request})
             return Response(response_serializer.data, status=status.HTTP_201_CREATED)
@@ -1016,7 +1036,7 @@ class PlayerViewSet(viewsets.ModelViewSet):
             return Response({'error': 'No QR data or token provided'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            player = Player.objects.get(id=player_id)
+            player = self.eager(Player.objects.all()).get(id=player_id)
         except Player.DoesNotExist:
             return Response(
                 {'error': 'Invalid QR code - player not found'},
@@ -1073,7 +1093,7 @@ class PlayerViewSet(viewsets.ModelViewSet):
         if not booking_id or not isinstance(players, list) or len(players) == 0:
             return Response({'error': 'booking and players[] are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        booking = get_object_or_404(Booking, id=booking_id)
+        booking = get_object_or_404(Booking.objects.select_related('slot__sport', 'user'), id=booking_id)
         # Only owner or admin can add
         if booking.user != request.user and not request.user.is_staff:
             return Response({'error': 'You do not have permission to add players to this booking'}, status=status.HTTP_403_FORBIDDEN)
@@ -1087,18 +1107,19 @@ class PlayerViewSet(viewsets.ModelViewSet):
         if len(players) > available:
             return Response({'error': f'You can only add {available} more players', 'max_allowed': max_allowed, 'current': current_count}, status=status.HTTP_400_BAD_REQUEST)
 
-        created = []
+        entries = []
         errors = []
+        for p in players:
+            name = (p or {}).get('name')
+            email = (p or {}).get('email')
+            phone = (p or {}).get('phone')
+            if not name or not email:
+                errors.append({'name': name, 'email': email, 'error': 'name and email are required'})
+                continue
+            entries.append({'name': name, 'email': normalize_email(email), 'phone': phone})
+
         with transaction.atomic():
-            for p in players:
-                name = (p or {}).get('name')
-                email = (p or {}).get('email')
-                phone = (p or {}).get('phone')
-                if not name or not email:
-                    errors.append({'name': name, 'email': email, 'error': 'name and email are required'})
-                    continue
-                player = Player.objects.create(booking=booking, name=name, email=email.lower().strip(), phone=phone)
-                created.append(player)
+            created = accounts.add_players(booking, entries, base_url=f"{request.scheme}://{request.get_host()}")
 
         data = PlayerSerializer(created, many=True, context={'request': request}).data
         return Response({'created': len(created), 'players': data, 'errors': errors}, status=status.HTTP_201_CREATED)
@@ -1127,13 +1148,18 @@ class PlayerViewSet(viewsets.ModelViewSet):
     def me(self, request):
         """Return the current player's own records with booking and QR details"""
         user = request.user
-        players = Player.objects.filter(user=user).select_related('booking__slot__sport')
-        if not players.exists():
-            return Response({'error': 'No player profiles found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Return all player records (multiple bookings)
-        serializer = PlayerSerializer(players, many=True, context={'request': request})
-        return Response(serializer.data)
+        players = Player.objects.filter(user=user)
+
+        def render():
+            if fastserializers.uses_default_fields(request):
+                data = fastserializers.player_rows(players, request)
+            else:
+                data = PlayerSerializer(self.eager(players), many=True, context={'request': request}).data
+            if not data:
+                return Response({'error': 'No player profiles found'}, status=status.HTTP_404_NOT_FOUND)
+            # Return all player records (multiple bookings)
+            return Response(data)
+        return self.conditional(request, players, render)
 
 
 
@@ -1172,11 +1198,208 @@ def dashboard_stats(request):
         'sports_count': Sport.objects.filter(is_active=True).count(),
         'slots_count': TimeSlot.objects.filter(date__gte=today).count(),
         'recent_logs': log_data,
+        # Player, user and organizer check-ins merged into one stream
+        'recent_activity': activity.activity_stream(limit=20)['results'],
     }
     
     return Response(stats)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def activity_stream(request):
+    """Merged, newest-first stream of player, user and organizer check-ins (Admin only)
+    Query params: ?sport=<id>&date=YYYY-MM-DD&booking=<id>&limit=50&cursor=<next_cursor>
+    """
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    params = request.query_params
+    date = params.get('date')
+    if date:
+        from django.utils.dateparse import parse_date
+        try:
+            date = parse_date(date)
+        except ValueError:
+            date = None
+        if date is None:
+            return Response({'error': 'date must be a valid date (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        ids = {name: int(params[name]) if params.get(name) else None for name in ('sport', 'booking')}
+    except ValueError:
+        return Response({'error': 'sport and booking must be ids'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(params.get('limit', activity.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        page = activity.activity_stream(
+            sport_id=ids['sport'],
+            date=date,
+            booking_id=ids['booking'],
+            cursor=params.get('cursor'),
+            limit=limit,
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(page)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_data(request, kind):
+    """Stream bookings, players, slots or check-in logs as CSV or JSON Lines (Admin only)
+    GET /api/exports/<bookings|players|slots|checkins|user_checkins|organizer_checkins>/?output=csv|jsonl&start=YYYY-MM-DD&end=YYYY-MM-DD&sport=<id>
+    """
+    from django.http import StreamingHttpResponse
+    from django.utils.dateparse import parse_date
+
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    if kind not in exports.EXPORTS:
+        return Response(
+            {'error': f"Unknown export '{kind}'. Choose one of: {', '.join(exports.EXPORTS)}"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    params = request.query_params
+    output = params.get('output', 'csv')
+    if output not in exports.OUTPUT_FORMATS:
+        return Response(
+            {'error': f"output must be one of: {', '.join(exports.OUTPUT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    dates = {}
+    for name in ('start', 'end'):
+        value = params.get(name)
+        if not value:
+            dates[name] = None
+            continue
+        try:
+            dates[name] = parse_date(value)
+        except ValueError:
+            dates[name] = None
+        if dates[name] is None:
+            return Response({'error': f'{name} must be a valid date (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+    # Checked here: once streaming starts, a query error can no longer become a 400
+    try:
+        sport_id = int(params['sport']) if params.get('sport') else None
+    except ValueError:
+        return Response({'error': 'sport must be a sport id'}, status=status.HTTP_400_BAD_REQUEST)
+    if sport_id and exports.EXPORTS[kind].sport_lookup is None:
+        return Response({'error': f"{kind} cannot be filtered by sport"}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        exports.stream_export(kind, output, dates['start'], dates['end'], sport_id),
+        content_type=exports.OUTPUT_FORMATS[output],
+    )
+    filename = f"{kind}-{timezone.now():%Y%m%d}.{output}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def revenue_analytics(request):
+    """Revenue per sport per day/week from the rollup table (Admin only)
+    Query params: ?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week&sport=<id>
+    """
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        start, end, granularity, sport_id = analytics.parse_report_window(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'results': analytics.revenue_report(start, end, granularity, sport_id),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def utilization_analytics(request):
+    """Slot utilization (booked vs offered, peak vs off-peak) from the rollup table (Admin only)
+    Query params: ?start=YYYY-MM-DD&end=YYYY-MM-DD&granularity=day|week&sport=<id>
+    """
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        start, end, granularity, sport_id = analytics.parse_report_window(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'start': start,
+        'end': end,
+        'granularity': granularity,
+        'results': analytics.utilization_report(start, end, granularity, sport_id),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def heatmap_analytics(request):
+    """Sport x weekday x hour heatmap of booking rate and no-show rate (Admin only)
+    Query params: ?start=YYYY-MM-DD&end=YYYY-MM-DD&sport=<id>
+    Returns dense matrices indexed as [sport][weekday][hour]; null means no slots offered.
+    """
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    try:
+        start, end, _, sport_id = analytics.parse_report_window(request.query_params, default_days=90)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(analytics.utilization_heatmap(start, end, sport_id))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def reference_cache_metrics(request):
+    """Hit/miss counts and hit rate of the reference endpoint cache (Admin only)"""
+    if not request.user.is_staff:
+        return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+    return Response(cache_metrics())
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def delta_sync(request):
+    """Sports, slots, bookings and players changed or deleted since a cursor
+    GET /api/sync/?since=<cursor>  (omit `since` for a full snapshot)
+    """
+    try:
+        return Response(sync.sync_payload(request.user, request.query_params.get('since'), request))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def app_bootstrap(request):
+    """Everything the app loads on launch in one response
+    GET /api/bootstrap/ -> {user, my_bookings, players, sports, booking_configurations}
+    """
+    return Response(bootstrap.bootstrap_payload(request))
+
+
+@api_view(['POST'])
+@authentication_classes(JWT_ONLY)  # Sub-requests inherit this user, so it must satisfy JWT-only views
+@permission_classes([IsAuthenticated])
+def batch_requests(request):
+    """Run several API requests as the caller in one round trip
+    POST /api/batch/
+    Body: {"requests": [{"method": "GET", "path": "/api/bookings/12/players/"}, ...]}
+    """
+    if not isinstance(request.data, dict):
+        return Response({'error': 'Body must be an object with a requests list'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        results = batch.run_batch(request, request.data.get('requests'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'responses': results})
+
+
 class UserViewSet(viewsets.ViewSet):
     """ViewSet for User QR code and check-in operations"""
     permission_classes = [IsAuthenticated]
@@ -1250,8 +1473,11 @@ class UserViewSet(viewsets.ViewSet):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class BookingConfigurationViewSet(viewsets.ModelViewSet):
+class BookingConfigurationViewSet(ConditionalGetMixin, CachedReadMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet for BookingConfiguration"""
+    conditional_fields = ('updated_at', 'sport__updated_at')
+    cache_namespace = 'booking_configurations'
+    eager_loading = {'*': ['sport']}
     queryset = BookingConfiguration.objects.all().order_by('id')
     serializer_class = BookingConfigurationSerializer
     
@@ -1329,8 +1555,11 @@ class BookingConfigurationViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class BreakTimeViewSet(viewsets.ModelViewSet):
+class BreakTimeViewSet(ConditionalGetMixin, CachedReadMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet for BreakTime"""
+    conditional_fields = ('updated_at', 'sport__updated_at')
+    cache_namespace = 'break_times'
+    eager_loading = {'*': ['sport']}
     queryset = BreakTime.objects.all()
     serializer_class = BreakTimeSerializer
     
@@ -1349,8 +1578,11 @@ class BreakTimeViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class BlackoutDateViewSet(viewsets.ModelViewSet):
+class BlackoutDateViewSet(ConditionalGetMixin, CachedReadMixin, FieldsetQuerysetMixin, viewsets.ModelViewSet):
     """ViewSet for BlackoutDate - date-based unavailability"""
+    conditional_fields = ('created_at', 'sport__updated_at')
+    cache_namespace = 'blackout_dates'
+    eager_loading = {'*': ['sport']}
     queryset = BlackoutDate.objects.all()
     serializer_class = BlackoutDateSerializer
     
@@ -1422,6 +1654,7 @@ class BlackoutDateViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@idempotent
 def create_razorpay_order(request):
     """Create a Razorpay order and return order details"""
     try:
@@ -1429,21 +1662,29 @@ def create_razorpay_order(request):
         if not serializer.is_valid():
             return Response(serializer.errors, status=400)
         
-        amount = int(float(serializer.validated_data['amount']) * 100)  # Razorpay expects paise
         booking_id = serializer.validated_data['booking_id']
-        
+        bookings = Booking.objects.filter(pk=booking_id, payment_verified=False, is_cancelled=False)
+        if not request.user.is_staff:
+            bookings = bookings.filter(user=request.user)
+        # Priced from the slot, never from the client
+        price = bookings.values_list('slot__price', flat=True).first()
+        if price is None:
+            return Response({'error': 'Booking not found or already paid'}, status=404)
+        amount = int(price * 100)  # Razorpay expects paise
+
         # Check if Razorpay keys are set
-        if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
+        gateway = payments.get_gateway()
+        if not gateway.configured:
             return Response({'error': 'Razorpay credentials not configured'}, status=500)
         
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        order_data = {
-            'amount': amount,
-            'currency': 'INR',
-            'payment_capture': 1,
-            'notes': {'booking_id': str(booking_id)}
-        }
-        order = client.order.create(data=order_data)
+        try:
+            order = gateway.create_order(amount, notes={'booking_id': str(booking_id)})
+        except payments.GatewayUnavailable as e:
+            return Response({'error': f'Payment gateway unavailable: {e}'}, status=503)
+        except payments.BadRequestError as e:
+            return Response({'error': str(e)}, status=400)
+        # Remember the order so webhooks and reconciliation can find the booking
+        bookings.update(order_id=order['id'], updated_at=timezone.now())
         return Response({
             'order_id': order['id'],
             'razorpay_key': settings.RAZORPAY_KEY_ID,
@@ -1467,14 +1708,8 @@ def verify_razorpay_payment(request):
         payment_id = serializer.validated_data['razorpay_payment_id']
         signature = serializer.validated_data['razorpay_signature']
         booking_id = serializer.validated_data['booking_id']
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
-        try:
-            client.utility.verify_payment_signature({
-                'razorpay_order_id': order_id,
-                'razorpay_payment_id': payment_id,
-                'razorpay_signature': signature
-            })
-        except razorpay.errors.SignatureVerificationError:
+        # Checked locally with HMAC; no call to the gateway
+        if not payments.get_gateway().verify_payment_signature(order_id, payment_id, signature):
             return Response({'error': 'Payment verification failed'}, status=400)
         # Mark booking as paid (update your Booking model as needed)
         from .models import Booking
@@ -1487,3 +1722,28 @@ def verify_razorpay_payment(request):
         return Response({'message': 'Payment verified and booking updated'})
     return Response(serializer.errors, status=400)
 
+
+@csrf_exempt
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def razorpay_webhook(request):
+    """Razorpay webhook for payment.captured, payment.failed and refund.processed.
+
+    Each event id is applied at most once; redeliveries get a 200 so Razorpay
+    stops retrying.
+    """
+    body = request.body
+    signature = request.headers.get('X-Razorpay-Signature')
+    if not payments.verify_webhook_signature(body, signature, settings.RAZORPAY_WEBHOOK_SECRET):
+        return Response({'error': 'Invalid signature'}, status=400)
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return Response({'error': 'Invalid JSON'}, status=400)
+
+    event_id = request.headers.get('X-Razorpay-Event-Id') or hashlib.sha256(body).hexdigest()
+    event = webhooks.ingest(event_id, payload)
+    if event is None:
+        return Response({'status': 'duplicate'})
+    return Response({'status': 'processed', 'applied': event.applied})
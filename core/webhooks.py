@@ -0,0 +1,118 @@
+"""
+Razorpay webhook ingestion for Red Ball Cricket Academy
+
+Each delivery is recorded under its event id in PaymentWebhookEvent inside
+the same transaction that applies it, so redeliveries and concurrent
+duplicates are applied at most once. Booking changes are single
+conditional UPDATEs (e.g. "confirm if not yet confirmed"), which keeps them
+idempotent under bursts; follow-up work (QR codes) goes to the outbox.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .caching import invalidate_model
+from .models import Booking, PaymentWebhookEvent, TimeSlot
+from .outbox import enqueue
+
+PAYMENT_CAPTURED = 'payment.captured'
+PAYMENT_FAILED = 'payment.failed'
+REFUND_PROCESSED = 'refund.processed'
+
+
+def _entity(payload, name):
+    return ((payload.get('payload') or {}).get(name) or {}).get('entity') or {}
+
+
+def _booking_for_payment(payment):
+    """Booking holding the payment's order id; the booking id in its notes only when no booking does"""
+    if payment.get('order_id'):
+        booking_id = Booking.objects.filter(order_id=payment['order_id']).values_list('pk', flat=True).first()
+        if booking_id is not None:
+            return booking_id
+    booking_id = str((payment.get('notes') or {}).get('booking_id') or '')
+    if not booking_id.isdigit():
+        return None
+    return Booking.objects.filter(pk=int(booking_id)).values_list('pk', flat=True).first()
+
+
+def apply_payment_captured(payload):
+    """Confirm the booking; a capture short of the slot price is recorded but confirms nothing"""
+    payment = _entity(payload, 'payment')
+    booking_id = _booking_for_payment(payment)
+    if booking_id is None:
+        return None, False
+    amount = Decimal(payment.get('amount') or 0) / 100
+    price = Booking.objects.filter(pk=booking_id).values_list('slot__price', flat=True).first()
+    if price is None or amount < price:
+        return booking_id, False  # left for an admin, as reconciliation's amount_mismatch
+    updated = Booking.objects.filter(pk=booking_id, payment_verified=False, is_cancelled=False).update(
+        payment_verified=True,
+        status='confirmed',
+        payment_id=payment.get('id'),
+        order_id=payment.get('order_id'),
+        amount_paid=amount,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        # update() skips the post_save signal that normally queues this
+        enqueue('organizer_qr', {'booking_id': booking_id})
+    return booking_id, bool(updated)
+
+
+def apply_payment_failed(payload):
+    # Nothing to change: the booking stays pending and the user can retry
+    return _booking_for_payment(_entity(payload, 'payment')), False
+
+
+def apply_refund_processed(payload):
+    """A full refund cancels the booking and frees its slot"""
+    refund = _entity(payload, 'refund')
+    booking = (
+        Booking.objects.filter(payment_id=refund.get('payment_id'))
+        .values('pk', 'slot_id', 'amount_paid').first()
+    ) if refund.get('payment_id') else None
+    if booking is None:
+        return None, False
+    refunded = Decimal(refund.get('amount') or 0) / 100
+    if booking['amount_paid'] is not None and refunded < booking['amount_paid']:
+        return booking['pk'], False  # partial refund
+    updated = Booking.objects.filter(pk=booking['pk'], is_cancelled=False).update(
+        is_cancelled=True,
+        status='cancelled',
+        cancellation_reason='Payment refunded',
+        updated_at=timezone.now(),
+    )
+    if updated:
+        TimeSlot.objects.filter(pk=booking['slot_id']).update(is_booked=False, updated_at=timezone.now())
+        invalidate_model('TimeSlot')  # update() skips post_save
+    return booking['pk'], bool(updated)
+
+
+APPLIERS = {
+    PAYMENT_CAPTURED: apply_payment_captured,
+    PAYMENT_FAILED: apply_payment_failed,
+    REFUND_PROCESSED: apply_refund_processed,
+}
+
+
+def ingest(event_id, payload):
+    """Record and apply a webhook event once.
+
+    Returns the stored event, or None if this event id was already seen.
+    """
+    event_type = payload.get('event') or ''
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                event = PaymentWebhookEvent.objects.create(event_id=event_id, event=event_type, payload=payload)
+        except IntegrityError:
+            return None
+
+        applier = APPLIERS.get(event_type)
+        if applier is not None:
+            event.booking_id, event.applied = applier(payload)
+            if event.booking_id or event.applied:
+                event.save(update_fields=['booking', 'applied'])
+    return event
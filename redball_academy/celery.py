@@ -3,7 +3,7 @@ from celery import Celery
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'redball_academy.settings')
 
-app = Celery('redball_academy')
+app = Celery('redball_academy', task_cls='core.taskqueue:BackendTask')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
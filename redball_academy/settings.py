@@ -4,7 +4,9 @@ Django settings for Red Ball Cricket Academy project.
 
 from pathlib import Path
 from decouple import config
+import importlib.util
 import os
+import sys
 import warnings
 import dj_database_url
 
@@ -42,6 +44,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise for static files
+    'core.middleware.ThresholdGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -141,9 +144,14 @@ AUTH_USER_MODEL = 'core.CustomUser'
 #     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
 #     'PAGE_SIZE': 20,
 # }
+MSGPACK_AVAILABLE = importlib.util.find_spec('msgpack') is not None
+
+# Responses smaller than this are not gzipped (core.middleware)
+GZIP_MIN_LENGTH = config('GZIP_MIN_LENGTH', default=1024, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
@@ -152,6 +160,21 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # orjson fast path (core.renderers); MessagePack via Accept: application/msgpack when installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ] + (['core.renderers.MessagePackRenderer'] if MSGPACK_AVAILABLE else []),
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ] + (['core.renderers.MessagePackParser'] if MSGPACK_AVAILABLE else []),
+    # Token buckets for login/register/password reset (core.throttling)
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': config('AUTH_THROTTLE_IP_RATE', default='30/min'),
+        'auth_identifier': config('AUTH_THROTTLE_IDENTIFIER_RATE', default='10/min'),
+    },
 }
 
 # JWT Settings - Extend token lifetime for development
@@ -181,6 +204,7 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
     'origin',
     'user-agent',
     'x-csrftoken',
@@ -190,6 +214,12 @@ CORS_ALLOW_HEADERS = [
 # Razorpay settings
 RAZORPAY_KEY_ID = config('RAZORPAY_KEY_ID', default='')
 RAZORPAY_KEY_SECRET = config('RAZORPAY_KEY_SECRET', default='')
+RAZORPAY_WEBHOOK_SECRET = config('RAZORPAY_WEBHOOK_SECRET', default='')
+# Gateway client (core.payments); point RAZORPAY_BASE_URL at `manage.py razorpay_stub` locally
+RAZORPAY_BASE_URL = config('RAZORPAY_BASE_URL', default='')
+RAZORPAY_CONNECT_TIMEOUT = config('RAZORPAY_CONNECT_TIMEOUT', default=3.0, cast=float)
+RAZORPAY_READ_TIMEOUT = config('RAZORPAY_READ_TIMEOUT', default=10.0, cast=float)
+RAZORPAY_MAX_RETRIES = config('RAZORPAY_MAX_RETRIES', default=2, cast=int)
 
 # Email settings - Gmail SMTP
 EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
@@ -200,8 +230,77 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')  # Your Gmail address
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')  # Your Gmail App Password
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='')  # Your Gmail address
 
+# Public base URL for links in emails sent outside a request (e.g. https://api.example.com).
+# Required for activation emails of players created without one (admin, shell)
+SITE_URL = config('SITE_URL', default='')
+
+# Cache: Redis when REDIS_URL is set (shared by all workers), else per-process
+# memory. Redis errors are logged and treated as misses (core.cache_backends),
+# so an outage slows the API down instead of failing requests. LocMem is not
+# shared: a change made through one gunicorn worker bumps only that worker's
+# versions and the others keep serving cached reference data and JWT users
+# for up to REFERENCE_CACHE_SECONDS (300s). Run with REDIS_URL when there is
+# more than one worker.
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.FailOpenRedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'redball',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'redball-academy',
+            # The default of 300 culls a third of the entries when full,
+            # version counters included (see core.caching.get_version)
+            'OPTIONS': {'MAX_ENTRIES': config('LOCMEM_CACHE_MAX_ENTRIES', default=10000, cast=int)},
+        }
+    }
+
 # Celery / Redis (optional but recommended for async emails)
 CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default='redis://localhost:6379/0')
 CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
 
+# Where .delay() runs: 'celery', 'inprocess' (thread pool in the web process,
+# no broker needed) or 'auto' (Celery if the broker answers, else in-process)
+TASK_BACKEND = config('TASK_BACKEND', default='auto')
+TASK_INPROCESS_WORKERS = config('TASK_INPROCESS_WORKERS', default=2, cast=int)
+# Start the in-process dispatcher thread from the web process. Off for the
+# test runner, where tests call dispatch_outbox() themselves.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+TASK_INPROCESS_AUTOSTART = config('TASK_INPROCESS_AUTOSTART', default=not TESTING, cast=bool)
+
+
+# Periodic tasks (run with: python -m celery -A redball_academy beat -l info)
+CELERY_BEAT_SCHEDULE = {
+    'refresh-analytics-rollups': {
+        'task': 'core.tasks.refresh_analytics_rollups',
+        'schedule': timedelta(minutes=15),
+    },
+    # Safety net for outbox messages whose after-commit nudge was lost
+    'drain-outbox': {
+        'task': 'core.tasks.drain_outbox',
+        'schedule': timedelta(minutes=1),
+    },
+    'purge-outbox': {
+        'task': 'core.tasks.purge_outbox',
+        'schedule': timedelta(days=1),
+    },
+    'purge-idempotency-records': {
+        'task': 'core.tasks.purge_idempotency_records',
+        'schedule': timedelta(hours=6),
+    },
+    'purge-sync-tombstones': {
+        'task': 'core.tasks.purge_sync_tombstones',
+        'schedule': timedelta(days=1),
+    },
+    'reconcile-payments': {
+        'task': 'core.tasks.reconcile_payments',
+        'schedule': timedelta(minutes=30),
+    },
+}